@@ -1,27 +1,98 @@
 
 from __future__ import print_function
+import pickle
 import timeit
 
-from delphin.mrs import simplemrs, dmrx, compare
+from delphin.mrs import simplemrs, dmrx, compare, binmrs, eds, jsonl
+
+# "Does he have anything to do with the campaign?"
+mrs_str = '[ LTOP: h0 INDEX: e2 [ e SF: ques TENSE: pres MOOD: indicative PROG: - PERF: - ] RELS: < [ pron_rel<5:7> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg GEND: m PRONTYPE: std_pron ] ]  [ pronoun_q_rel<5:7> LBL: h5 ARG0: x3 RSTR: h6 BODY: h7 ]  [ "_have_v_1_rel"<8:12> LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 [ x PERS: 3 NUM: sg ] ]  [ thing_rel<13:21> LBL: h9 ARG0: x8 ]  [ _any_q_rel<13:21> LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ]  [ "_do_v_1_rel"<25:27> LBL: h9 ARG0: e13 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: i14 ARG2: x8 ARG3: h15 ]  [ _with_p_rel<28:32> LBL: h16 ARG0: e17 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: x8 ARG2: x18 [ x PERS: 3 NUM: sg IND: + ] ]  [ _the_q_rel<33:36> LBL: h19 ARG0: x18 RSTR: h20 BODY: h21 ]  [ "_campaign_n_1_rel"<37:46> LBL: h22 ARG0: x18 ] > HCONS: < h0 qeq h1 h6 qeq h4 h11 qeq h9 h15 qeq h16 h20 qeq h22 > ]'
 
 # load "Does he have anything to do with the campaign?"
 print('simplemrs.loads_one'.ljust(50), end='')
 print(timeit.timeit(
-    'simplemrs.loads_one(\'[ LTOP: h0 INDEX: e2 [ e SF: ques TENSE: pres MOOD: indicative PROG: - PERF: - ] RELS: < [ pron_rel<5:7> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg GEND: m PRONTYPE: std_pron ] ]  [ pronoun_q_rel<5:7> LBL: h5 ARG0: x3 RSTR: h6 BODY: h7 ]  [ "_have_v_1_rel"<8:12> LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 [ x PERS: 3 NUM: sg ] ]  [ thing_rel<13:21> LBL: h9 ARG0: x8 ]  [ _any_q_rel<13:21> LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ]  [ "_do_v_1_rel"<25:27> LBL: h9 ARG0: e13 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: i14 ARG2: x8 ARG3: h15 ]  [ _with_p_rel<28:32> LBL: h16 ARG0: e17 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: x8 ARG2: x18 [ x PERS: 3 NUM: sg IND: + ] ]  [ _the_q_rel<33:36> LBL: h19 ARG0: x18 RSTR: h20 BODY: h21 ]  [ "_campaign_n_1_rel"<37:46> LBL: h22 ARG0: x18 ] > HCONS: < h0 qeq h1 h6 qeq h4 h11 qeq h9 h15 qeq h16 h20 qeq h22 > ]\')',
-    setup='from __main__ import simplemrs',
+    'simplemrs.loads_one(mrs_str)',
+    setup='from __main__ import simplemrs, mrs_str',
+    number=1000
+))
+# load the same sentence from BinMRS
+print('binmrs.loads_one'.ljust(50), end='')
+print(timeit.timeit(
+    'binmrs.loads_one(b)',
+    setup='from __main__ import simplemrs, binmrs, mrs_str; b=binmrs.dumps_one(simplemrs.loads_one(mrs_str))',
+    number=1000
+))
+print('binmrs.dumps_one'.ljust(50), end='')
+print(timeit.timeit(
+    'binmrs.dumps_one(m)',
+    setup='from __main__ import simplemrs, binmrs, mrs_str; m=simplemrs.loads_one(mrs_str)',
+    number=1000
+))
+# the same sentence pickled (as when sent to worker processes)
+print('pickle.loads'.ljust(50), end='')
+print(timeit.timeit(
+    'pickle.loads(b)',
+    setup='from __main__ import simplemrs, pickle, mrs_str; b=pickle.dumps(simplemrs.loads_one(mrs_str), pickle.HIGHEST_PROTOCOL)',
+    number=1000
+))
+print('pickle.dumps'.ljust(50), end='')
+print(timeit.timeit(
+    'pickle.dumps(m, pickle.HIGHEST_PROTOCOL)',
+    setup='from __main__ import simplemrs, pickle, mrs_str; m=simplemrs.loads_one(mrs_str)',
+    number=1000
+))
+# the same sentence as JSON Lines
+print('jsonl.loads_one'.ljust(50), end='')
+print(timeit.timeit(
+    'jsonl.loads_one(s)',
+    setup='from __main__ import simplemrs, jsonl, mrs_str; s=jsonl.dumps_one(simplemrs.loads_one(mrs_str))',
+    number=1000
+))
+print('jsonl.dumps_one'.ljust(50), end='')
+print(timeit.timeit(
+    'jsonl.dumps_one(m)',
+    setup='from __main__ import simplemrs, jsonl, mrs_str; m=simplemrs.loads_one(mrs_str)',
     number=1000
 ))
 # convert same sentence to DMRS
 print('dmrx.dumps_one'.ljust(50), end='')
 print(timeit.timeit(
     'dmrx.dumps_one(m)',
-    setup='from __main__ import simplemrs, dmrx; m=simplemrs.loads_one(\'[ LTOP: h0 INDEX: e2 [ e SF: ques TENSE: pres MOOD: indicative PROG: - PERF: - ] RELS: < [ pron_rel<5:7> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg GEND: m PRONTYPE: std_pron ] ]  [ pronoun_q_rel<5:7> LBL: h5 ARG0: x3 RSTR: h6 BODY: h7 ]  [ "_have_v_1_rel"<8:12> LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 [ x PERS: 3 NUM: sg ] ]  [ thing_rel<13:21> LBL: h9 ARG0: x8 ]  [ _any_q_rel<13:21> LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ]  [ "_do_v_1_rel"<25:27> LBL: h9 ARG0: e13 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: i14 ARG2: x8 ARG3: h15 ]  [ _with_p_rel<28:32> LBL: h16 ARG0: e17 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: x8 ARG2: x18 [ x PERS: 3 NUM: sg IND: + ] ]  [ _the_q_rel<33:36> LBL: h19 ARG0: x18 RSTR: h20 BODY: h21 ]  [ "_campaign_n_1_rel"<37:46> LBL: h22 ARG0: x18 ] > HCONS: < h0 qeq h1 h6 qeq h4 h11 qeq h9 h15 qeq h16 h20 qeq h22 > ]\')',
+    setup='from __main__ import simplemrs, dmrx, mrs_str; m=simplemrs.loads_one(mrs_str)',
+    number=1000
+))
+
+# convert same sentence to EDS
+print('eds.Eds.from_xmrs'.ljust(50), end='')
+print(timeit.timeit(
+    'eds.Eds.from_xmrs(m)',
+    setup='from __main__ import simplemrs, eds, mrs_str; m=simplemrs.loads_one(mrs_str)',
+    number=1000
+))
+
+# read the same sentence as EDS, with the scanner and with the PEG parser
+print('eds.loads_one'.ljust(50), end='')
+print(timeit.timeit(
+    'eds.loads_one(s)',
+    setup='from __main__ import simplemrs, eds, mrs_str; s=eds.dumps_one(simplemrs.loads_one(mrs_str), properties=True)',
+    number=1000
+))
+print('eds._eds_parser.parse'.ljust(50), end='')
+print(timeit.timeit(
+    'eds._eds_parser.parse(s)',
+    setup='from __main__ import simplemrs, eds, mrs_str; s=eds.dumps_one(simplemrs.loads_one(mrs_str), properties=True)',
     number=1000
 ))
 
 print('mrs.compare.isomorphic'.ljust(50), end='')
 print(timeit.timeit(
     'compare.isomorphic(m1, m2)',
-    setup='from __main__ import simplemrs, compare; m1=simplemrs.loads_one(\'[ LTOP: h0 INDEX: e2 [ e SF: ques TENSE: pres MOOD: indicative PROG: - PERF: - ] RELS: < [ pron_rel<5:7> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg GEND: m PRONTYPE: std_pron ] ]  [ pronoun_q_rel<5:7> LBL: h5 ARG0: x3 RSTR: h6 BODY: h7 ]  [ "_have_v_1_rel"<8:12> LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 [ x PERS: 3 NUM: sg ] ]  [ thing_rel<13:21> LBL: h9 ARG0: x8 ]  [ _any_q_rel<13:21> LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ]  [ "_do_v_1_rel"<25:27> LBL: h9 ARG0: e13 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: i14 ARG2: x8 ARG3: h15 ]  [ _with_p_rel<28:32> LBL: h16 ARG0: e17 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: x8 ARG2: x18 [ x PERS: 3 NUM: sg IND: + ] ]  [ _the_q_rel<33:36> LBL: h19 ARG0: x18 RSTR: h20 BODY: h21 ]  [ "_campaign_n_1_rel"<37:46> LBL: h22 ARG0: x18 ] > HCONS: < h0 qeq h1 h6 qeq h4 h11 qeq h9 h15 qeq h16 h20 qeq h22 > ]\'); m2=simplemrs.loads_one(\'[ LTOP: h0 INDEX: e2 [ e SF: ques TENSE: pres MOOD: indicative PROG: - PERF: - ] RELS: < [ pron_rel<5:7> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg GEND: m PRONTYPE: std_pron ] ]  [ pronoun_q_rel<5:7> LBL: h5 ARG0: x3 RSTR: h6 BODY: h7 ]  [ "_have_v_1_rel"<8:12> LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 [ x PERS: 3 NUM: sg ] ]  [ thing_rel<13:21> LBL: h9 ARG0: x8 ]  [ _any_q_rel<13:21> LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ]  [ "_do_v_1_rel"<25:27> LBL: h9 ARG0: e13 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: i14 ARG2: x8 ARG3: h15 ]  [ _with_p_rel<28:32> LBL: h16 ARG0: e17 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: x8 ARG2: x18 [ x PERS: 3 NUM: sg IND: + ] ]  [ _the_q_rel<33:36> LBL: h19 ARG0: x18 RSTR: h20 BODY: h21 ]  [ "_campaign_n_1_rel"<37:46> LBL: h22 ARG0: x18 ] > HCONS: < h0 qeq h1 h6 qeq h4 h11 qeq h9 h15 qeq h16 h20 qeq h22 > ]\')',
+    setup='from __main__ import simplemrs, compare, mrs_str; m1=simplemrs.loads_one(mrs_str); m2=simplemrs.loads_one(mrs_str)',
+    number=100
+))
+print('mrs.compare.graph_hash'.ljust(50), end='')
+print(timeit.timeit(
+    'compare.graph_hash(m1)',
+    setup='from __main__ import simplemrs, compare, mrs_str; m1=simplemrs.loads_one(mrs_str)',
     number=100
 ))
@@ -0,0 +1,45 @@
+
+from __future__ import print_function
+import gc
+import tracemalloc
+
+from delphin.mrs import simplemrs
+from delphin.mrs.components import links
+from delphin.mrs.compact import CompactXmrs
+
+N = 10000
+
+# "Does he have anything to do with the campaign?"
+mrs_str = '[ LTOP: h0 INDEX: e2 [ e SF: ques TENSE: pres MOOD: indicative PROG: - PERF: - ] RELS: < [ pron_rel<5:7> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg GEND: m PRONTYPE: std_pron ] ]  [ pronoun_q_rel<5:7> LBL: h5 ARG0: x3 RSTR: h6 BODY: h7 ]  [ "_have_v_1_rel"<8:12> LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 [ x PERS: 3 NUM: sg ] ]  [ thing_rel<13:21> LBL: h9 ARG0: x8 ]  [ _any_q_rel<13:21> LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ]  [ "_do_v_1_rel"<25:27> LBL: h9 ARG0: e13 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: i14 ARG2: x8 ARG3: h15 ]  [ _with_p_rel<28:32> LBL: h16 ARG0: e17 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: x8 ARG2: x18 [ x PERS: 3 NUM: sg IND: + ] ]  [ _the_q_rel<33:36> LBL: h19 ARG0: x18 RSTR: h20 BODY: h21 ]  [ "_campaign_n_1_rel"<37:46> LBL: h22 ARG0: x18 ] > HCONS: < h0 qeq h1 h6 qeq h4 h11 qeq h9 h15 qeq h16 h20 qeq h22 > ]'
+
+
+def measure(make):
+    """Return the bytes allocated per object for N objects from *make*."""
+    make()  # warm up the pred and string tables
+    gc.collect()
+    tracemalloc.start()
+    objs = [make() for _ in range(N)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return size / float(N)
+
+
+m = simplemrs.loads_one(mrs_str)
+xmrs_size = measure(lambda: simplemrs.loads_one(mrs_str))
+compact_size = measure(lambda: CompactXmrs.from_xmrs(m))
+
+
+def touched():
+    # links() builds an expansion; only a few of them are kept
+    c = CompactXmrs.from_xmrs(m)
+    links(c)
+    return c
+
+touched_size = measure(touched)
+
+print('Xmrs (bytes per object)'.ljust(50), '{:.0f}'.format(xmrs_size))
+print('CompactXmrs (bytes per object)'.ljust(50), '{:.0f}'.format(compact_size))
+print('reduction'.ljust(50), '{:.1f}x'.format(xmrs_size / compact_size))
+print('CompactXmrs after links() (bytes per object)'.ljust(50),
+      '{:.0f}'.format(touched_size))
@@ -1,12 +1,269 @@
-# codecs have been moved to their respective modules (e.g. delphin.mrs)
-# so import them here for (temporary) backward compatibility.
-
-import warnings
-warnings.warn(
-    'The delphin.codecs modules have been deprecated. Look for them '
-    'under their respective packages (e.g. simplemrs is at '
-    'delphin.mrs.simplemrs).',
-    DeprecationWarning
+"""
+A registry of serialization formats (codecs) for semantic structures.
+
+Each codec is a module with the Pickle-API functions `load()`,
+`loads()`, `dump()`, and `dumps()` (e.g., [delphin.mrs.simplemrs]).
+Codecs are registered with a name, and optionally a function that
+recognizes the beginning of the format, so that the codec of an input
+can be detected when it is not given:
+
+    >>> from delphin import codecs
+    >>> codecs.detect('[ LTOP: h0 INDEX: e2 RELS: < > HCONS: < > ]')
+    'simplemrs'
+    >>> for m in codecs.load('corpus.mrx'):
+    ...     print(m.top)
+
+The [convert] function reads from one codec and writes to another one
+object at a time, so corpora of any size can be converted without
+reading them into memory.
+
+For backward compatibility, the [delphin.mrs.simplemrs],
+[delphin.mrs.mrx], and [delphin.mrs.dmrx] modules are also available
+from this package.
+"""
+
+from collections import OrderedDict, namedtuple
+import io
+import re
+import zlib
+
+from delphin.mrs import simplemrs, mrx, dmrx, eds, simpledmrs, jsonl, binmrs
+
+# how much of the input is inspected by detect()
+SNIFF_SIZE = 4096
+
+Codec = namedtuple(
+    'Codec',
+    ('name', 'module', 'binary_input', 'binary_output', 'sniff', 'options')
 )
 
-from delphin.mrs import simplemrs, mrx, dmrx
+_codecs = OrderedDict()
+
+
+def register(name, module, binary=False, binary_input=None, sniff=None,
+             **options):
+    """
+    Register the codec *module* under *name*.
+
+    Args:
+        name: the name used to select the codec
+        module: the codec module, which provides `load()` and `dump()`
+        binary: if `True`, the codec reads and writes bytes instead of
+            text
+        binary_input: if given, overrides *binary* for reading (e.g.,
+            for codecs that read bytes but write text)
+        sniff: a function that takes the beginning of an input (as
+            text, decoded leniently) and returns `True` if it is in
+            the codec's format; codecs are tried in the order they
+            were registered
+        options: keyword arguments always passed to the codec's
+            `load()` and `dump()` (e.g., `representation='dmrs'`)
+    """
+    if binary_input is None:
+        binary_input = binary
+    _codecs[name] = Codec(name, module, binary_input, binary, sniff, options)
+
+
+def get(name):
+    """
+    Return the [Codec] registered under *name*.
+    """
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ValueError('Unknown codec: {}'.format(name))
+
+
+def names():
+    """
+    Return the list of registered codec names.
+    """
+    return list(_codecs)
+
+
+def detect(head):
+    """
+    Return the name of the codec whose format *head* begins with.
+
+    Args:
+        head: the first bytes or characters of an input; gzipped data
+            is decompressed first
+    Returns:
+        the codec name, or `None` if no codec recognizes *head*
+    """
+    if isinstance(head, bytes):
+        if head[:2] == b'\x1f\x8b':
+            head = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head)
+        head = head.decode('utf-8', 'replace')
+    head = head.lstrip()
+    for codec in _codecs.values():
+        if codec.sniff is not None and codec.sniff(head):
+            return codec.name
+    return None
+
+
+def load(src, from_=None, **kwargs):
+    """
+    Deserialize objects from *src*, one at a time.
+
+    Args:
+        src: a filename or a (text or binary) file object
+        from_: the name of the codec of *src*; if `None`, it is
+            detected with [detect]
+        kwargs: keyword arguments for the codec's `load()`
+    Yields:
+        the objects decoded from *src*
+    """
+    fh, to_close = _open_source(src)
+    wrapper = None
+    try:
+        if from_ is None:
+            head = _peek(fh)
+            if not head.strip():
+                return  # nothing to read
+            from_ = detect(head)
+            if from_ is None:
+                raise ValueError('Could not detect the format of the input.')
+        codec = get(from_)
+        if isinstance(fh, io.TextIOBase):
+            if codec.binary_input:
+                raise ValueError(
+                    'The {} codec requires binary input.'.format(codec.name)
+                )
+        elif not codec.binary_input:
+            fh = wrapper = io.TextIOWrapper(fh, encoding='utf-8')
+        options = dict(codec.options, **kwargs)
+        for obj in codec.module.load(fh, **options):
+            yield obj
+    finally:
+        if wrapper is not None:
+            wrapper.detach()  # so the wrapped file is not closed with it
+        for f in to_close:
+            f.close()
+
+
+def dump(dst, objs, to, processes=None, **kwargs):
+    """
+    Serialize *objs* to *dst*, one at a time.
+
+    Args:
+        dst: a filename or a (text or binary) file object
+        objs: an iterable of objects to serialize
+        to: the name of the codec to serialize with
+        processes: if greater than 1, serialize in a pool of this many
+            worker processes (if the codec supports it)
+        kwargs: keyword arguments for the codec's `dump()`
+    """
+    codec = get(to)
+    binary = codec.binary_output
+    options = dict(codec.options, **kwargs)
+    if processes is not None:
+        options['processes'] = processes
+    if isinstance(dst, str):
+        if binary:
+            fh = open(dst, 'wb')
+        else:
+            fh = io.open(dst, 'w', encoding='utf-8')
+        with fh:
+            codec.module.dump(fh, objs, **options)
+    elif isinstance(dst, io.TextIOBase) != binary:
+        codec.module.dump(dst, objs, **options)
+    elif binary:
+        dst.flush()
+        codec.module.dump(dst.buffer, objs, **options)
+        dst.buffer.flush()
+    else:
+        fh = io.TextIOWrapper(dst, encoding='utf-8')
+        try:
+            codec.module.dump(fh, objs, **options)
+        finally:
+            fh.flush()
+            fh.detach()
+
+
+def convert(src, dst, to, from_=None, processes=None, **kwargs):
+    """
+    Read objects from *src* and write them to *dst* in another format.
+
+    Objects are written as soon as they are read, so the input does
+    not need to fit in memory.
+
+    Args:
+        src: a filename or file object to read from
+        dst: a filename or file object to write to
+        to: the name of the codec to write with
+        from_: the name of the codec to read with; if `None`, it is
+            detected from the input
+        processes: if greater than 1, serialize in a pool of this many
+            worker processes
+        kwargs: keyword arguments for the output codec's `dump()`
+    """
+    dump(dst, load(src, from_=from_), to, processes=processes, **kwargs)
+
+
+def _open_source(src):
+    # return a file object that can be peeked at without consuming it
+    to_close = []
+    if isinstance(src, str):
+        src = open(src, 'rb')
+        to_close.append(src)
+    elif isinstance(src, io.TextIOBase):
+        if hasattr(src, 'buffer'):
+            src = src.buffer
+        elif not src.seekable():
+            src = io.StringIO(src.read())
+    elif not hasattr(src, 'peek'):
+        src = io.BufferedReader(src)
+    return src, to_close
+
+
+def _peek(fh):
+    if isinstance(fh, io.TextIOBase):
+        pos = fh.tell()
+        head = fh.read(SNIFF_SIZE)
+        fh.seek(pos)
+        return head
+    return fh.peek(SNIFF_SIZE)[:SNIFF_SIZE]
+
+
+##############################################################################
+##############################################################################
+# Built-in codecs
+
+_xml_re = re.compile(r'<(d?mrs)(?:-list)?[\s/>]')
+_json_re = re.compile(r'\{\s*["}]')
+
+
+def _sniff_xml(tag):
+    def sniff(head):
+        if not head.startswith('<'):
+            return False
+        match = _xml_re.search(head)
+        return match is not None and match.group(1) == tag
+    return sniff
+
+
+def _sniff_jsonl(key):
+    def sniff(head):
+        if _json_re.match(head) is None:
+            return False
+        line = head.split('\n', 1)[0]
+        return key is None or '"{}"'.format(key) in line
+    return sniff
+
+
+register('binmrs', binmrs, binary=True,
+         sniff=lambda head: head.startswith('MRSB'))
+# the XML codecs read bytes so they can decompress gzipped input
+register('mrx', mrx, binary_input=True, sniff=_sniff_xml('mrs'))
+register('dmrx', dmrx, binary_input=True, sniff=_sniff_xml('dmrs'))
+register('simplemrs', simplemrs, sniff=lambda head: head.startswith('['))
+register('simpledmrs', simpledmrs,
+         sniff=lambda head: re.match(r'dmrs\b', head) is not None)
+# the keys of Mrs.to_dict(), Dmrs.to_dict(), and Eds.to_dict()
+register('jsonl', jsonl, sniff=_sniff_jsonl('relations'))
+register('jsonl-dmrs', jsonl, sniff=_sniff_jsonl('links'),
+         representation='dmrs')
+register('jsonl-eds', jsonl, sniff=_sniff_jsonl(None),
+         representation='eds')
+register('eds', eds, sniff=lambda head: head.startswith('{'))
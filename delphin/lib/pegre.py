@@ -1,7 +1,5 @@
-
 import re
 from functools import wraps
-from collections import Sequence
 
 __all__ = [
     'Ignore',
@@ -37,6 +35,40 @@ class PegreChoiceError(PegreError):
 
 Ignore = object()  # just a singleton for identity checking
 
+# PEG functions are called as e(s, state, pos), where s is the full
+# input string, state is the _ParseState of the current parse, and pos
+# is the position to match at. They return a (pos, obj) pair of the
+# end position and the matched value on success, or None on failure.
+# Failures are not raised but reported to the state, which only keeps
+# the expectations at the furthest position any expression failed at.
+
+class _ParseState(object):
+    """
+    The per-parse grammar, memo table, and furthest-failure record.
+    """
+    __slots__ = ('grammar', 'memo', 'depth', 'failpos', 'expected')
+
+    def __init__(self, grammar, packrat=False):
+        self.grammar = grammar
+        self.memo = {} if packrat else None
+        self.depth = 0
+        self.failpos = -1
+        self.expected = []
+
+    def fail(self, pos, msg):
+        if pos > self.failpos:
+            self.failpos = pos
+            self.expected = [msg]
+        elif pos == self.failpos and msg not in self.expected:
+            self.expected.append(msg)
+        return None
+
+    def error(self):
+        if len(self.expected) == 1:
+            return PegreError(self.expected[0], self.failpos)
+        failures = [(msg, self.failpos) for msg in self.expected]
+        return PegreChoiceError(failures, self.failpos)
+
 def valuemap(f):
     """
     Decorator to help PEG functions handle value conversions.
@@ -47,13 +79,14 @@ def valuemap(f):
             val = kwargs['value']
             del kwargs['value']
             _f = f(*args, **kwargs)
-            def valued_f(*args, **kwargs):
-                result = _f(*args, **kwargs)
-                s, obj, span = result
+            def valued_f(s, st, pos):
+                result = _f(s, st, pos)
+                if result is None:
+                    return None
                 if callable(val):
-                    return (s, val(obj), span)
+                    return (result[0], val(result[1]))
                 else:
-                    return (s, val, span)
+                    return (result[0], val)
             return valued_f
         else:
             return f(*args, **kwargs)
@@ -66,10 +99,10 @@ def literal(x):
     """
     xlen = len(x)
     msg = 'Expected: "{}"'.format(x)
-    def match_literal(s, grm, pos):
-        if s[:xlen] == x:
-            return (s[xlen:], x, (pos, pos+xlen))
-        raise PegreError(msg, pos)
+    def match_literal(s, st, pos):
+        if s.startswith(x, pos):
+            return (pos + xlen, x)
+        return st.fail(pos, msg)
     return match_literal
 
 @valuemap
@@ -82,22 +115,39 @@ def regex(r):
     else:
         p = r
     msg = 'Expected to match: {}'.format(p.pattern)
-    def match_regex(s, grm, pos):
-        m = p.match(s)
+    match = p.match
+    def match_regex(s, st, pos):
+        m = match(s, pos)
         if m is not None:
-            start, end = m.span()
-            return (s[m.end():], m.group(), (pos+start, pos+end))
-        raise PegreError(msg, pos)
+            return (m.end(), m.group())
+        return st.fail(pos, msg)
     return match_regex
 
 @valuemap
 def nonterminal(n):
     """
     Create a PEG function to match a nonterminal.
+
+    In packrat mode the result of the nonterminal at each position is
+    memoized. The memo table is cleared whenever a nonterminal called
+    directly from the start expression (e.g., one item of a list) is
+    completed, as parsing does not return to positions before it.
     """
-    def match_nonterminal(s, grm, pos):
-        expr = grm[n]
-        return expr(s, grm, pos)
+    def match_nonterminal(s, st, pos):
+        memo = st.memo
+        if memo is None:
+            return st.grammar[n](s, st, pos)
+        key = (n, pos)
+        if key in memo:
+            return memo[key]
+        st.depth += 1
+        result = st.grammar[n](s, st, pos)
+        st.depth -= 1
+        if st.depth == 0 and result is not None:
+            memo.clear()
+        else:
+            memo[key] = result
+        return result
     return match_nonterminal
 
 @valuemap
@@ -105,10 +155,11 @@ def and_next(e):
     """
     Create a PEG function for positive lookahead.
     """
-    def match_and_next(s, grm, pos):
-        if e(s, grm, pos):
-            return (s, Ignore, (pos, pos))
-        raise PegreError(msg, pos)
+    msg = 'Expected to be followed by: {}'.format(repr(e))
+    def match_and_next(s, st, pos):
+        if e(s, st, pos) is not None:
+            return (pos, Ignore)
+        return st.fail(pos, msg)
     return match_and_next
 
 @valuemap
@@ -116,10 +167,17 @@ def not_next(e):
     """
     Create a PEG function for negative lookahead.
     """
-    def match_not_next(s, grm, pos):
-        if not e(s, grm, pos):
-            return (s, Ignore, (pos, pos))
-        raise PegreError(msg, pos)
+    msg = 'Expected not to be followed by: {}'.format(repr(e))
+    def match_not_next(s, st, pos):
+        # failures of e are what we want, so don't report them; e
+        # gets a fresh list, as fail() may append to the current one
+        failpos, expected = st.failpos, st.expected
+        st.expected = []
+        result = e(s, st, pos)
+        st.failpos, st.expected = failpos, expected
+        if result is None:
+            return (pos, Ignore)
+        return st.fail(pos, msg)
     return match_not_next
 
 @valuemap
@@ -127,15 +185,16 @@ def sequence(*es):
     """
     Create a PEG function to match a sequence.
     """
-    def match_sequence(s, grm, pos):
+    def match_sequence(s, st, pos):
         data = []
-        start = pos
         for e in es:
-            s, obj, span = e(s, grm, pos)
-            pos = span[1]
+            result = e(s, st, pos)
+            if result is None:
+                return None
+            pos, obj = result
             if obj is not Ignore:
                 data.append(obj)
-        return (s, data, (start, pos))
+        return (pos, data)
     return match_sequence
 
 @valuemap
@@ -143,16 +202,12 @@ def choice(*es):
     """
     Create a PEG function to match an ordered choice.
     """
-    msg = 'Expected one of: {}'.format(', '.join(map(repr, es)))
-    def match_choice(s, grm, pos):
-        errs = []
+    def match_choice(s, st, pos):
         for e in es:
-            try:
-                return e(s, grm, pos)
-            except PegreError as ex:
-                errs.append((ex.message, ex.position))
-        if errs:
-            raise PegreChoiceError(errs, pos)
+            result = e(s, st, pos)
+            if result is not None:
+                return result
+        return None
     return match_choice
 
 @valuemap
@@ -160,11 +215,11 @@ def optional(e, default=Ignore):
     """
     Create a PEG function to optionally match an expression.
     """
-    def match_optional(s, grm, pos):
-        try:
-            return e(s, grm, pos)
-        except PegreError:
-            return (s, default, (pos, pos))
+    def match_optional(s, st, pos):
+        result = e(s, st, pos)
+        if result is None:
+            return (pos, default)
+        return result
     return match_optional
 
 @valuemap
@@ -177,29 +232,11 @@ def zero_or_more(e, delimiter=None):
         delimiter: an optional expression to match between the
             primary *e* matches.
     """
-    if delimiter is None:
-        delimiter = lambda s, grm, pos: (s, Ignore, (pos, pos))
-    def match_zero_or_more(s, grm, pos):
-        start = pos
-        try:
-            s, obj, span = e(s, grm, pos)
-            pos = span[1]
-            data = [] if obj is Ignore else [obj]
-        except PegreError:
-            return (s, [], (pos, pos))
-        try:
-            while True:
-                s, obj, span = delimiter(s, grm, pos)
-                pos = span[1]
-                if obj is not Ignore:
-                    data.append(obj)
-                s, obj, span = e(s, grm, pos)
-                pos = span[1]
-                if obj is not Ignore:
-                    data.append(obj)
-        except PegreError:
-            pass
-        return (s, data, (start, pos))
+    def match_zero_or_more(s, st, pos):
+        result = e(s, st, pos)
+        if result is None:
+            return (pos, [])
+        return _match_rest(e, delimiter, s, st, result)
     return match_zero_or_more
 
 @valuemap
@@ -212,29 +249,36 @@ def one_or_more(e, delimiter=None):
         delimiter: an optional expression to match between the
             primary *e* matches.
     """
-    if delimiter is None:
-        delimiter = lambda s, grm, pos: (s, Ignore, (pos, pos))
-    msg = 'Expected one or more of: {}'.format(repr(e))
-    def match_one_or_more(s, grm, pos):
-        start = pos
-        s, obj, span = e(s, grm, pos)
-        pos = span[1]
-        data = [] if obj is Ignore else [obj]
-        try:
-            while True:
-                s, obj, span = delimiter(s, grm, pos)
-                pos = span[1]
-                if obj is not Ignore:
-                    data.append(obj)
-                s, obj, span = e(s, grm, pos)
-                pos = span[1]
-                if obj is not Ignore:
-                    data.append(obj)
-        except PegreError:
-            pass
-        return (s, data, (start, pos))
+    def match_one_or_more(s, st, pos):
+        result = e(s, st, pos)
+        if result is None:
+            return None
+        return _match_rest(e, delimiter, s, st, result)
     return match_one_or_more
 
+def _match_rest(e, delimiter, s, st, first):
+    # match (delimiter e)* after the first match of e; a delimiter is
+    # only consumed if an e follows it
+    pos, obj = first
+    data = [] if obj is Ignore else [obj]
+    while True:
+        if delimiter is None:
+            dpos, dobj = pos, Ignore
+        else:
+            result = delimiter(s, st, pos)
+            if result is None:
+                break
+            dpos, dobj = result
+        result = e(s, st, dpos)
+        if result is None or result[0] == pos:
+            break  # stop if nothing (not even a delimiter) was consumed
+        if dobj is not Ignore:
+            data.append(dobj)
+        pos, obj = result
+        if obj is not Ignore:
+            data.append(obj)
+    return (pos, data)
+
 @valuemap
 def bounded(pre, expr, post):
     return sequence(pre, expr, post, value=lambda x: x[1])
@@ -247,11 +291,22 @@ def delimited(expr, delim):
 class Peg(object):
     """
     A class to assist in parsing using a grammar of PEG functions.
+
+    Args:
+        grammar: a mapping of nonterminal names to PEG functions
+        start: the name of the start nonterminal
+        packrat: if `True`, memoize nonterminal results by position,
+            avoiding the repeated parsing of the same spans when
+            choices and optional expressions backtrack
     """
-    def __init__(self, grammar, start='start'):
+    def __init__(self, grammar, start='start', packrat=False):
         self.start = start
         self.grammar = grammar
+        self.packrat = packrat
 
     def parse(self, s):
-        result = self.grammar[self.start](s, self.grammar, 0)
+        st = _ParseState(self.grammar, packrat=self.packrat)
+        result = self.grammar[self.start](s, st, 0)
+        if result is None:
+            raise st.error()
         return result[1]
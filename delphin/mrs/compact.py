@@ -0,0 +1,788 @@
+"""
+A compact, array-backed storage for [Xmrs] objects.
+
+An [Xmrs] object indexes its variables with a dictionary of
+dictionaries and keeps each EP as a tuple with its own argument
+dictionary. This makes queries fast, but a typical sentence needs
+tens of kilobytes, which is too much for holding large treebanks in
+memory. A [CompactXmrs] has the same public API as [Xmrs] but stores
+its contents in a few flat arrays of integers:
+
+* strings (roles, properties, constants, etc.) and [Preds] are kept
+  once in each object's symbol and pred tables, and the arrays store
+  their indices (the strings themselves are interned, so they are
+  shared with other objects but freed with the last one using them)
+* variables are given integer ids, which index the list of variable
+  names (the names themselves are interned); a dictionary maps names
+  back to ids, and another maps nodeids to EP records
+* EPs, arguments, variable properties, HCONS, and ICONS are each
+  stored as fixed-width records in an `array.array`
+
+EPs, HCONS, and ICONS are rebuilt when they are requested, and
+structural queries (e.g., [CompactXmrs.outgoing_args]) scan the
+arrays, so a [CompactXmrs] is slower to query than an [Xmrs] but
+several times smaller (about 3.3 kB instead of 26 kB for a typical
+sentence; see `bench/mrs_memory.py`). Code that reads the internal
+tables of an [Xmrs] (e.g., the serializers) still works: the tables
+are built on request from a full [Xmrs] expansion. Only the
+expansions of the most recently used objects are kept (see
+[set_expansion_cache_size]); an expansion is discarded when its
+object is changed or [CompactXmrs.clear_cache] is called.
+
+    >>> from delphin.mrs.compact import CompactXmrs
+    >>> m = CompactXmrs.from_xmrs(xmrs)
+    >>> m == xmrs
+    True
+"""
+
+from array import array
+from collections import OrderedDict
+import threading
+import weakref
+
+try:
+    from pickle import PickleBuffer
+except ImportError:
+    PickleBuffer = None  # out-of-band buffers need Python 3.8+
+
+try:
+    from sys import intern
+except ImportError:
+    pass  # Python 2 has intern() as a builtin
+
+from delphin.exceptions import XmrsError
+from .components import (
+    ElementaryPredication, HandleConstraint, IndividualConstraint,
+    Lnk, _var_info, var_sort, var_id
+)
+from .config import IVARG_ROLE
+from .xmrs import Xmrs, DerivedCacheInfo
+
+# widths of the records in each array
+_EP_WIDTH = 6  # nodeid, pred, label, first arg, cfrom, cto
+_ARG_WIDTH = 2  # role, value (a variable id, or -1 - a constant's symbol)
+_PROP_WIDTH = 3  # variable, property, value
+_HC_WIDTH = 3  # hi, relation, lo
+
+
+def _pred_key(pred):
+    # Preds that compare equal may have different strings, so don't use
+    # the pred itself as the key
+    return (pred.type, pred.string)
+
+
+def _expanded(name):
+    # the dictionary tables of Xmrs, from the cached expansion
+    return property(lambda self: getattr(self._expansion(), name))
+
+
+class _ExpansionCache(object):
+    """
+    A bounded mapping of [CompactXmrs] objects to their [Xmrs]
+    expansions that discards the least recently used entry when it is
+    full. Entries are keyed by object id and only hold a weak
+    reference to the object, so they do not keep it alive. It is safe
+    to use from several threads.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, obj):
+        # call with the lock held
+        entry = self._data.get(id(obj))
+        if entry is not None and entry[0]() is obj:
+            return entry[1]
+        return None
+
+    def get(self, obj):
+        key = id(obj)
+        data = self._data
+        with self._lock:
+            x = self._lookup(obj)
+            if x is not None:
+                try:
+                    data.move_to_end(key)
+                except AttributeError:  # Python2
+                    data[key] = data.pop(key)
+                return x
+        x = obj.to_xmrs()
+        if self.maxsize > 0:
+            with self._lock:
+                data[key] = (weakref.ref(obj), x)
+                while len(data) > max(self.maxsize, 0):
+                    data.popitem(last=False)
+        return x
+
+    def peek(self, obj):
+        with self._lock:
+            return self._lookup(obj)
+
+    def discard(self, obj):
+        with self._lock:
+            if self._lookup(obj) is not None:
+                del self._data[id(obj)]
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            data = self._data
+            while len(data) > max(maxsize, 0):
+                data.popitem(last=False)
+
+
+_expansions = _ExpansionCache(32)
+
+
+def set_expansion_cache_size(maxsize):
+    """
+    Set the number of [Xmrs] expansions of [CompactXmrs] objects that
+    are kept.
+
+    Expansions are built when a [CompactXmrs] is used where its
+    internal tables or derived structures (e.g., [links]) are needed,
+    and only those of the most recently used objects are kept. A
+    *maxsize* of `0` builds a new expansion every time.
+    """
+    _expansions.resize(maxsize)
+
+
+class CompactXmrs(Xmrs):
+    """
+    An [Xmrs] whose contents are stored in flat integer arrays.
+
+    The arguments are the same as for [Xmrs], and [EPs], HCONS, and
+    ICONS may also be added with [CompactXmrs.add_eps],
+    [CompactXmrs.add_hcons], and [CompactXmrs.add_icons]. Use
+    [CompactXmrs.from_xmrs] to convert an existing [Xmrs], and
+    [CompactXmrs.to_xmrs] to convert it back.
+    """
+
+    def __init__(self, top=None, index=None, xarg=None,
+                 eps=None, hcons=None, icons=None, vars=None,
+                 lnk=None, surface=None, identifier=None):
+        self._top = top
+        self._index = index
+        self._xarg = xarg
+        self._varnames = []
+        self._varids = {}  # {variable: id}
+        self._symbols = []
+        self._preds = []
+        self._epdata = array('i')
+        self._epids = {}  # {nodeid: EP index}
+        self._argdata = array('i')
+        self._propdata = array('i')
+        self._hcdata = array('i')
+        self._icdata = array('i')
+        self._epextra = None  # {ep index: (lnk, surface, base)}
+
+        for var in (top, index, xarg):
+            if var is not None:
+                self._var_id(var)
+
+        if vars is not None:
+            _propdata = self._propdata
+            symids = self._symbol_ids()
+            for var, props in vars.items():
+                vid = self._var_id(var)
+                if hasattr(props, 'items'):
+                    props = props.items()
+                for prop, val in props:
+                    _propdata.extend((vid, self._symbol(prop, symids),
+                                      self._symbol(val, symids)))
+        if eps is not None:
+            self.add_eps(eps)
+        if hcons is not None:
+            self.add_hcons(hcons)
+        if icons is not None:
+            self.add_icons(icons)
+
+        self.lnk = lnk
+        self.surface = surface
+        self.identifier = identifier
+
+    @classmethod
+    def from_xmrs(cls, xmrs):
+        """
+        Return a [CompactXmrs] with the same contents as *xmrs*.
+        """
+        return cls(
+            top=xmrs.top, index=xmrs.index, xarg=xmrs.xarg,
+            eps=xmrs.eps(), hcons=xmrs.hcons(), icons=xmrs.icons(),
+            vars=OrderedDict(
+                (var, xmrs.properties(var, as_list=True))
+                for var in xmrs.variables()
+            ),
+            lnk=xmrs.lnk, surface=xmrs.surface, identifier=xmrs.identifier
+        )
+
+    def to_xmrs(self):
+        """
+        Return a regular [Xmrs] with the same contents.
+        """
+        return Xmrs.from_trusted_parts(
+            top=self.top, index=self.index, xarg=self.xarg,
+            eps=self.eps(), hcons=self.hcons(), icons=self.icons(),
+            vars=OrderedDict(
+                (var, self.properties(var, as_list=True))
+                for var in self._varnames
+            ),
+            lnk=self.lnk, surface=self.surface, identifier=self.identifier
+        )
+
+    # derived structures are cached on the expansion
+    _cache = _expanded('_cache')
+    _nodeids = _expanded('_nodeids')
+    _eps = _expanded('_eps')
+    _hcons = _expanded('_hcons')
+    _icons = _expanded('_icons')
+    _vars = _expanded('_vars')
+
+    def _var_id(self, var):
+        # return the id of *var*, adding it if it's new
+        vid = self._varids.get(var)
+        if vid is None:
+            if isinstance(var, str):
+                var = intern(var)
+            vid = self._varids[var] = len(self._varnames)
+            self._varnames.append(var)
+        return vid
+
+    def _symbol_ids(self):
+        return dict((s, i) for i, s in enumerate(self._symbols))
+
+    def _symbol(self, s, symids):
+        # return the id of symbol *s*, adding it if it's new; *symids*
+        # is from _symbol_ids() and is updated
+        sid = symids.get(s)
+        if sid is None:
+            sid = symids[s] = len(self._symbols)
+            self._symbols.append(intern(s) if isinstance(s, str) else s)
+        return sid
+
+    def _pred_ids(self):
+        return dict((_pred_key(p), i) for i, p in enumerate(self._preds))
+
+    def _pred_id(self, pred, predids):
+        # like _symbol(), for preds; *predids* is from _pred_ids()
+        if pred is None:
+            return -1
+        key = _pred_key(pred)
+        pid = predids.get(key)
+        if pid is None:
+            pid = predids[key] = len(self._preds)
+            self._preds.append(pred)
+        return pid
+
+    def _expansion(self):
+        return _expansions.get(self)
+
+    def _find_var(self, var):
+        try:
+            return self._varids.get(var, -1)
+        except TypeError:  # unhashable
+            return -1
+
+    def __reduce_ex__(self, protocol):
+        # the symbol and pred tables go along with the arrays, whose
+        # ids index them; with protocol 5 the arrays may be sent as
+        # out-of-band buffers
+        arrays = (self._epdata, self._argdata, self._propdata,
+                  self._hcdata, self._icdata)
+        if protocol >= 5 and PickleBuffer is not None:
+            arrays = tuple(PickleBuffer(a) for a in arrays)
+        state = (
+            self.top, self.index, self.xarg,
+            self.lnk, self.surface, self.identifier,
+            self._varnames, self._epextra, self._symbols, self._preds,
+            arrays
+        )
+        return (_unpickle_compact_xmrs, (self.__class__, state))
+
+    def add_eps(self, eps):
+        """
+        Incorporate the list of [EPs] given by *eps*.
+        """
+        self.clear_cache()
+        _epdata, _argdata = self._epdata, self._argdata
+        varids, epids = self._varids, self._epids
+        symids, predids = self._symbol_ids(), self._pred_ids()
+        for ep in eps:
+            try:
+                if not isinstance(ep, ElementaryPredication):
+                    ep = ElementaryPredication(*ep)
+            except TypeError:
+                raise XmrsError('Invalid EP data: {}'.format(repr(ep)))
+            nodeid, lbl, lnk = ep.nodeid, ep.label, ep.lnk
+            if nodeid in epids:
+                raise XmrsError(
+                    'EP already exists in Xmrs: {} ({})'
+                    .format(nodeid, ep[1])
+                )
+            cfrom = cto = -1
+            if (lnk is not None and lnk.type == Lnk.CHARSPAN
+                    and lnk.data[0] >= 0 and lnk.data[1] >= 0):
+                cfrom, cto = lnk.data
+                lnk = None
+            if lnk is not None or ep.surface is not None or ep.base is not None:
+                if self._epextra is None:
+                    self._epextra = {}
+                self._epextra[len(_epdata) // _EP_WIDTH] = (
+                    lnk, ep.surface, ep.base
+                )
+            epids[nodeid] = len(_epdata) // _EP_WIDTH
+            _epdata.extend((
+                nodeid,
+                self._pred_id(ep.pred, predids),
+                -1 if lbl is None else self._var_id(lbl),
+                len(_argdata) // _ARG_WIDTH,
+                cfrom,
+                cto
+            ))
+            for role, val in ep.args.items():
+                if val in varids or _var_info(val) is not None:
+                    val = self._var_id(val)
+                else:
+                    val = -1 - self._symbol(val, symids)
+                _argdata.extend((self._symbol(role, symids), val))
+
+    def add_hcons(self, hcons):
+        """
+        Incorporate the list of [HandleConstraints] given by *hcons*.
+        """
+        self.clear_cache()
+        _hcdata = self._hcdata
+        his = set(_hcdata[::_HC_WIDTH])
+        symids = self._symbol_ids()
+        for hc in hcons:
+            try:
+                if not isinstance(hc, HandleConstraint):
+                    hc = HandleConstraint(*hc)
+            except TypeError:
+                raise XmrsError('Invalid HCONS data: {}'.format(repr(hc)))
+            lo = self._var_id(hc.lo)
+            hi = self._var_id(hc.hi)
+            if hi in his:
+                raise XmrsError(
+                    'Handle constraint already exists for hole %s.' % hc.hi
+                )
+            his.add(hi)
+            _hcdata.extend((hi, self._symbol(hc.relation, symids), lo))
+
+    def add_icons(self, icons):
+        """
+        Incorporate the [IndividualConstraints] given by *icons*.
+        """
+        self.clear_cache()
+        _icdata = self._icdata
+        symids = self._symbol_ids()
+        for ic in icons:
+            try:
+                if not isinstance(ic, IndividualConstraint):
+                    ic = IndividualConstraint(*ic)
+            except TypeError:
+                raise XmrsError('Invalid ICONS data: {}'.format(repr(ic)))
+            right = self._var_id(ic.right)
+            left = self._var_id(ic.left)
+            _icdata.extend((left, self._symbol(ic.relation, symids), right))
+
+    def __contains__(self, obj):
+        return obj in self._epids or obj in self._varids
+
+    # decoding records
+
+    def _ep_index(self, nodeid):
+        try:
+            return self._epids[nodeid]
+        except (KeyError, TypeError):
+            raise KeyError(nodeid)
+
+    def _arg_range(self, i):
+        _epdata = self._epdata
+        start = _epdata[i * _EP_WIDTH + 3]
+        if (i + 1) * _EP_WIDTH < len(_epdata):
+            end = _epdata[(i + 1) * _EP_WIDTH + 3]
+        else:
+            end = len(self._argdata) // _ARG_WIDTH
+        return start, end
+
+    def _arg_items(self, i):
+        # (role, value id) pairs for the EP at index *i*
+        _argdata, _symbols = self._argdata, self._symbols
+        start, end = self._arg_range(i)
+        return [(_symbols[_argdata[j]], _argdata[j + 1])
+                for j in range(start * _ARG_WIDTH, end * _ARG_WIDTH,
+                               _ARG_WIDTH)]
+
+    def _value(self, val):
+        return self._varnames[val] if val >= 0 else self._symbols[-1 - val]
+
+    def _args(self, i):
+        _value = self._value
+        return dict((role, _value(val)) for role, val in self._arg_items(i))
+
+    def _ep(self, i):
+        nodeid, pid, lbl, _, cfrom, cto = (
+            self._epdata[i * _EP_WIDTH:(i + 1) * _EP_WIDTH]
+        )
+        lnk = surface = base = None
+        if self._epextra is not None and i in self._epextra:
+            lnk, surface, base = self._epextra[i]
+        if cfrom >= 0:
+            lnk = Lnk.charspan(cfrom, cto)
+        return ElementaryPredication(
+            nodeid,
+            self._preds[pid] if pid >= 0 else None,
+            self._varnames[lbl] if lbl >= 0 else None,
+            self._args(i),
+            lnk, surface, base
+        )
+
+    def _ivrole(self):
+        # the symbol id of the intrinsic argument role, or -1
+        try:
+            return self._symbols.index(IVARG_ROLE)
+        except ValueError:
+            return -1
+
+    def _iv(self, i, ivrole=None):
+        # the variable id of the intrinsic argument of the EP at index *i*
+        if ivrole is None:
+            ivrole = self._ivrole()
+        _argdata = self._argdata
+        start, end = self._arg_range(i)
+        for j in range(start * _ARG_WIDTH, end * _ARG_WIDTH, _ARG_WIDTH):
+            if _argdata[j] == ivrole and _argdata[j + 1] >= 0:
+                return _argdata[j + 1]
+        return -1
+
+    def _ivs(self):
+        ivrole = self._ivrole()
+        return [self._iv(i, ivrole)
+                for i in range(len(self._epdata) // _EP_WIDTH)]
+
+    # basic access to internal structures
+
+    def nodeids(self, ivs=None, quantifier=None):
+        """
+        Return the list of nodeids given by *ivs*, or all nodeids.
+
+        Args:
+            ivs: the intrinsic variables of the predications to select;
+                if `None`, return all nodeids (but see *quantifier*)
+            quantifier: if `True`, only return nodeids of quantifiers;
+                if `False`, only return non-quantifiers; if `None` (the
+                default), return both
+        """
+        all_nids = self._epdata[::_EP_WIDTH].tolist()
+        if ivs is None:
+            nids = all_nids
+        else:
+            epivs = self._ivs()
+            nids = []
+            for iv in ivs:
+                vid = self._find_var(iv)
+                found = [nid for nid, epiv in zip(all_nids, epivs)
+                         if vid >= 0 and epiv == vid]
+                if not found:
+                    raise KeyError(iv)
+                nids.extend(found)
+        if quantifier is not None:
+            nids = [n for n in nids if self.ep(n).is_quantifier()==quantifier]
+        return nids
+
+    def ep(self, nodeid):
+        """
+        Return the [ElementaryPredication] with the given *nodeid*.
+        """
+        return self._ep(self._ep_index(nodeid))
+
+    def eps(self, nodeids=None):
+        """
+        Return the [EPs] with the given *nodeid*, or all [EPs].
+
+        Args:
+            nodeids: an iterable of nodeids of [EPs] to return; if
+                `None`, return all [EPs]
+        """
+        if nodeids is None:
+            return [self._ep(i)
+                    for i in range(len(self._epdata) // _EP_WIDTH)]
+        return [self.ep(nid) for nid in nodeids]
+
+    def hcon(self, hi):
+        """
+        Return the [HandleConstraint] with high variable *hi*.
+        """
+        vid = self._find_var(hi)
+        for hc_hi, hc in zip(self._hcdata[::_HC_WIDTH], self.hcons()):
+            if hc_hi == vid:
+                return hc
+        raise KeyError(hi)
+
+    def hcons(self):
+        """
+        Return the list of all [HandleConstraints].
+        """
+        _hcdata, _varnames, _symbols = (
+            self._hcdata, self._varnames, self._symbols
+        )
+        return [
+            HandleConstraint(_varnames[_hcdata[j]], _symbols[_hcdata[j + 1]],
+                             _varnames[_hcdata[j + 2]])
+            for j in range(0, len(_hcdata), _HC_WIDTH)
+        ]
+
+    def icons(self, left=None):
+        """
+        Return the [ICONS] with left variable *left*, or all [ICONS].
+
+        Args:
+            left: the left variable of the [ICONS] to return; if `None`,
+                return all [ICONS]
+        """
+        _icdata, _varnames, _symbols = (
+            self._icdata, self._varnames, self._symbols
+        )
+        icons = [
+            IndividualConstraint(_varnames[_icdata[j]],
+                                 _symbols[_icdata[j + 1]],
+                                 _varnames[_icdata[j + 2]])
+            for j in range(0, len(_icdata), _HC_WIDTH)
+        ]
+        if left is not None:
+            icons = [ic for ic in icons if ic.left == left]
+            if not icons:
+                raise KeyError(left)
+        return icons
+
+    def variables(self):
+        """
+        Return the list of all variables.
+        """
+        return list(self._varnames)
+
+    def cache_info(self):
+        """
+        Return the statistics of the derived-structure cache, which is
+        kept on the [Xmrs] expansion (if it is in the expansion cache).
+        """
+        x = _expansions.peek(self)
+        if x is None:
+            return DerivedCacheInfo(0, 0, 0)
+        return x.cache_info()
+
+    def clear_cache(self):
+        """
+        Discard the [Xmrs] expansion and its cached derived structures.
+        """
+        _expansions.discard(self)
+
+    def var_sort(self, var):
+        """
+        Return the sort of variable *var* (e.g., `'x'` for `'x3'`).
+        """
+        return var_sort(var)
+
+    def var_id(self, var):
+        """
+        Return the integer id of variable *var* (e.g., `3` for `'x3'`).
+        """
+        return var_id(var)
+
+    # access to internal sub-structures
+
+    def properties(self, var_or_nodeid, as_list=False):
+        """
+        Return a dictionary of variable properties for *var_or_nodeid*.
+
+        Args:
+            var_or_nodeid: if a variable, return the properties
+                associated with the variable; if a nodeid, return the
+                properties associated with the intrinsic variable of the
+                predication given by the nodeid
+        """
+        vid = self._find_var(var_or_nodeid)
+        if vid < 0:
+            vid = self._iv(self._ep_index(var_or_nodeid))
+        _propdata, _symbols = self._propdata, self._symbols
+        props = [
+            (_symbols[_propdata[j + 1]], _symbols[_propdata[j + 2]])
+            for j in range(0, len(_propdata), _PROP_WIDTH)
+            if vid >= 0 and _propdata[j] == vid
+        ]
+        if not as_list:
+            props = dict(props)
+        return props
+
+    def pred(self, nodeid):
+        """
+        Return the [Pred] object for the predication given by *nodeid*.
+        """
+        pid = self._epdata[self._ep_index(nodeid) * _EP_WIDTH + 1]
+        return self._preds[pid] if pid >= 0 else None
+
+    def preds(self, nodeids=None):
+        """
+        Return the [Pred] objects for *nodeids*, or all [Preds].
+
+        Args:
+            nodeids: an iterable of nodeids of predications to return
+                [Preds] from; if `None`, return all [Preds]
+        """
+        if nodeids is None:
+            nodeids = self.nodeids()
+        return [self.pred(nid) for nid in nodeids]
+
+    def label(self, nodeid):
+        """
+        Return the label of the predication given by *nodeid*
+        """
+        lbl = self._epdata[self._ep_index(nodeid) * _EP_WIDTH + 2]
+        return self._varnames[lbl] if lbl >= 0 else None
+
+    def labels(self, nodeids=None):
+        """
+        Return the list of labels for *nodeids*, or all labels.
+
+        See [Xmrs.labels].
+        """
+        if nodeids is None:
+            nodeids = self.nodeids()
+        return [self.label(nid) for nid in nodeids]
+
+    def args(self, nodeid):
+        """
+        Return the arguments for the predication given by *nodeid*.
+
+        See [Xmrs.args].
+        """
+        return self._args(self._ep_index(nodeid))
+
+    # calculated sub-structures
+
+    def outgoing_args(self, nodeid):
+        """
+        Return the arguments going from *nodeid* to other predications.
+
+        See [Xmrs.outgoing_args].
+        """
+        _epdata = self._epdata
+        lbls = set(_epdata[2::_EP_WIDTH])
+        his = set(self._hcdata[::_HC_WIDTH])
+        ivs = set(self._ivs())
+        args = {}
+        for role, val in self._arg_items(self._ep_index(nodeid)):
+            # don't include constant args or intrinsic args
+            if role == IVARG_ROLE or val < 0:
+                continue
+            # only include if HCONS or pointing to other IV or LBL
+            if val in his or val in ivs or val in lbls:
+                args[role] = self._varnames[val]
+        return args
+
+    def incoming_args(self, nodeid):
+        """
+        Return the arguments that target *nodeid*.
+
+        See [Xmrs.incoming_args].
+        """
+        i = self._ep_index(nodeid)
+        _epdata, _hcdata, _varnames = self._epdata, self._hcdata, self._varnames
+        nids = _epdata[::_EP_WIDTH]
+        lbl = _epdata[i * _EP_WIDTH + 2]
+        iv = self._iv(i)
+        # holes whose lo handle is the label, for qeq-selected args
+        his = set(_hcdata[j] for j in range(0, len(_hcdata), _HC_WIDTH)
+                  if lbl >= 0 and _hcdata[j + 2] == lbl)
+        in_args = {}
+        for j, nid in enumerate(nids):
+            if _epdata[j * _EP_WIDTH + 2] in his:
+                in_args.setdefault(nid, {})['LBL'] = (
+                    _varnames[_epdata[j * _EP_WIDTH + 2]]
+                )
+            for role, val in self._arg_items(j):
+                if val < 0:
+                    continue
+                # ignore intrinsic args, even if shared
+                if (val == iv and role != IVARG_ROLE) or val == lbl or val in his:
+                    in_args.setdefault(nid, {})[role] = _varnames[val]
+        return in_args
+
+    def labelset(self, label):
+        """
+        Return the list of nodeids for predications that share *label*.
+
+        Args:
+            label: the label that returned nodeids share.
+        Returns:
+            A list of nodeids, which may be an empty list.
+        """
+        vid = self._find_var(label)
+        _epdata = self._epdata
+        return [nid for nid, lbl in zip(_epdata[::_EP_WIDTH],
+                                        _epdata[2::_EP_WIDTH])
+                if vid >= 0 and lbl == vid]
+
+    # the remaining structural queries are rare enough to be done on
+    # the expansion
+
+    def labelset_heads(self, label):
+        """
+        Return the heads of the labelset selected by *label*.
+
+        See [Xmrs.labelset_heads].
+        """
+        return self._expansion().labelset_heads(label)
+
+    def subgraph(self, nodeids):
+        """
+        Return a [CompactXmrs] object with only the specified *nodeids*.
+
+        See [Xmrs.subgraph].
+        """
+        return CompactXmrs.from_xmrs(self._expansion().subgraph(nodeids))
+
+    def is_connected(self):
+        """
+        Return `True` if the [Xmrs] represents a connected graph.
+
+        See [Xmrs.is_connected].
+        """
+        return self._expansion().is_connected()
+
+    def validate(self, report=False):
+        """
+        Check that the Xmrs is well-formed.
+
+        See [Xmrs.validate].
+        """
+        return self._expansion().validate(report=report)
+
+
+def _unpickle_compact_xmrs(cls, state):
+    (top, index, xarg, lnk, surface, identifier,
+     varnames, epextra, symbols, preds, arrays) = state
+    x = cls.__new__(cls)
+    x._top, x._index, x._xarg = top, index, xarg
+    x.lnk, x.surface, x.identifier = lnk, surface, identifier
+    x._varnames = [intern(var) if isinstance(var, str) else var
+                   for var in varnames]
+    x._varids = dict((var, i) for i, var in enumerate(x._varnames))
+    x._symbols = [intern(s) if isinstance(s, str) else s for s in symbols]
+    x._preds = list(preds)
+    x._epextra = epextra
+    (x._epdata, x._argdata, x._propdata,
+     x._hcdata, x._icdata) = map(_as_array, arrays)
+    x._epids = dict((nid, i) for i, nid in enumerate(x._epdata[::_EP_WIDTH]))
+    return x
+
+
+def _as_array(data):
+    if isinstance(data, array):
+        return data
+    # a bytearray, or a buffer (e.g., a PickleBuffer) given out of band
+    a = array('i')
+    a.frombytes(memoryview(data).cast('B'))
+    return a
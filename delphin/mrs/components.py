@@ -5,13 +5,18 @@ Classes and functions for working with the components of *MRS objects.
 
 import re
 import logging
-from collections import namedtuple
+import threading
+from collections import namedtuple, OrderedDict
 try:
     from collections.abc import MutableMapping
 except ImportError:
     from collections import MutableMapping  # Python2
 from itertools import starmap
 from functools import total_ordering
+try:
+    from sys import intern
+except ImportError:
+    pass  # Python 2 has intern() as a builtin
 
 from delphin.exceptions import (XmrsError, XmrsStructureError)
 from .config import (
@@ -30,6 +35,34 @@ from .config import (
 var_re = re.compile(r'^([-\w]*\D)(\d+)$')
 
 
+# Parsed variables are interned in a table mapping variable strings to
+# (sort, vid) pairs (or to None for strings that are not variables), so
+# each distinct string is only matched against var_re once. The table
+# is cleared when it reaches _VAR_TABLE_SIZE entries.
+_var_table = {}
+_VAR_TABLE_SIZE = 100000
+
+
+def _var_info(v):
+    """
+    Return the interned (sort, vid) pair for *v*, or `None` if *v* is
+    not a valid variable string.
+    """
+    try:
+        return _var_table[v]
+    except KeyError:
+        pass
+    match = var_re.match(v)
+    if match is None:
+        info = None
+    else:
+        info = (intern(match.group(1)), int(match.group(2)))
+    if len(_var_table) >= _VAR_TABLE_SIZE:
+        _var_table.clear()
+    _var_table[v] = info
+    return info
+
+
 def sort_vid_split(vs):
     """Split a valid variable string into the variable sort and id."""
     match = var_re.match(vs)
@@ -41,12 +74,29 @@ def sort_vid_split(vs):
 
 def var_sort(v):
     """Return the sort of a valid variable string."""
-    return sort_vid_split(v)[0]
+    info = _var_info(v)
+    if info is None:
+        raise ValueError('Invalid variable string: {}'.format(str(v)))
+    return info[0]
 
 
 def var_id(v):
     """Return the integer id of a valid variable string."""
-    return int(sort_vid_split(v)[1])
+    info = _var_info(v)
+    if info is None:
+        raise ValueError('Invalid variable string: {}'.format(str(v)))
+    return info[1]
+
+
+def _make_var(sort, vid):
+    """
+    Return the variable string for *sort* and *vid*.
+    """
+    varstring = '{}{}'.format(sort, vid)
+    # the parts are known, so there's no need to parse it later
+    if len(_var_table) < _VAR_TABLE_SIZE:
+        _var_table[varstring] = (intern(sort), vid)
+    return varstring
 
 
 class _VarGenerator(object):
@@ -70,7 +120,7 @@ class _VarGenerator(object):
         vid, index = self.vid, self.index
         while vid in index:
             vid += 1
-        varstring = '{}{}'.format(sort, vid)
+        varstring = _make_var(sort, vid)
         index[vid] = varstring
         if properties is None:
             properties = []
@@ -245,9 +295,20 @@ class Link(namedtuple('Link', ('start', 'end', 'rargname', 'post'))):
         )
 
 
+def _derived(xmrs, key, make):
+    # use the derived-structure cache of *xmrs*, if it has one
+    cache = getattr(xmrs, '_cache', None)
+    if cache is None:
+        return make(xmrs)
+    return cache.get(key, make, xmrs)
+
+
 def links(xmrs):
     """Return the list of [Links] for the *xmrs*."""
+    return list(_derived(xmrs, 'links', _links))
+
 
+def _links(xmrs):
     # Links exist for every non-intrinsic argument that has a variable
     # that is the intrinsic variable of some other predicate, as well
     # as for label equalities when no argument link exists (even
@@ -356,6 +417,90 @@ def icons(xmrs):
 # PREDICATES AND PREDICATIONS
 
 
+# PRED INTERNING
+
+PredCacheInfo = namedtuple(
+    'PredCacheInfo', ('hits', 'misses', 'maxsize', 'currsize')
+)
+
+
+class _PredCache(object):
+    """
+    A bounded mapping of keys to Pred objects that discards the least
+    recently used entry when it is full. It is safe to use from several
+    threads.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, make, *args):
+        data = self._data
+        with self._lock:
+            pred = data.get(key)
+            if pred is not None:
+                self.hits += 1
+                try:
+                    data.move_to_end(key)
+                except AttributeError:  # Python2
+                    data[key] = data.pop(key)
+                return pred
+            self.misses += 1
+        pred = make(*args)
+        if self.maxsize > 0:
+            with self._lock:
+                data[key] = pred
+                while len(data) > max(self.maxsize, 0):
+                    data.popitem(last=False)
+        return pred
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            data = self._data
+            while len(data) > max(maxsize, 0):
+                data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        return PredCacheInfo(self.hits, self.misses,
+                             self.maxsize, len(self._data))
+
+
+_pred_cache = _PredCache(50000)
+
+
+def pred_cache_info():
+    """
+    Return the hits, misses, maximum size, and current size of the
+    cache of interned [Pred] objects, as a `PredCacheInfo` tuple.
+    """
+    return _pred_cache.info()
+
+
+def clear_pred_cache():
+    """
+    Empty the cache of interned [Pred] objects and reset its statistics.
+    """
+    _pred_cache.clear()
+
+
+def set_pred_cache_size(maxsize):
+    """
+    Set the number of [Pred] objects kept in the interning cache.
+
+    A *maxsize* of `0` disables interning.
+    """
+    _pred_cache.resize(maxsize)
+
+
 class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     """
     A semantic predicate.
@@ -365,6 +510,13 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     predicates always begin with an underscore (ignoring possible
     quotes), and are often defined as strings in a lexicon.
 
+    Preds are immutable, so the classmethods that create them intern
+    their results: for example, every call to `Pred.stringpred()` with
+    the same string returns the same object, until it is pushed out of
+    a bounded cache of recently used Preds (see [pred_cache_info] and
+    [set_pred_cache_size]). This saves both the time to split the
+    predicate string and the memory for a Pred on each use.
+
     In pyDelphin, Preds are equivalent if they have the same lemma,
     pos, and sense, and are both abstract or both surface preds.
     Other factors are ignored for comparison, such as their being
@@ -411,12 +563,27 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     REALPRED = 1  # may explicitly define lemma, pos, sense
     STRINGPRED = 2  # quoted string form of realpred
 
+    def __new__(cls, type, lemma, pos, sense, string):
+        pred = super(Pred, cls).__new__(cls, type, lemma, pos, sense, string)
+        # the normalized form used for comparison and hashing
+        pred._key = _pred_key(string)
+        return pred
+
+    @classmethod
+    def _make(cls, iterable):
+        # namedtuple's _make() (and so _replace()) bypasses __new__()
+        return cls(*iterable)
+
     def __eq__(self, other):
-        if other is None:
-            return False
-        if not isinstance(other, Pred):
-            other = Pred.stringpred(other)
-        return self.short_form().lower() == other.short_form().lower()
+        if isinstance(other, Pred):
+            return self._key == other._key
+        try:
+            return self._key == _pred_key(other)
+        except AttributeError:
+            return False  # None or some other non-string
+
+    def __ne__(self, other):
+        return not (self == other)
 
     def __str__ (self):
         return self.string
@@ -425,19 +592,21 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
         return '<Pred object {} at {}>'.format(self.string, id(self))
 
     def __hash__(self):
-        return hash(self.string)
+        # consistent with __eq__() for Preds; a pred string need not
+        # hash like an equal Pred, so don't mix them as dictionary keys
+        return hash(self._key)
 
     @classmethod
     def stringpred(cls, predstr):
         """Return a Pred from its quoted string representation."""
-        lemma, pos, sense, end = split_pred_string(predstr)
-        return cls(Pred.STRINGPRED, lemma, pos, sense, predstr)
+        return _pred_cache.get((cls, Pred.STRINGPRED, predstr),
+                               cls._make_from_string, Pred.STRINGPRED, predstr)
 
     @classmethod
     def grammarpred(cls, predstr):
         """Return a Pred from its symbol string."""
-        lemma, pos, sense, end = split_pred_string(predstr)
-        return cls(Pred.GRAMMARPRED, lemma, pos, sense, predstr)
+        return _pred_cache.get((cls, Pred.GRAMMARPRED, predstr),
+                               cls._make_from_string, Pred.GRAMMARPRED, predstr)
 
     @staticmethod
     def string_or_grammar_pred(predstr):
@@ -450,9 +619,20 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     @classmethod
     def realpred(cls, lemma, pos, sense=None):
         """Return a Pred from its components."""
-        string_tokens = [lemma, pos]
         if sense is not None:
             sense = str(sense)
+        return _pred_cache.get((cls, Pred.REALPRED, lemma, pos, sense),
+                               cls._make_realpred, lemma, pos, sense)
+
+    @classmethod
+    def _make_from_string(cls, predtype, predstr):
+        lemma, pos, sense, end = split_pred_string(predstr)
+        return cls(predtype, lemma, pos, sense, predstr)
+
+    @classmethod
+    def _make_realpred(cls, lemma, pos, sense):
+        string_tokens = [lemma, pos]
+        if sense is not None:
             string_tokens.append(sense)
         predstr = '_'.join([''] + string_tokens + ['rel'])
         return cls(Pred.REALPRED, lemma, pos, sense, predstr)
@@ -468,7 +648,9 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
             '_cat_n_1'
         """
         s = self.string.strip('"').lstrip("'")
-        return re.sub(r'(.*)_rel$', r'\1', s, re.U|re.I)
+        if s.lower().endswith('_rel'):
+            s = s[:-4]
+        return s
 
     def is_quantifier(self):
         """
@@ -477,6 +659,14 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
         return self.pos == QUANTIFIER_POS
 
 
+def _pred_key(predstr):
+    # the short form (no quotes or _rel suffix), lowercased
+    key = predstr.strip('"').lstrip("'").lower()
+    if key.endswith('_rel'):
+        key = key[:-4]
+    return key
+
+
 def split_pred_string(predstr):
     """
     Extract the components from a pred string and log errors for any
@@ -626,16 +816,21 @@ class Node(
 
 def nodes(xmrs):
     """Return the list of Nodes for *xmrs*."""
+    # the sortinfo dicts are mutable, so cached nodes are not shared
+    return [node._replace(sortinfo=node.sortinfo.copy())
+            for node in _derived(xmrs, 'nodes', _nodes)]
+
+
+def _nodes(xmrs):
     nodes = []
     _props = xmrs.properties
-    varsplit = sort_vid_split
+    _sort = xmrs.var_sort
     for p in xmrs.eps():
         sortinfo = None
         iv = p.intrinsic_variable
         if iv is not None:
-            sort, _ = varsplit(iv)
             sortinfo = _props(iv)
-            sortinfo[CVARSORT] = sort
+            sortinfo[CVARSORT] = _sort(iv)
         nodes.append(
             Node(p.nodeid, p.pred, sortinfo, p.lnk, p.surface, p.base, p.carg)
         )
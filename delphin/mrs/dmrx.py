@@ -12,13 +12,17 @@
 from __future__ import print_function
 
 from collections import OrderedDict
+from functools import partial
+from io import BytesIO
+from itertools import chain
 import re
-import xml.etree.ElementTree as etree
 
 from delphin.mrs import (Dmrs, Node, Link, Pred, Lnk)
 from delphin.mrs.components import (nodes, links)
 from delphin.mrs.config import QUANTIFIER_POS
-from delphin.mrs.util import etree_tostring
+from delphin.mrs.util import (
+    etree, etree_tostring, iterparse_elements, parallel_map
+)
 
 ##############################################################################
 ##############################################################################
@@ -26,6 +30,12 @@ from delphin.mrs.util import etree_tostring
 
 
 def load(fh, single=False):
+    """
+    Deserialize DMRX from a filename or a (possibly gzipped) file object.
+
+    The input is read incrementally, so memory use does not grow with
+    the size of the file.
+    """
     ms = deserialize(fh)
     if single:
         ms = next(ms)
@@ -33,16 +43,33 @@ def load(fh, single=False):
 
 
 def loads(s, single=False):
-    corpus = etree.fromstring(s)
+    """
+    Deserialize DMRX from the string or bytes *s*.
+    """
+    if not isinstance(s, bytes):
+        s = s.encode('utf-8')
+    ms = deserialize(BytesIO(s))
     if single:
-        ds = _deserialize_dmrs(next(iter(corpus)))
-    else:
-        ds = (_deserialize_dmrs(dmrs_elem) for dmrs_elem in corpus)
-    return ds
+        ms = next(ms)
+    return ms
 
 
-def dump(fh, ms, **kwargs):
-    print(dumps(ms, **kwargs), file=fh)
+def dump(fh, ms, single=False, pretty_print=False, processes=None,
+         **kwargs):
+    """
+    Serialize DMRS objects to DMRX and write them to *fh*.
+
+    Each DMRS is encoded and written separately, so *ms* may be a
+    generator over a large corpus. If *processes* is greater than 1,
+    the items are encoded in a pool of that many worker processes.
+    """
+    if single:
+        ms = [ms]
+    chunks = _serialize_chunks(ms, pretty_print=pretty_print,
+                               processes=processes)
+    for chunk in chunks:
+        fh.write(chunk)
+    fh.write('\n')
 
 
 def dumps(ms, single=False, pretty_print=False, **kwargs):
@@ -64,13 +91,9 @@ dumps_one = lambda m, **kwargs: dumps(m, single=True, **kwargs)
 def deserialize(fh):
     """Deserialize a DMRX-encoded DMRS structure."""
     # <!ELEMENT dmrs-list (dmrs)*>
-    # if memory becomes a big problem, consider catching start events,
-    # get the root element (later start events can be ignored), and
-    # root.clear() after decoding each mrs
-    for event, elem in etree.iterparse(fh, events=('end',)):
-        if elem.tag == 'dmrs':
-            yield _deserialize_dmrs(elem)
-            elem.clear()
+    # iterparse_elements() clears each <dmrs> from the root once decoded
+    for elem in iterparse_elements(fh, 'dmrs'):
+        yield _deserialize_dmrs(elem)
 
 def _deserialize_dmrs(elem):
     # <!ELEMENT dmrs (node|link)*>
@@ -135,7 +158,8 @@ def _decode_sortinfo(elem):
     #           perf (plus|minus|u) #IMPLIED
     #           ind  (plus|minus|u) #IMPLIED >
     # note: Just accept any properties, since these are ERG-specific
-    return elem.attrib
+    # (copied, because the element is cleared after decoding)
+    return dict(elem.attrib)
 
 
 def _decode_link(elem):
@@ -161,18 +185,44 @@ def _decode_lnk(elem):
 _strict = False
 
 
+_lkb_pprint_re = re.compile(r'(<dmrs[^>]+>|</node>|</link>|</dmrs>)')
+
+
 def serialize(ms, strict=False, encoding='unicode', pretty_print=False):
+    if encoding == 'unicode':
+        return ''.join(_serialize_chunks(ms, strict=strict,
+                                         pretty_print=pretty_print))
     e = etree.Element('dmrs-list')
     for m in ms:
         e.append(_encode_dmrs(m, strict=strict))
+    return etree_tostring(e, encoding=encoding)
+
+
+def _serialize_chunks(ms, strict=False, pretty_print=False,
+                      processes=None):
+    # Encode each <dmrs> on its own instead of building the whole
+    # <dmrs-list> tree, so memory use doesn't grow with the corpus
+    ms = iter(ms)
+    try:
+        first = next(ms)
+    except StopIteration:
+        empty = etree.Element('dmrs-list')
+        chunks = [etree_tostring(empty, encoding='unicode')]
+    else:
+        chunks = chain(
+            ['<dmrs-list>'],
+            parallel_map(partial(_encode_chunk, strict=strict),
+                         chain([first], ms), processes=processes),
+            ['</dmrs-list>']
+        )
     # for now, pretty_print=True is the same as pretty_print='LKB'
     if pretty_print in ('LKB', 'lkb', 'Lkb', True):
-        lkb_pprint_re = re.compile(r'(<dmrs[^>]+>|</node>|</link>|</dmrs>)')
-        string = etree_tostring(e, encoding=encoding)
-        return lkb_pprint_re.sub(r'\1\n', string)
-    # pretty_print is only lxml. Look into tostringlist, maybe?
-    # return etree.tostring(e, pretty_print=pretty_print, encoding='unicode')
-    return etree_tostring(e, encoding=encoding)
+        chunks = (_lkb_pprint_re.sub(r'\1\n', chunk) for chunk in chunks)
+    return chunks
+
+
+def _encode_chunk(m, strict=False):
+    return etree_tostring(_encode_dmrs(m, strict=strict), encoding='unicode')
 
 
 def _encode_dmrs(m, strict=False):
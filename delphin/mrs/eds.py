@@ -1,6 +1,8 @@
 
 from __future__ import print_function
 
+import re
+from functools import partial
 from itertools import count
 
 from delphin.mrs.xmrs import Xmrs, _bfs
@@ -11,9 +13,9 @@ from delphin.mrs.components import (
     Node,
     nodes as make_nodes
 )
-from delphin.mrs.query import find_argument_target
-from delphin.mrs.util import rargname_sortkey
-from delphin.mrs.config import CVARSORT
+from delphin.mrs.util import rargname_sortkey, parallel_map, read_lines
+from delphin.mrs.config import CVARSORT, IVARG_ROLE
+from delphin.exceptions import XmrsDeserializationError as XDE
 from delphin.lib.pegre import (
     literal as lit,
     regex,
@@ -41,17 +43,49 @@ class Eds(object):
 
     @classmethod
     def from_xmrs(cls, xmrs):
+        """
+        Instantiate an Eds from an [Xmrs] (or subclass).
+
+        Args:
+            xmrs: the [Xmrs] object to convert
+        """
         eps = xmrs.eps()
-        deps = _find_dependencies(xmrs, eps)
+        heads = {}  # labelset heads are shared by dependencies and root
+        deps = _find_dependencies(xmrs, eps, heads)
         ids = _unique_ids(eps, deps)
-        root = _find_root(xmrs)
+        root = _find_root(xmrs, heads)
         if root is not None:
             root = ids[root]
-        nodes = [Node(ids[n.nodeid], *n[1:]) for n in make_nodes(xmrs)]
+        nodes = [n._replace(nodeid=ids[n.nodeid]) for n in make_nodes(xmrs)]
         edges = [(ids[a], rarg, ids[b]) for a, deplist in deps.items()
                                         for rarg, b in deplist]
         return cls(top=root, nodes=nodes, edges=edges)
 
+    @classmethod
+    def from_xmrs_many(cls, xs, processes=None, chunksize=16):
+        """
+        Convert each [Xmrs] in *xs* to an Eds.
+
+        Args:
+            xs: an iterable of [Xmrs] objects
+            processes: if greater than 1, convert in a pool of this many
+                worker processes; otherwise convert in this process
+            chunksize: the number of [Xmrs] objects sent to a worker
+                process at a time
+        Yields:
+            Eds objects, in the same order as *xs*
+        """
+        for e in parallel_map(_eds_from_xmrs, xs,
+                              processes=processes,
+                              chunksize=chunksize):
+            yield e
+
+    def __reduce__(self):
+        edges = [(start, rargname, end)
+                 for start in self._nodeids
+                 for rargname, end in self._edges[start].items()]
+        return (self.__class__, (self.top, self.nodes(), edges))
+
     def __eq__(self, other):
         if not isinstance(other, Eds):
             return False
@@ -84,7 +118,7 @@ class Eds(object):
             if node.lnk is not None:
                 nd['lnk'] = {'from': node.cfrom, 'to': node.cto}
             if properties:
-                props = node.sortinfo
+                props = dict(node.sortinfo or {})
                 if props:
                     if CVARSORT in props:
                         nd['type'] = props[CVARSORT]
@@ -101,7 +135,7 @@ class Eds(object):
         top = d.get('top')
         nodes, edges = [], []
         for nid, node in d.get('nodes', {}).items():
-            props = node.get('properties', {})
+            props = dict(node.get('properties', {}))
             if 'type' in node:
                 props[CVARSORT] = node['type']
             if not props:
@@ -126,21 +160,54 @@ class Eds(object):
         return cls(top, nodes=nodes, edges=edges)
 
 
-def _find_dependencies(m, eps):
+def _find_dependencies(m, eps, heads):
+    # This is a one-pass equivalent of using Xmrs.outgoing_args() and
+    # query.find_argument_target() on each EP; the nodeids selected by
+    # intrinsic variables are found once and labelset heads are cached
+    # in *heads*.
+    _vars = m._vars
+    _hcons = m._hcons
+    iv_nodeids = {}  # the first non-quantifier EP for each IV
+    for ep in eps:
+        iv = ep.intrinsic_variable
+        if iv is not None and iv_nodeids.get(iv) is None:
+            iv_nodeids[iv] = None if ep.is_quantifier() else ep.nodeid
     deps = {}
     for ep in eps:
         nid = ep.nodeid
         if ep.is_quantifier():
-            deps[nid] = [('BV', m.nodeid(ep.intrinsic_variable))]
-        else:
-            epdeps = []
-            args = m.outgoing_args(nid)
-            for rargname, val in args.items():
-                tgtnid = find_argument_target(m, nid, rargname)
-                epdeps.append((rargname, tgtnid))
-            deps[nid] = epdeps
+            deps[nid] = [('BV', iv_nodeids.get(ep.intrinsic_variable))]
+            continue
+        epdeps = []
+        for rargname, val in ep.args.items():
+            # don't include constant args or intrinsic args
+            if rargname == IVARG_ROLE or val not in _vars:
+                continue
+            refs = _vars[val]['refs']
+            if refs.get(IVARG_ROLE):
+                tgt = iv_nodeids[val]
+            elif val in _hcons:
+                tgt = _labelset_head(m, _hcons[val].lo, heads)
+            elif refs.get('LBL'):
+                tgt = _labelset_head(m, val, heads)
+                if tgt is None:
+                    tgt = val
+            else:
+                continue  # not pointing to another IV, LBL, or HCONS
+            epdeps.append((rargname, tgt))
+        deps[nid] = epdeps
     return deps
 
+def _labelset_head(m, label, heads):
+    try:
+        return heads[label]
+    except KeyError:
+        head = None
+        if label in m._vars:
+            head = next(iter(m.labelset_heads(label)), None)
+        heads[label] = head
+        return head
+
 def _unique_ids(eps, deps):
     # deps can be used to single out ep from set sharing ARG0s
     new_ids = ('_{}'.format(i) for i in count(start=1))
@@ -164,23 +231,32 @@ def _unique_ids(eps, deps):
                 ids[nid] = next(new_ids)
     return ids
 
-def _find_root(m):
+def _find_root(m, heads=None):
+    if heads is None:
+        heads = {}
     try:
         top_hcons = m.hcon(m.top)
-        return m.labelset_heads(top_hcons.lo)[0]
-    except (KeyError, StopIteration):
+    except KeyError:
         # try to find top?
         return None
+    return _labelset_head(m, top_hcons.lo, heads)
+
+def _eds_from_xmrs(xmrs):
+    # for Eds.from_xmrs_many() worker processes
+    return Eds.from_xmrs(xmrs)
 
 
 ## Serialization
 
 def load(fh, single=False):
-    if isinstance(fh, str):
-        s = open(fh, 'r').read()
-    else:
-        s = fh.read()
-    return loads(s, single=single)
+    lines = read_lines(fh)
+    es = deserialize(lines)
+    if single:
+        try:
+            return next(es)
+        finally:
+            lines.close()  # closes the file if it was opened here
+    return es
 
 def loads(s, single=False):
     es = deserialize(s)
@@ -188,21 +264,33 @@ def loads(s, single=False):
         return next(es)
     return es
 
-def dump(fh, ms, single=False, properties=False, pretty_print=True, **kwargs):
-    print(dumps(ms,
-                single=single,
-                properties=properties,
-                pretty_print=pretty_print,
-                **kwargs),
-          file=fh)
-
-def dumps(ms, single=False, properties=False, pretty_print=True, **kwargs):
+def dump(fh, ms, single=False, properties=False, pretty_print=True,
+         processes=None, **kwargs):
+    if single:
+        ms = [ms]
+    delim = '\n' if pretty_print else ' '
+    chunks = _serialize_chunks(
+        ms,
+        properties=properties,
+        pretty_print=pretty_print,
+        processes=processes,
+        **kwargs
+    )
+    for i, chunk in enumerate(chunks):
+        if i:
+            fh.write(delim)
+        fh.write(chunk)
+    fh.write('\n')
+
+def dumps(ms, single=False, properties=False, pretty_print=True,
+          processes=None, **kwargs):
     if single:
         ms = [ms]
     return serialize(
         ms,
         properties=properties,
         pretty_print=pretty_print,
+        processes=processes,
         **kwargs
     )
 
@@ -265,9 +353,113 @@ _eds_parser = Peg(
     )
 )
 
-def deserialize(s):
-    for e in _eds_parser.parse(s):
-        yield e
+# The scanner below is much faster than the Pegre grammar above (which
+# is kept as a reference implementation). Both build the nodes and
+# edges with _make_nodedata() and the Eds with _make_eds().
+
+# a lone " is the start of a string that continues in the next chunk
+_eds_delim_re = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}"]')
+_eds_top_re = re.compile(
+    r'\s*\{\s*(?:(?P<top>[-+\w]+)?\s*:\s*(?:\(fragmented\))?\s*)?'
+)
+_eds_node_re = re.compile(
+    r'\|?(?P<nodeid>[-+\w]+)\s*:\s*(?P<pred>\w+)'
+    r'(?:<(?P<cfrom>-?\d+)\s*:\s*(?P<cto>-?\d+)>)?'
+    r'(?:\("(?P<carg>[^"\\]*(?:\\.[^"\\]*)*)"\))?'
+    r'(?:\{(?P<props>[^}]*)\})?'
+    r'\[(?P<edges>[^\]]*)\]\s*'
+)
+_eds_end_re = re.compile(r'\}\s*$')
+
+
+def deserialize(fh):
+    """
+    Deserialize EDS-native strings.
+
+    Args:
+        fh: an EDS string or an iterable of strings (e.g. lines of a
+            file); each [Eds] is yielded as soon as it is complete
+    Yields:
+        [Eds] objects
+    """
+    if isinstance(fh, str):
+        fh = [fh]
+    for s in _split_eds_strings(fh):
+        yield _decode_eds(s)
+
+
+def _split_eds_strings(chunks):
+    buf = ''
+    # scanning resumes at *scan* (never inside a string) with the brace
+    # *depth* reached so far, so each chunk is only scanned once
+    scan = depth = 0
+    for chunk in chunks:
+        buf += chunk
+        start = 0
+        for match in _eds_delim_re.finditer(buf, scan):
+            c = match.group()
+            if c == '"':
+                scan = match.start()  # wait for the rest of the string
+                break
+            elif c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0:
+                    yield buf[start:match.end()]
+                    start = match.end()
+                elif depth < 0:
+                    _invalid_eds_error(buf[start:], 'an EDS')
+        else:
+            scan = len(buf)
+        buf = buf[start:]
+        scan -= start
+    if buf.strip():
+        raise XDE('Invalid EDS: unexpected end of input: {}'
+                  .format(buf.strip()[:50]))
+
+
+def _decode_eds(s):
+    match = _eds_top_re.match(s)
+    if match is None:
+        _invalid_eds_error(s, '{')
+    top = match.group('top')
+    pos = match.end()
+    data = []
+    node_match = _eds_node_re.match
+    makepred, charspan = Pred.string_or_grammar_pred, Lnk.charspan
+    while True:
+        match = node_match(s, pos)
+        if match is None:
+            break
+        nodeid, predstr, cfrom, cto, carg, props, edges = match.groups()
+        data.append(_make_nodedata((
+            nodeid,
+            makepred(predstr),
+            None if cfrom is None else charspan(cfrom, cto),
+            carg,
+            None if props is None else _decode_props(props),
+            [edge.split() for edge in edges.split(',') if edge.strip()]
+        )))
+        pos = match.end()
+    if _eds_end_re.match(s, pos) is None:
+        _invalid_eds_error(s[pos:], 'a node or }')
+    return _make_eds((top, data))
+
+
+def _decode_props(s):
+    # {type attr val, attr val, ...}; the type is optional
+    props = [prop.split() for prop in s.split(',')]
+    if props and len(props[0]) % 2 == 1:
+        first = props[0]
+        props[0] = first[1:]
+        props.insert(0, (CVARSORT, first[0]))
+    return [prop for prop in props if prop]
+
+
+def _invalid_eds_error(s, expected):
+    raise XDE('Invalid EDS: expected {} at "{}"'
+              .format(expected, s.strip()[:50]))
 
 eds = '{{{top}{flag}{delim}{ed_list}{enddelim}}}'
 ed =  '{membership}{id}:{pred}{lnk}{carg}{props}[{dep_list}]'
@@ -275,16 +467,24 @@ carg = '({constant})'
 proplist = '{{{varsort}{proplist}}}'
 dep = '{argname} {value}'
 
-def serialize(ms, properties=False, pretty_print=True, **kwargs):
+def serialize(ms, properties=False, pretty_print=True, processes=None,
+              **kwargs):
     delim = '\n' if pretty_print else ' '
     return delim.join(
-        _serialize_eds(
-            m,
+        _serialize_chunks(
+            ms,
             properties=properties,
             pretty_print=pretty_print,
+            processes=processes,
             **kwargs
         )
-        for m in ms
+    )
+
+def _serialize_chunks(ms, processes=None, **kwargs):
+    # converting Xmrs objects to EDS is most of the work, so it is
+    # done (with the encoding) in the worker processes, if any
+    return parallel_map(
+        partial(_serialize_eds, **kwargs), ms, processes=processes
     )
 
 def _serialize_eds(e, properties=False, pretty_print=True, **kwargs):
@@ -0,0 +1,252 @@
+"""
+Serialization functions for JSON Lines (newline-delimited JSON).
+
+Each line of a JSON Lines stream is one MRS, DMRS, or EDS encoded as a
+JSON object, using the dictionary forms of [Mrs.to_dict],
+[Dmrs.to_dict], or [Eds.to_dict], as selected by the *representation*
+parameter of each function. Because every object is on its own line,
+streams can be read and written one object at a time, concatenated,
+and split without decoding them.
+
+The fastest available JSON library is used: [orjson], then [ujson],
+and finally the standard library's `json` module. The name of the
+library in use is given by `JSON_BACKEND`.
+
+Encoding and decoding can optionally be spread over a pool of worker
+processes with the *processes* parameter; objects are built (or
+converted to dictionaries) and JSON-encoded entirely in the workers.
+
+  [orjson]: https://github.com/ijl/orjson
+  [ujson]: https://github.com/ultrajson/ultrajson
+"""
+
+from __future__ import print_function
+
+from functools import partial
+import io
+
+from delphin.mrs import Mrs, Dmrs
+from delphin.mrs.eds import Eds
+from delphin.mrs.util import parallel_imap, parallel_map
+from delphin.exceptions import (
+    XmrsSerializationError as XSE,
+    XmrsDeserializationError as XDE
+)
+
+try:
+    import orjson
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+    _json_loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import ujson
+        def _json_dumps(obj):
+            return ujson.dumps(obj, ensure_ascii=False)
+        _json_loads = ujson.loads
+        JSON_BACKEND = 'ujson'
+    except ImportError:
+        import json
+        def _json_dumps(obj):
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+        _json_loads = json.loads
+        JSON_BACKEND = 'json'
+
+_representations = {'mrs': Mrs, 'dmrs': Dmrs, 'eds': Eds}
+
+##############################################################################
+##############################################################################
+# Pickle-API methods
+
+
+def load(fh, single=False, representation='mrs', processes=None):
+    """
+    Deserialize JSON Lines from a file (handle or filename).
+
+    Lines are read and decoded one at a time, so memory use does not
+    grow with the size of the file.
+
+    Args:
+        fh: filename or file object
+        single: if `True`, only return the first read object
+        representation: `'mrs'`, `'dmrs'`, or `'eds'`
+        processes: if greater than 1, decode in a pool of this many
+            worker processes
+    Returns:
+        a generator of [Mrs], [Dmrs], or [Eds] objects (unless the
+        *single* option is `True`)
+    """
+    if isinstance(fh, str):
+        ms = _read_file(fh, representation, processes)
+    else:
+        ms = deserialize(fh, representation=representation,
+                         processes=processes)
+    if single:
+        ms = next(ms)
+    return ms
+
+
+def loads(s, single=False, representation='mrs', processes=None):
+    """
+    Deserialize JSON Lines from a string.
+
+    Args:
+        s: a JSON Lines string
+        single: if `True`, only return the first read object
+        representation: `'mrs'`, `'dmrs'`, or `'eds'`
+        processes: if greater than 1, decode in a pool of this many
+            worker processes
+    Returns:
+        a generator of [Mrs], [Dmrs], or [Eds] objects (unless the
+        *single* option is `True`)
+    """
+    ms = deserialize(s.splitlines(), representation=representation,
+                     processes=processes)
+    if single:
+        ms = next(ms)
+    return ms
+
+
+def dump(fh, ms, single=False, representation='mrs', properties=True,
+         processes=None, **kwargs):
+    """
+    Serialize objects to JSON Lines and write them to a file.
+
+    Objects are encoded and written one at a time, so *ms* may be a
+    generator.
+
+    Args:
+        fh: filename or file object
+        ms: an iterator of [Xmrs] or [Eds] objects to serialize
+            (unless the *single* option is `True`)
+        single: if `True`, treat *ms* as a single object instead of
+            as an iterator
+        representation: `'mrs'`, `'dmrs'`, or `'eds'`; objects not
+            already of this representation are converted
+        properties: if `False`, suppress variable properties
+        processes: if greater than 1, encode in a pool of this many
+            worker processes
+    """
+    if isinstance(fh, str):
+        with io.open(fh, 'w', encoding='utf-8') as fh_:
+            return dump(fh_, ms, single=single,
+                        representation=representation,
+                        properties=properties, processes=processes)
+    if single:
+        ms = [ms]
+    for line in _encode(ms, representation, properties, processes):
+        fh.write(line)
+        fh.write(u'\n')
+
+
+def dumps(ms, single=False, representation='mrs', properties=True,
+          processes=None, **kwargs):
+    """
+    Serialize objects to a JSON Lines string.
+
+    Args:
+        ms: an iterator of [Xmrs] or [Eds] objects to serialize
+            (unless the *single* option is `True`)
+        single: if `True`, treat *ms* as a single object instead of
+            as an iterator
+        representation: `'mrs'`, `'dmrs'`, or `'eds'`; objects not
+            already of this representation are converted
+        properties: if `False`, suppress variable properties
+        processes: if greater than 1, encode in a pool of this many
+            worker processes
+    Returns:
+        a JSON Lines string, with one object per line
+    """
+    if single:
+        ms = [ms]
+    return serialize(ms, representation=representation,
+                     properties=properties, processes=processes)
+
+# for convenience
+
+load_one = lambda fh, **kwargs: load(fh, single=True, **kwargs)
+loads_one = lambda s, **kwargs: loads(s, single=True, **kwargs)
+dump_one = lambda fh, m, **kwargs: dump(fh, m, single=True, **kwargs)
+dumps_one = lambda m, **kwargs: dumps(m, single=True, **kwargs)
+
+##############################################################################
+##############################################################################
+# Decoding
+
+
+def _get_class(representation):
+    try:
+        return _representations[representation]
+    except KeyError:
+        raise ValueError('Invalid representation: {}'.format(representation))
+
+
+def _read_file(path, representation, processes):
+    with io.open(path, encoding='utf-8') as fh:
+        for m in deserialize(fh, representation=representation,
+                             processes=processes):
+            yield m
+
+
+def deserialize(lines, representation='mrs', processes=None):
+    """
+    Decode each non-blank line in *lines* (e.g., an open file).
+    """
+    cls = _get_class(representation)
+    numbered = ((i, line) for i, line in enumerate(lines, 1)
+                if line.strip())
+    func = partial(_decode_object, cls)
+    for m in parallel_imap(func, numbered, processes=processes):
+        yield m
+
+
+def _decode_line(numbered_line):
+    lineno, line = numbered_line
+    try:
+        d = _json_loads(line)
+    except ValueError as ex:
+        raise XDE('Invalid JSON on line {}: {}'.format(lineno, ex))
+    if not isinstance(d, dict):
+        raise XDE('Expected a JSON object on line {}.'.format(lineno))
+    return d
+
+
+def _decode_object(cls, numbered_line):
+    return cls.from_dict(_decode_line(numbered_line))
+
+##############################################################################
+##############################################################################
+# Encoding
+
+
+def serialize(ms, representation='mrs', properties=True, processes=None):
+    """Serialize objects into a JSON Lines string."""
+    return '\n'.join(_encode(ms, representation, properties, processes))
+
+
+def _encode(ms, representation, properties, processes):
+    cls = _get_class(representation)
+    if cls is Eds:
+        func = partial(_encode_eds, properties=properties)
+    else:
+        func = partial(_encode_xmrs, cls, properties=properties)
+    return parallel_map(func, ms, processes=processes)
+
+
+def _encode_dict(d):
+    try:
+        return _json_dumps(d)
+    except (TypeError, ValueError) as ex:
+        raise XSE('Could not encode as JSON: {}'.format(ex))
+
+
+def _encode_xmrs(cls, m, properties=True):
+    to_dict = getattr(cls.to_dict, '__func__', cls.to_dict)
+    return _encode_dict(to_dict(m, properties=properties))
+
+
+def _encode_eds(e, properties=True):
+    if not isinstance(e, Eds):
+        e = Eds.from_xmrs(e)
+    return _encode_dict(e.to_dict(properties=properties))
@@ -11,16 +11,20 @@
 from __future__ import print_function
 
 from collections import defaultdict
-import xml.etree.ElementTree as etree
+from io import BytesIO
+from itertools import chain
+import re
 
 from delphin.mrs import Mrs
 from delphin.mrs.components import (
-    ElementaryPredication, Pred, Lnk, HandleConstraint,
-    elementarypredications, hcons, icons, sort_vid_split, var_re
+    ElementaryPredication, Pred, Lnk, HandleConstraint, IndividualConstraint,
+    elementarypredications, hcons, icons, sort_vid_split, _var_info
 )
 from delphin.exceptions import XmrsDeserializationError as XDE
-from delphin.mrs.config import IVARG_ROLE
-from delphin.mrs.util import etree_tostring
+from delphin.mrs.config import IVARG_ROLE, FIRST_NODEID
+from delphin.mrs.util import (
+    etree, etree_tostring, iterparse_elements, parallel_map
+)
 
 
 ##############################################################################
@@ -29,6 +33,12 @@ from delphin.mrs.util import etree_tostring
 
 
 def load(fh, single=False):
+    """
+    Deserialize MRX from a filename or a (possibly gzipped) file object.
+
+    The input is read incrementally, so memory use does not grow with
+    the size of the file.
+    """
     ms = deserialize(fh)
     if single:
         ms = next(ms)
@@ -36,16 +46,33 @@ def load(fh, single=False):
 
 
 def loads(s, single=False):
-    corpus = etree.fromstring(s)
+    """
+    Deserialize MRX from the string or bytes *s*.
+    """
+    if not isinstance(s, bytes):
+        s = s.encode('utf-8')
+    ms = deserialize(BytesIO(s))
     if single:
-        ds = _deserialize_mrs(next(corpus))
-    else:
-        ds = (_deserialize_mrs(mrs_elem) for mrs_elem in corpus)
-    return ds
+        ms = next(ms)
+    return ms
 
 
-def dump(fh, ms, **kwargs):
-    print(dumps(ms, **kwargs), file=fh)
+def dump(fh, ms, single=False, pretty_print=False, processes=None,
+         **kwargs):
+    """
+    Serialize MRS objects to MRX and write them to *fh*.
+
+    Each MRS is encoded and written separately, so *ms* may be a
+    generator over a large corpus. If *processes* is greater than 1,
+    the items are encoded in a pool of that many worker processes.
+    """
+    if single:
+        ms = [ms]
+    chunks = _serialize_chunks(ms, pretty_print=pretty_print,
+                               processes=processes)
+    for chunk in chunks:
+        fh.write(chunk)
+    fh.write('\n')
 
 
 def dumps(ms, single=False, encoding='unicode', pretty_print=False, **kwargs):
@@ -72,13 +99,9 @@ _vars = {}
 def deserialize(fh):
     """Deserialize an MRX-encoded MRS structure."""
     # <!ELEMENT mrs-list (mrs)*>
-    # if memory becomes a big problem, consider catching start events,
-    # get the root element (later start events can be ignored), and
-    # root.clear() after decoding each mrs
-    for event, elem in etree.iterparse(fh, events=('end',)):
-        if elem.tag == 'mrs':
-            yield _deserialize_mrs(elem)
-            elem.clear()
+    # iterparse_elements() clears each <mrs> from the root once decoded
+    for elem in iterparse_elements(fh, 'mrs'):
+        yield _deserialize_mrs(elem)
 
 
 def _deserialize_mrs(elem):
@@ -91,15 +114,20 @@ def _deserialize_mrs(elem):
     elem = elem.find('.')  # in case elem is ElementTree rather than Element
     variables = defaultdict(list)
     # normalize_vars(elem) # try to make all vars have a sort
-    return Mrs(top=_decode_label(elem.find('label')),
-               index=_decode_var(elem.find('var'), variables=variables),
-               rels=[_decode_ep(ep, variables) for ep in elem.iter('ep')],
-               hcons=list(map(_decode_hcons, elem.iter('hcons'))),
-               icons=list(map(_decode_icons, elem.iter('icons'))), # future
-               lnk=_decode_lnk(elem.get('cfrom'), elem.get('cto')),
-               surface=elem.get('surface'),
-               identifier=elem.get('ident'),
-               vars=variables)
+    # MRS does not use nodeids, so number the EPs as Mrs() would
+    eps = [_decode_ep(ep, variables, nodeid)
+           for nodeid, ep in enumerate(elem.iter('ep'), FIRST_NODEID)]
+    return Mrs.from_trusted_parts(
+        top=_decode_label(elem.find('label')),
+        index=_decode_var(elem.find('var'), variables=variables),
+        eps=eps,
+        hcons=list(map(_decode_hcons, elem.iter('hcons'))),
+        icons=list(map(_decode_icons, elem.iter('icons'))), # future
+        lnk=_decode_lnk(elem.get('cfrom'), elem.get('cto')),
+        surface=elem.get('surface'),
+        identifier=elem.get('ident'),
+        vars=variables
+    )
 
 
 def _decode_label(elem):
@@ -130,14 +158,14 @@ def _decode_extrapairs(elems):
     return [(e.find('path').text.upper(), e.find('value').text) for e in elems]
 
 
-def _decode_ep(elem, variables=None):
+def _decode_ep(elem, variables=None, nodeid=None):
     # <!ELEMENT ep ((pred|spred|realpred), label, fvpair*)>
     # <!ATTLIST ep
     #           cfrom CDATA #IMPLIED
     #           cto   CDATA #IMPLIED
     #           surface   CDATA #IMPLIED
     #           base      CDATA #IMPLIED >
-    return ElementaryPredication(None,  # no nodeid in MRS
+    return ElementaryPredication(nodeid,
                                  _decode_pred(elem.find('./')),
                                  _decode_label(elem.find('label')),
                                  args=_decode_args(elem, variables=variables),
@@ -160,7 +188,7 @@ def _decode_pred(elem):
     elif elem.tag == 'spred':
         return Pred.stringpred(elem.text)
     elif elem.tag == 'realpred':
-        return Pred.readpred(elem.get('lemma'),
+        return Pred.realpred(elem.get('lemma'),
                              elem.get('pos'),
                              elem.get('sense'))
 
@@ -220,20 +248,45 @@ def _decode_lnk(cfrom, cto):
 # Encoding
 
 
+_pprint_re = re.compile(r'(<mrs[^-]|</mrs>|</mrs-list>'
+                        r'|<ep\s|<fvpair>|<extrapair>|<hcons\s)',
+                        re.IGNORECASE)
+
+
 def serialize(ms, encoding='unicode', pretty_print=False):
+    if encoding == 'unicode':
+        return ''.join(_serialize_chunks(ms, pretty_print=pretty_print))
     e = etree.Element('mrs-list')
     for m in ms:
         e.append(_encode_mrs(m))
-    if pretty_print:
-        import re
-        pprint_re = re.compile(r'(<mrs[^-]|</mrs>|</mrs-list>'
-                               r'|<ep\s|<fvpair>|<extrapair>|<hcons\s)',
-                               re.IGNORECASE)
-        string = etree_tostring(e, encoding=encoding)
-        return pprint_re.sub(r'\n\1', string)
     return etree_tostring(e, encoding=encoding)
 
 
+def _serialize_chunks(ms, pretty_print=False, processes=None):
+    # Encode each <mrs> on its own instead of building the whole
+    # <mrs-list> tree, so memory use doesn't grow with the corpus
+    ms = iter(ms)
+    try:
+        first = next(ms)
+    except StopIteration:
+        empty = etree.Element('mrs-list')
+        chunks = [etree_tostring(empty, encoding='unicode')]
+    else:
+        chunks = chain(
+            ['<mrs-list>'],
+            parallel_map(_encode_chunk, chain([first], ms),
+                         processes=processes),
+            ['</mrs-list>']
+        )
+    if pretty_print:
+        chunks = (_pprint_re.sub(r'\n\1', chunk) for chunk in chunks)
+    return chunks
+
+
+def _encode_chunk(m):
+    return etree_tostring(_encode_mrs(m), encoding='unicode')
+
+
 def _encode_mrs(m):
     varprops = {v: vd['props'] for v, vd in m._vars.items() if vd['props']}
     attributes = {'cfrom': str(m.cfrom), 'cto': str(m.cto)}
@@ -293,7 +346,7 @@ def _encode_ep(ep, varprops=None):
     if ep.iv is not None:
         e.append(_encode_arg(IVARG_ROLE, _encode_variable(ep.iv, varprops)))
     for rargname, val in ep.args.items():
-        if var_re.match(val):
+        if _var_info(val) is not None:
             e.append(_encode_arg(rargname, _encode_variable(val, varprops)))
         else:
             e.append(_encode_arg(rargname, _encode_constant(val)))
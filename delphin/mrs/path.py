@@ -8,7 +8,7 @@ import warnings
 from collections import deque, defaultdict
 from itertools import product
 
-from .components import (Pred, links, var_sort)
+from .components import (Pred, links)
 from .util import powerset
 from .config import IVARG_ROLE
 from delphin.exceptions import XmrsError
@@ -514,7 +514,7 @@ def _explore(
             # it's not guaranteed that an EP has an intrinsic variable
             if IVARG_ROLE in xmrs.args(start):
                 iv = xmrs.args(start)[IVARG_ROLE]
-                varsort = var_sort(iv)
+                varsort = xmrs.var_sort(iv)
                 ctext['varsort'] = varsort
                 props = xmrs.properties(iv)
                 ctext.update([
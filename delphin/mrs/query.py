@@ -5,10 +5,17 @@ Functions for inspecting and interpreting the structure of an Xmrs.
 import warnings
 from itertools import product
 
-from delphin.mrs.components import nodes, links, var_id
+from delphin.mrs.components import Pred, nodes, links
 from delphin.mrs.util import rargname_sortkey
 from delphin.mrs.config import IVARG_ROLE
 
+def _as_pred(pred):
+    # so a pred string is normalized once instead of on each comparison
+    if pred is None or isinstance(pred, Pred):
+        return pred
+    return Pred.stringpred(pred)
+
+
 # query methods
 def select_nodeids(xmrs, iv=None, label=None, pred=None):
     """
@@ -16,6 +23,7 @@ def select_nodeids(xmrs, iv=None, label=None, pred=None):
     matching *iv* (intrinsic variable), *label*, or *pred* values. If
     none match, return an empty list.
     """
+    pred = _as_pred(pred)
     def datamatch(nid):
         ep = xmrs.ep(nid)
         return ((iv is None or ep.iv == iv) and
@@ -29,6 +37,7 @@ def select_nodes(xmrs, nodeid=None, pred=None):
     Return the list of all [Nodes] that have the matching *nodeid*
     and/or *pred* values. If none match, return an empty list.
     """
+    pred = _as_pred(pred)
     nodematch = lambda n: ((nodeid is None or n.nodeid == nodeid) and
                            (pred is None or n.pred == pred))
     return list(filter(nodematch, nodes(xmrs)))
@@ -40,6 +49,7 @@ def select_eps(xmrs, nodeid=None, iv=None, label=None, pred=None):
     *iv*, *label*, and or *pred* values. If none match, return an
     empty list.
     """
+    pred = _as_pred(pred)
     epmatch = lambda n: ((nodeid is None or n.nodeid == nodeid) and
                          (iv is None or n.iv == iv) and
                          (label is None or n.label == label) and
@@ -166,7 +176,8 @@ def find_subgraphs_by_preds(xmrs, preds, connected=None):
         connected: If True, all yielded subgraphs must be connected,
             as determined by Xmrs.is_connected().
     Yields:
-        [Xmrs] objects for the found subgraphs.
+        [XmrsView] objects for the found subgraphs (use
+        [XmrsView.materialize] to get an independent [Xmrs] object).
     """
     preds = list(preds)
     count = len(preds)
@@ -180,7 +191,7 @@ def find_subgraphs_by_preds(xmrs, preds, connected=None):
         )
     )
     for nidset in nidsets:
-        sg = xmrs.subgraph(nidset)
+        sg = xmrs.subgraph_view(nidset)
         if connected is None or sg.is_connected() == connected:
             yield sg
 
@@ -197,14 +208,14 @@ def intrinsic_variables(xmrs):
         ep[3][IVARG_ROLE] for ep in xmrs.eps()
         if not ep[1].is_quantifier() and IVARG_ROLE in ep[3]
     )
-    return sorted(ivs, key=var_id)
+    return sorted(ivs, key=xmrs.var_id)
 
 def bound_variables(xmrs):
     bvs = set(
         ep[3][IVARG_ROLE] for ep in xmrs.eps()
         if ep[1].is_quantifier() and IVARG_ROLE in ep[3]
     )
-    return sorted(bvs, key=var_id)
+    return sorted(bvs, key=xmrs.var_id)
 
 def in_labelset(xmrs, nodeids, label=None):
     """
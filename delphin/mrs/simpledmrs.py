@@ -1,23 +1,41 @@
-
 """
 Serialization for the SimpleDMRS format.
 
 Note that this format is provided by pyDelphin and not defined
-anywhere, so it should only be used for user's convenience and not
-used as an interchange format or for other practical purposes. It was
-created with human legibility in mind (e.g. for investigating DMRSs
-at the command line, because XML (DMRX) is not easy to read).
-Deserialization is not provided.
+anywhere else. It was created with human legibility in mind (e.g. for
+investigating DMRSs at the command line, because XML (DMRX) is not
+easy to read), but as it can be both read and written it is also a
+compact way to store and exchange DMRSs between pyDelphin programs.
+Each DMRS looks like this:
+
+    dmrs 21 {
+      [<0:14> "Abrams sleeps."];
+      10000 [proper_q_rel<0:6> x PERS=3 NUM=sg IND=+];
+      10001 [named_rel<0:6>("Abrams") x PERS=3 NUM=sg IND=+];
+      10002 [_sleep_v_1_rel<7:14> e SF=prop TENSE=pres];
+      0:/H -> 10002;
+      10000:RSTR/H -> 10001;
+      10002:ARG1/NEQ -> 10001;
+    }
+
+The identifier after `dmrs` and the bracketed line giving the Lnk and
+surface string of the whole DMRS are optional. Each node has a nodeid,
+a predicate with optional Lnk, constant argument (in parentheses), and
+surface string, and optionally the sort of its intrinsic variable
+followed by its properties. Each link gives the start nodeid, the
+argument name and post-slash label, and the end nodeid.
 """
 
 from __future__ import print_function
 
 from collections import OrderedDict
-from io import BytesIO
+from functools import partial
 import re
 from delphin.mrs import (Dmrs, Node, Link, Pred, Lnk)
 from delphin.mrs.components import (nodes, links)
 from delphin.mrs.config import EQ_POST, CVARSORT
+from delphin.mrs.util import parallel_map, read_lines
+from delphin.exceptions import XmrsDeserializationError as XDE
 
 
 ##############################################################################
@@ -25,22 +43,76 @@ from delphin.mrs.config import EQ_POST, CVARSORT
 # Pickle-API methods
 
 
-# def load(fh, single=False):
-#     ms = deserialize(fh)
-#     if single:
-#         ms = next(ms)
-#     return ms
+def load(fh, single=False):
+    """
+    Deserialize SimpleDMRS from a file (handle or filename).
 
+    The file is read incrementally, so a large corpus does not need to
+    fit in memory.
 
-# def loads(s, single=False, encoding='utf-8'):
-#     ms = deserialize(BytesIO(bytes(s, encoding=encoding)))
-#     if single:
-#         ms = next(ms)
-#     return ms
+    Args:
+        fh: filename or file object
+        single: if `True`, only return the first read [Xmrs] object
+    Returns:
+        a generator of [Xmrs] objects (unless the *single* option is
+        `True`)
+    """
+    lines = read_lines(fh)
+    ms = deserialize(lines)
+    if single:
+        try:
+            return next(ms)
+        finally:
+            lines.close()  # closes the file if it was opened here
+    return ms
 
 
-def dump(fh, ms, **kwargs):
-    print(dumps(ms, **kwargs), file=fh)
+def loads(s, single=False):
+    """
+    Deserialize SimpleDMRS string representations.
+
+    Args:
+        s: a SimpleDMRS string
+        single: if `True`, only return the first read [Xmrs] object
+    Returns:
+        a generator of [Xmrs] objects (unless the *single* option is
+        `True`)
+    """
+    ms = deserialize([s])
+    if single:
+        ms = next(ms)
+    return ms
+
+
+def dump(fh, ms, single=False, pretty_print=False, processes=None,
+         **kwargs):
+    """
+    Serialize [Xmrs] objects to SimpleDMRS and write them to a file.
+
+    Each DMRS is encoded and written separately, so *ms* may be a
+    generator over a large corpus.
+
+    Args:
+        fh: a file object to write to
+        ms: an iterator of [Xmrs] objects to serialize (unless the
+            *single* option is `True`)
+        single: if `True`, treat *ms* as a single [Xmrs] object
+            instead of as an iterator
+        pretty_print: if `True`, put each node and link on its own
+            line
+        processes: if greater than 1, encode in a pool of this many
+            worker processes
+    """
+    if single:
+        ms = [ms]
+    indent = 2 if pretty_print else None
+    chunks = parallel_map(partial(_encode_dmrs, indent=indent), ms,
+                          processes=processes)
+    for i, chunk in enumerate(chunks):
+        if i:
+            fh.write('\n')
+        fh.write(chunk)
+    fh.write('\n')
 
 
 def dumps(ms, single=False, pretty_print=False, **kwargs):
@@ -50,8 +122,8 @@ def dumps(ms, single=False, pretty_print=False, **kwargs):
 
 # for convenience
 
-# load_one = lambda fh: load(fh, single=True)
-# loads_one = lambda s: loads(s, single=True)
+load_one = lambda fh: load(fh, single=True)
+loads_one = lambda s: loads(s, single=True)
 dump_one = lambda fh, m, **kwargs: dump(fh, m, single=True, **kwargs)
 dumps_one = lambda m, **kwargs: dumps(m, single=True, **kwargs)
 
@@ -59,28 +131,172 @@ dumps_one = lambda m, **kwargs: dumps(m, single=True, **kwargs)
 ##############################################################################
 # Decoding
 
-# tokenizer = re.compile(r'("[^"\\]*(?:\\.[^"\\]*)*"'
-#                        r'|[^\s:#@\[\]<>"]+'
-#                        r'|[:#@\[\]<>])')
+_string = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+# a lone " is the start of a string that is not finished yet
+_closing_re = re.compile(r'{}|\}}|"'.format(_string))
+_escape_re = re.compile(r'\\(.)')
+_header_re = re.compile(
+    r'\s*dmrs(?:\s+(?P<identifier>{}|[^\s{{"]+))?\s*\{{'.format(_string)
+)
+_dmrsproperties_re = re.compile(
+    r'\s*\[\s*(?P<lnk><[^<>]*>)?\s*(?P<surface>{})?\s*\]\s*;'
+    .format(_string)
+)
+_node_re = re.compile(
+    r'\s*(?P<nodeid>\d+)\s*\[\s*'
+    r'(?P<pred>{0}|[^\s\[\]<>();"]+)\s*'
+    r'(?P<lnk><[^<>]*>)?\s*'
+    r'(?:\((?P<carg>{0}|[^\s()]*)\)\s*)?'
+    r'(?P<surface>{0})?\s*'
+    r'(?:(?P<cvarsort>[^\s\]=;]+)(?P<props>(?:\s+[^\s=\]]+=[^\s\]]+)*)\s*)?'
+    r'\]\s*;'.format(_string)
+)
+_link_re = re.compile(
+    r'\s*(?P<start>\d+)\s*:\s*(?P<rargname>[^\s/]*)\s*/\s*(?P<post>[^\s;]+?)'
+    r'\s*(?:->|--)\s*(?P<end>\d+)\s*;'
+)
+_footer_re = re.compile(r'\s*\}')
+
+
+def deserialize(fh):
+    """
+    Deserialize SimpleDMRS-encoded DMRS structures.
+
+    Args:
+        fh: an iterable of strings (e.g. lines of a file); a DMRS may
+            span several of them
+    Yields:
+        [Xmrs] objects
+    """
+    buf = ''
+    scan = 0  # where scanning resumes; it is never inside a string
+    for chunk in fh:
+        buf += chunk
+        start = 0
+        for match in _closing_re.finditer(buf, scan):
+            token = match.group()
+            if token == '"':
+                scan = match.start()  # wait for the rest of the string
+                break
+            elif token == '}':
+                yield _decode_dmrs(buf[start:match.end()])
+                start = match.end()
+        else:
+            scan = len(buf)
+        buf = buf[start:]
+        scan -= start
+    if buf.strip():
+        raise XDE('Invalid SimpleDMRS: unexpected end of input: {}'
+                  .format(buf.strip()[:50]))
+
+
+def _decode_dmrs(s):
+    match = _header_re.match(s)
+    if match is None:
+        _invalid_dmrs_error(s, 0, 'dmrs')
+    identifier = match.group('identifier')
+    if identifier is not None and identifier.startswith('"'):
+        identifier = _decode_string(identifier)
+    pos = match.end()
+    lnk = surface = None
+    match = _dmrsproperties_re.match(s, pos)
+    if match is not None:
+        lnk = _decode_lnk(match.group('lnk'))
+        surface = _decode_surface(match.group('surface'))
+        pos = match.end()
+    nodes_ = []
+    links_ = []
+    node_match = _node_re.match
+    link_match = _link_re.match
+    while True:
+        match = node_match(s, pos)
+        if match is not None:
+            nodes_.append(_decode_node(match))
+            pos = match.end()
+            continue
+        match = link_match(s, pos)
+        if match is not None:
+            links_.append(Link(int(match.group('start')),
+                               int(match.group('end')),
+                               rargname=match.group('rargname') or None,
+                               post=match.group('post')))
+            pos = match.end()
+            continue
+        break
+    match = _footer_re.match(s, pos)
+    if match is None:
+        _invalid_dmrs_error(s, pos, 'a node, link, or }')
+    return Dmrs(nodes=nodes_, links=links_,
+                lnk=lnk, surface=surface, identifier=identifier)
 
-# def deserialize(fh):
-#     """deserialize a SimpleDmrs-encoded DMRS structure."""
-#     raise NotImplementedError
+
+def _decode_node(match):
+    sortinfo = OrderedDict()
+    cvarsort = match.group('cvarsort')
+    if cvarsort is not None:
+        sortinfo[CVARSORT] = cvarsort
+        for prop in match.group('props').split():
+            key, val = prop.split('=', 1)
+            sortinfo[key] = val
+    return Node(int(match.group('nodeid')),
+                Pred.string_or_grammar_pred(match.group('pred')),
+                sortinfo=sortinfo,
+                lnk=_decode_lnk(match.group('lnk')),
+                surface=_decode_surface(match.group('surface')),
+                carg=match.group('carg'))
+
+
+def _decode_lnk(s):
+    # < FROM : TO > or < FROM # TO > or < TOK... > or < @ EDGE >
+    if s is None:
+        return None
+    s = s[1:-1].strip()
+    if not s:
+        return None  # empty <> brackets the same as no lnk specified
+    elif s.startswith('@'):
+        return Lnk.edge(s[1:])
+    elif ':' in s:
+        return Lnk.charspan(*s.split(':'))
+    elif '#' in s:
+        return Lnk.chartspan(*s.split('#'))
+    else:
+        return Lnk.tokens(map(int, s.split()))
+
+
+def _decode_surface(s):
+    if s is not None:
+        s = _decode_string(s)
+    return s
+
+
+def _decode_string(s):
+    # remove the quotes and unescape \" and \\
+    return _escape_re.sub(r'\1', s[1:-1])
+
+
+def _invalid_dmrs_error(s, pos, expected):
+    raise XDE('Invalid SimpleDMRS: expected {} at "{}"'
+              .format(expected, s[pos:].strip()[:50]))
 
 ##############################################################################
 ##############################################################################
 # Encoding
 
-_graphtype = 'dmrs'
-_graph = '{graphtype} {graphid}{{{dmrsproperties}{nodes}{links}}}'
-_dmrsproperties = ''
-_node = '{indent}{nodeid} [{pred}{lnk}{sortinfo}];'
-_sortinfo = ' {cvarsort} {properties}'
+_graph = 'dmrs{graphid} {{'
+_dmrsproperties = '{indent}[{properties}];'
+_node = '{indent}{nodeid} [{pred}{lnk}{carg}{surface}{sortinfo}];'
+_sortinfo = ' {cvarsort}{properties}'
 _link = '{indent}{start}:{pre}/{post} {arrow} {end};'
+_bare_identifier_re = re.compile(r'[^\s{}"]+$')
+
 
 def serialize(ms, encoding='unicode', indent=2):
-    delim = '\n' if indent is not None else ' '
-    return delim.join(_encode_dmrs(m, indent=indent) for m in ms)
+    return '\n'.join(_encode_dmrs(m, indent=indent) for m in ms)
+
+
+def _encode_string(s):
+    return '"{}"'.format(s.replace('\\', '\\\\').replace('"', '\\"'))
+
 
 def _encode_dmrs(m, indent=2):
     if indent is not None:
@@ -90,19 +306,40 @@ def _encode_dmrs(m, indent=2):
         delim = ''
         space = ' '
 
+    graphid = ''
+    if m.identifier is not None:
+        graphid = str(m.identifier)
+        if not _bare_identifier_re.match(graphid):
+            graphid = _encode_string(graphid)
+        graphid = ' ' + graphid
+    header = [_graph.format(graphid=graphid)]
+
+    properties = []
+    if m.lnk is not None and m.lnk.data != (-1, -1):  # don't do <-1:-1>
+        properties.append(str(m.lnk))
+    if m.surface is not None:
+        properties.append(_encode_string(m.surface))
+    if properties:
+        header.append(_dmrsproperties.format(
+            indent=space, properties=' '.join(properties)
+        ))
+
     nodes_ = [
         _node.format(
             indent=space,
             nodeid=n.nodeid,
             pred=n.pred.string,
             lnk='' if n.lnk is None else str(n.lnk),
+            carg='' if n.carg is None else '({})'.format(n.carg),
+            surface=('' if n.surface is None
+                     else ' ' + _encode_string(n.surface)),
             sortinfo=(
                 '' if not n.sortinfo else
                 _sortinfo.format(
                     cvarsort=n.cvarsort,
-                    properties=' '.join('{}={}'.format(k, v)
-                                        for k, v in n.sortinfo.items()
-                                        if k != CVARSORT),
+                    properties=''.join(' {}={}'.format(k, v)
+                                       for k, v in n.sortinfo.items()
+                                       if k != CVARSORT),
                 )
             )
         )
@@ -121,4 +358,4 @@ def _encode_dmrs(m, indent=2):
         for l in links(m)
     ]
 
-    return delim.join(['dmrs {'] + nodes_ + links_ + ['}'])
+    return delim.join(header + nodes_ + links_ + ['}'])
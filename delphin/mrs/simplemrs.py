@@ -9,16 +9,17 @@ Serialization functions for the SimpleMRS format.
 from __future__ import print_function
 
 from collections import deque, defaultdict
+from functools import partial
 import re
 from warnings import warn
 
 from delphin.mrs import Xmrs, Mrs
 from delphin.mrs.components import (
     ElementaryPredication, Pred, Lnk, HandleConstraint, IndividualConstraint,
-    sort_vid_split, var_sort, var_re, hcons, icons
+    sort_vid_split, var_sort, _var_info, hcons, icons
 )
 from delphin.mrs.config import (HANDLESORT, CONSTARG_ROLE)
-from delphin.mrs.util import rargname_sortkey
+from delphin.mrs.util import rargname_sortkey, parallel_map, read_lines
 from delphin.exceptions import (
     XmrsDeserializationError as XDE,
     XmrsError,
@@ -55,7 +56,7 @@ _default_mrs_delim = '\n'
 
 
 def load(fh, single=False, version=_default_version,
-         strict=False, errors='warn'):
+         strict=False, errors='warn', lazy=False):
     """
     Deserialize SimpleMRSs from a file (handle or filename)
 
@@ -68,31 +69,53 @@ def load(fh, single=False, version=_default_version,
         errors: if `strict`, ill-formed MRSs raise an error; if
             `warn`, raise a warning instead; if `ignore`, do not warn
             or raise errors for ill-formed MRSs
+        lazy: if `True`, return [LazyXmrs] objects that are only
+            fully parsed when needed
     Returns:
         a generator of [Xmrs] objects (unless the *single* option is
         `True`)
     """
-    if isinstance(fh, str):
-        s = open(fh, 'r').read()
+    lines = read_lines(fh)
+    # MRSs are split off as soon as their closing bracket is read, so
+    # the whole file is never in memory at once
+    strings = _split_mrs_lines(lines)
+    if lazy:
+        errors = _errors_mode(strict, errors)
+        ms = (LazyXmrs(mrs, version=version, errors=errors)
+              for mrs in strings)
+    else:
+        ms = (m for mrs in strings
+              for m in deserialize(mrs, version=version,
+                                   strict=strict, errors=errors))
+    if single:
+        try:
+            return next(ms)
+        finally:
+            lines.close()  # closes the file if it was opened here
     else:
-        s = fh.read()
-    return loads(s, single=single, version=version,
-                 strict=strict, errors=errors)
+        return ms
 
 
 def loads(s, single=False, version=_default_version,
-          strict=False, errors='warn'):
+          strict=False, errors='warn', lazy=False):
     """
     Deserialize SimpleMRS string representations
 
     Args:
         s: a SimpleMRS string
         single: if `True`, only return the first read [Xmrs] object
+        lazy: if `True`, return [LazyXmrs] objects that are only
+            fully parsed when needed
     Returns:
         a generator of [Xmrs] objects (unless the *single* option is
         `True`)
     """
-    ms = deserialize(s, version=version, strict=strict, errors=errors)
+    if lazy:
+        errors = _errors_mode(strict, errors)
+        ms = (LazyXmrs(mrs, version=version, errors=errors)
+              for mrs in _split_mrs_strings(s))
+    else:
+        ms = deserialize(s, version=version, strict=strict, errors=errors)
     if single:
         return next(ms)
     else:
@@ -100,11 +123,14 @@ def loads(s, single=False, version=_default_version,
 
 
 def dump(fh, ms, single=False, version=_default_version,
-         pretty_print=False, color=False, **kwargs):
+         pretty_print=False, color=False, processes=None, **kwargs):
     """
     Serialize [Xmrs] objects to a SimpleMRS representation and write
     to a file
 
+    Each [Xmrs] is encoded and written separately, so *ms* may be a
+    generator over a large corpus.
+
     Args:
         fh: filename or file object
         ms: an iterator of [Xmrs] objects to serialize (unless the
@@ -114,20 +140,38 @@ def dump(fh, ms, single=False, version=_default_version,
         pretty_print: if `True`, the output is formatted to be easier
             to read
         color: if `True`, colorize the output with ANSI color codes
+        processes: if greater than 1, encode in a pool of this many
+            worker processes
     Returns:
       None
     """
-    print(dumps(ms,
-                single=single,
-                version=version,
-                pretty_print=pretty_print,
-                color=color,
-                **kwargs),
-          file=fh)
+    if isinstance(fh, str):
+        with open(fh, 'w') as fh_:
+            return dump(fh_, ms, single=single, version=version,
+                        pretty_print=pretty_print, color=color,
+                        processes=processes)
+    if color:
+        # highlight the whole output at once, as it always was
+        print(dumps(ms, single=single, version=version,
+                    pretty_print=pretty_print, color=color,
+                    processes=processes),
+              file=fh)
+        return
+    if single:
+        ms = [ms]
+    delim = '\n' if pretty_print else _default_mrs_delim
+    chunks = _serialize_chunks(ms, version=version,
+                               pretty_print=pretty_print,
+                               processes=processes)
+    for i, chunk in enumerate(chunks):
+        if i:
+            fh.write(delim)
+        fh.write(chunk)
+    fh.write('\n')
 
 
 def dumps(ms, single=False, version=_default_version,
-          pretty_print=False, color=False, **kwargs):
+          pretty_print=False, color=False, processes=None, **kwargs):
     """
     Serialize an [Xmrs] object to a SimpleMRS representation
 
@@ -139,13 +183,15 @@ def dumps(ms, single=False, version=_default_version,
         pretty_print: if `True`, the output is formatted to be easier to
             read
         color: if `True`, colorize the output with ANSI color codes
+        processes: if greater than 1, encode in a pool of this many
+            worker processes
     Returns:
         a SimpleMrs string representation of a corpus of [Xmrs]
     """
     if single:
         ms = [ms]
-    return serialize(ms, version=version,
-                     pretty_print=pretty_print, color=color, **kwargs)
+    return serialize(ms, version=version, pretty_print=pretty_print,
+                     color=color, processes=processes)
 
 
 # for convenience
@@ -180,13 +226,19 @@ def _invalid_token_error(token, expected):
     raise XDE('Invalid token: "{}"\tExpected: "{}"'.format(token, expected))
 
 
-def deserialize(string, version=_default_version, strict=True, errors='warn'):
+def _errors_mode(strict, errors):
+    # map the deprecated strict parameter to an errors mode
     if strict:
-        warnings.warn(
+        warn(
             'strict=True parameter is deprecated; use errors=\'strict\'',
             DeprecationWarning
         )
-        errors = 'strict'
+        return 'strict'
+    return errors
+
+
+def deserialize(string, version=_default_version, strict=True, errors='warn'):
+    errors = _errors_mode(strict, errors)
     # FIXME: consider buffering this so we don't read the whole string at once
     tokens = tokenize(string)
     while tokens:
@@ -224,15 +276,17 @@ def _read_mrs(tokens, version, errors):
             idx = tokens.popleft()
             vars_[idx] = _read_props(tokens)
         rels = _read_rels(tokens, vars_)
-        hcons = _read_cons(tokens, 'HCONS', vars_)
-        icons = _read_cons(tokens, 'ICONS', vars_)
+        hcons = _read_cons(tokens, 'HCONS', vars_, HandleConstraint)
+        icons = _read_cons(tokens, 'ICONS', vars_, IndividualConstraint)
         _read_literals(tokens, ']')
         # at this point, we could uniquify proplists in vars_, but most
         # likely it isn't necessary, and might night harm things if we
         # leave potential dupes in there. let's see how it plays out.
-        m = Xmrs(top=top, index=idx, eps=rels,
-                 hcons=hcons, icons=icons, vars=vars_,
-                 lnk=lnk, surface=surface)
+        m = Xmrs.from_trusted_parts(
+            top=top, index=idx, eps=rels,
+            hcons=hcons, icons=icons, vars=vars_,
+            lnk=lnk, surface=surface
+        )
     except IndexError:
         _unexpected_termination_error()
     if errors != 'ignore':
@@ -262,7 +316,7 @@ def _read_props(tokens):
 
 def _read_rels(tokens, vars_):
     rels = None
-    nid = 10000
+    nid = _first_nodeid
     if tokens[0].upper() == 'RELS':
         rels = []
         tokens.popleft()  # RELS
@@ -277,7 +331,7 @@ def _read_rels(tokens, vars_):
 def _read_ep(tokens, nid, vars_):
     # reassign these locally to avoid global lookup
     CARG = CONSTARG_ROLE
-    _var_re = var_re
+    _is_var = _var_info
     # begin parsing
     _read_literals(tokens, '[')
     pred = Pred.string_or_grammar_pred(tokens.popleft())
@@ -295,17 +349,17 @@ def _read_ep(tokens, nid, vars_):
         role = tokens.popleft().upper()
         _read_literals(tokens, ':')
         val = tokens.popleft()
-        if _var_re.match(val) is not None and role.upper() != CARG:
+        if _is_var(val) is not None and role.upper() != CARG:
             props = _read_props(tokens)
             if val not in vars_:
                 vars_[val] = []
             vars_[val].extend(props)
         args[role] = val
     tokens.popleft()  # ]
-    return (nid, pred, label, args, lnk, surface)
+    return ElementaryPredication(nid, pred, label, args, lnk, surface)
 
 
-def _read_cons(tokens, constype, vars_):
+def _read_cons(tokens, constype, vars_, cls):
     cons = None
     if tokens[0].upper() == constype:
         cons = []
@@ -317,7 +371,7 @@ def _read_cons(tokens, constype, vars_):
             reln = tokens.popleft().lower()
             rght = tokens.popleft()
             rprops = _read_props(tokens)
-            cons.append((left, reln, rght))
+            cons.append(cls(left, reln, rght))
             # update properties
             if left not in vars_: vars_[left] = []
             vars_[left].extend(lprops)
@@ -363,23 +417,250 @@ def _read_lnk(tokens):
 def _unexpected_termination_error():
     raise XDE('Invalid MRS: Unexpected termination.')
 
+
+def _split_mrs_strings(string):
+    """
+    Yield the substring of each top-level MRS in *string* without
+    parsing its contents.
+    """
+    depth = 0
+    start = None
+    for match in _tokenizer.finditer(string):
+        tok = match.group()
+        if tok == '[':
+            if depth == 0:
+                start = match.start()
+            depth += 1
+        elif tok == ']':
+            depth -= 1
+            if depth == 0:
+                yield string[start:match.end()]
+            elif depth < 0:
+                raise XDE('Invalid MRS: unbalanced brackets.')
+    if depth > 0:
+        yield string[start:]  # let the full parse report the error
+
+
+def _split_mrs_lines(lines):
+    """
+    Like [_split_mrs_strings], but for an iterable of strings (e.g.,
+    the lines of a file) that an MRS may span several of.
+    """
+    depth = 0
+    parts = []
+    for line in lines:
+        start = 0
+        for match in _tokenizer.finditer(line):
+            tok = match.group()
+            if tok == '[':
+                if depth == 0:
+                    start = match.start()
+                depth += 1
+            elif tok == ']':
+                depth -= 1
+                if depth == 0:
+                    parts.append(line[start:match.end()])
+                    yield ''.join(parts)
+                    parts = []
+                elif depth < 0:
+                    raise XDE('Invalid MRS: unbalanced brackets.')
+        if depth > 0:
+            parts.append(line[start:])
+    if depth > 0:
+        yield ''.join(parts)  # let the full parse report the error
+
+
+class LazyXmrs(Xmrs):
+    """
+    An [Xmrs] proxy for a SimpleMRS string that is parsed on demand.
+
+    Simple questions, such as the TOP and INDEX variables, the MRS
+    Lnk and surface string, the nodeids, and the predicates of each
+    EP, are answered from a lightweight scan of the SimpleMRS tokens.
+    Any other access (e.g. `eps()`, `links()`, `outgoing_args()`, or
+    serialization) parses the string into a full [Xmrs] object, which
+    is then kept and used for all further accesses.
+
+    Args:
+        string: a SimpleMRS string for a single MRS
+        version: the SimpleMRS version of *string*
+        errors: the error mode used when the string is parsed (see
+            [load])
+    """
+
+    def __init__(self, string, version=_default_version, errors='warn'):
+        self.string = string
+        self._version = version
+        self._errors = errors
+        self._scanned = None
+        self._xmrs = None
+
+    def __getattr__(self, name):
+        # only called when normal lookup fails, i.e. for the internal
+        # structures of the Xmrs (_eps, _vars, etc.) and any
+        # attributes set on the full Xmrs object
+        if name.startswith('__') or name in LazyXmrs._own_attributes:
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    _own_attributes = ('string', '_version', '_errors', '_scanned', '_xmrs')
+
+    def __repr__(self):
+        if self._xmrs is not None:
+            return Xmrs.__repr__(self).replace('<Xmrs', '<LazyXmrs', 1)
+        return '<LazyXmrs object (unparsed) at {}>'.format(id(self))
+
+    def __reduce__(self):
+        # the string is smaller than the parsed form and stays lazy
+        return (self.__class__, (self.string, self._version, self._errors))
+
+    def __eq__(self, other):
+        if isinstance(other, LazyXmrs):
+            other = other.materialize()
+        return self.materialize() == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __contains__(self, obj):
+        return obj in self.materialize()
+
+    def materialize(self):
+        """
+        Return the full [Xmrs] object, parsing the string if necessary.
+        """
+        if self._xmrs is None:
+            tokens = tokenize(self.string)
+            self._xmrs = _read_mrs(tokens, self._version, self._errors)
+            self._scanned = None  # no longer needed
+        return self._xmrs
+
+    def is_materialized(self):
+        """
+        Return `True` if the string has been fully parsed.
+        """
+        return self._xmrs is not None
+
+    # cheap accessors
+
+    def _scan(self):
+        if self._scanned is None:
+            self._scanned = _scan_mrs(tokenize(self.string), self._version)
+        return self._scanned
+
+    def _scanned_property(key):
+        def fget(self):
+            if self._xmrs is not None:
+                return getattr(self._xmrs, key)
+            return self._scan()[key]
+        def fset(self, value):
+            setattr(self.materialize(), key, value)
+        return property(fget, fset)
+
+    top = _scanned_property('top')
+    index = _scanned_property('index')
+    xarg = _scanned_property('xarg')
+    lnk = _scanned_property('lnk')
+    surface = _scanned_property('surface')
+    identifier = _scanned_property('identifier')
+    del _scanned_property
+
+    def nodeids(self, ivs=None, quantifier=None):
+        if ivs is None and quantifier is None and self._xmrs is None:
+            return list(range(_first_nodeid,
+                              _first_nodeid + len(self._scan()['preds'])))
+        return self.materialize().nodeids(ivs=ivs, quantifier=quantifier)
+    nodeids.__doc__ = Xmrs.nodeids.__doc__
+
+    def pred(self, nodeid):
+        if self._xmrs is None:
+            preds = self._scan()['preds']
+            i = nodeid - _first_nodeid
+            if 0 <= i < len(preds):
+                return Pred.string_or_grammar_pred(preds[i])
+            raise KeyError(nodeid)
+        return self._xmrs.pred(nodeid)
+    pred.__doc__ = Xmrs.pred.__doc__
+
+    def preds(self, nodeids=None):
+        if self._xmrs is None:
+            if nodeids is None:
+                return [Pred.string_or_grammar_pred(p)
+                        for p in self._scan()['preds']]
+            return [self.pred(nid) for nid in nodeids]
+        return self._xmrs.preds(nodeids=nodeids)
+    preds.__doc__ = Xmrs.preds.__doc__
+
+
+# nodeids are assigned sequentially by _read_rels()
+_first_nodeid = 10000
+
+
+def _scan_mrs(tokens, version):
+    """
+    Read the header values and the predicate strings of an MRS from
+    *tokens* without building an [Xmrs] object.
+    """
+    scanned = {'top': None, 'index': None, 'xarg': None, 'lnk': None,
+               'surface': None, 'identifier': None, 'preds': []}
+    try:
+        _read_literals(tokens, '[')
+        if version >= 1.1:
+            if tokens[0] == '<':
+                scanned['lnk'] = _read_lnk(tokens)
+            if tokens[0].startswith('"'):
+                scanned['surface'] = tokens.popleft()[1:-1]
+        if tokens[0].upper() in ('LTOP', 'TOP'):
+            tokens.popleft()
+            _read_literals(tokens, ':')
+            scanned['top'] = tokens.popleft()
+        if tokens[0].upper() == 'INDEX':
+            tokens.popleft()
+            _read_literals(tokens, ':')
+            scanned['index'] = tokens.popleft()
+            _read_props(tokens)
+        if tokens[0].upper() == 'RELS':
+            tokens.popleft()
+            _read_literals(tokens, ':', '<')
+            preds = scanned['preds']
+            depth = 0
+            while depth > 0 or tokens[0] != '>':
+                tok = tokens.popleft()
+                if tok == '[':
+                    if depth == 0:
+                        preds.append(tokens.popleft())
+                    depth += 1
+                elif tok == ']':
+                    depth -= 1
+    except IndexError:
+        _unexpected_termination_error()
+    return scanned
+
 ##############################################################################
 ##############################################################################
 # Encoding
 
 
-def serialize(ms, version=_default_version, pretty_print=False, color=False):
+def serialize(ms, version=_default_version, pretty_print=False, color=False,
+              processes=None):
     """Serialize an MRS structure into a SimpleMRS string."""
     delim = '\n' if pretty_print else _default_mrs_delim
     output = delim.join(
-        _serialize_mrs(m, version=version, pretty_print=pretty_print)
-        for m in ms
+        _serialize_chunks(ms, version=version, pretty_print=pretty_print,
+                          processes=processes)
     )
     if color:
         output = highlight(output)
     return output
 
 
+def _serialize_chunks(ms, version=_default_version, pretty_print=False,
+                      processes=None):
+    func = partial(_serialize_mrs, version=version, pretty_print=pretty_print)
+    return parallel_map(func, ms, processes=processes)
+
+
 def _serialize_mrs(m, version=_default_version, pretty_print=False):
     # note that varprops is modified as a side-effect of the lower
     # functions
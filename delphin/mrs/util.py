@@ -1,4 +1,9 @@
-from itertools import chain, combinations
+import gzip
+import io
+import multiprocessing
+import re
+from collections import deque
+from itertools import chain, combinations, islice
 from operator import itemgetter
 from delphin.exceptions import XmrsStructureError
 
@@ -65,6 +70,89 @@ class ReadOnceDict(dict):
         return val
 
 
+def parallel_imap(func, iterable, processes=None, chunksize=16):
+    """
+    Yield `func(x)` for each *x* in *iterable*, in order.
+
+    Unlike `multiprocessing.Pool.imap()`, inputs are only read from
+    *iterable* as results are consumed, so at most a few chunks per
+    worker process are held in memory at a time.
+
+    Args:
+        func: a picklable (i.e., module-level) function
+        iterable: the inputs to *func*, which must be picklable
+        processes: if greater than 1, call *func* in a pool of this
+            many worker processes; otherwise call it in this process
+        chunksize: the number of inputs sent to a worker at a time
+    """
+    if processes is None or processes <= 1:
+        for x in iterable:
+            yield func(x)
+        return
+    it = iter(iterable)
+    maxpending = 2 * processes
+    pending = deque()
+    pool = multiprocessing.Pool(processes)
+    try:
+        while True:
+            while len(pending) < maxpending:
+                chunk = list(islice(it, chunksize))
+                if not chunk:
+                    break
+                pending.append(pool.apply_async(_map_chunk, (func, chunk)))
+            if not pending:
+                break
+            for result in pending.popleft().get():
+                yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def _map_chunk(func, chunk):
+    return [func(x) for x in chunk]
+
+
+def parallel_map(func, ms, processes=None, chunksize=16):
+    """
+    Yield `func(m)` for each object *m* in *ms*, in order.
+
+    If *processes* is greater than 1, *func* is called in a pool of
+    that many worker processes (see [parallel_imap]). [Xmrs] and [Eds]
+    objects are pickled in a compact form for the transfer, which is
+    faster than encoding and decoding them and keeps their classes.
+
+    Args:
+        func: a picklable (i.e., module-level) function
+        ms: an iterable of [Xmrs], [Eds], or other picklable objects
+        processes: the number of worker processes
+        chunksize: the number of objects sent to a worker at a time
+    """
+    if processes is None or processes <= 1:
+        return (func(m) for m in ms)
+    return parallel_imap(func, ms, processes=processes, chunksize=chunksize)
+
+
+def read_lines(fh):
+    """
+    Yield the lines of *fh*, a filename or file object.
+
+    If *fh* is a filename, the file is opened here and closed when the
+    lines are exhausted or the generator is closed; a file object is
+    left open.
+    """
+    if isinstance(fh, str):
+        with open(fh, 'r') as fh_:
+            for line in fh_:
+                yield line
+    else:
+        for line in fh:
+            yield line
+
+
 # adapted from recipe in itertools documentation
 def powerset(iterable):
     s = list(iterable)
@@ -82,15 +170,163 @@ def rargname_sortkey(rargname):
     )
 
 
-# Python2 doesn't have 'unicode' as an encoding option, so fake it
-# (inefficiently, but oh well)
-import xml.etree.ElementTree as etree
+# XML backend for the MRX and DMRX codecs: lxml is used if it is
+# installed, otherwise the standard library's ElementTree
 try:
-    etree.tostring(etree.Element('tag'), encoding='unicode')
-    etree_tostring = etree.tostring
-except LookupError:
-    def etree_tostring(elem, encoding='unicode', **kwargs):
-        if encoding == 'unicode':
-            return etree.tostring(elem, encoding='utf-8', **kwargs).decode('utf-8')
+    from lxml import etree
+    XML_BACKEND = 'lxml'
+except ImportError:
+    import xml.etree.ElementTree as etree
+    XML_BACKEND = 'xml.etree'
+
+if XML_BACKEND == 'lxml':
+    _tag_re = re.compile(r'(<[^>]*>)|&#13;')
+
+    def _tostring(elem):
+        s = etree.tostring(elem, encoding='unicode')
+        # write what xml.etree writes: "<x />" for empty elements,
+        # "&#09;" for tabs in attributes, and carriage returns in text
+        s = s.replace('/>', ' />').replace('&#9;', '&#09;')
+        if '&#13;' in s:
+            s = _tag_re.sub(lambda m: m.group(1) or '\r', s)
+        return s
+else:
+    # Python2 doesn't have 'unicode' as an encoding option, so fake it
+    # (inefficiently, but oh well)
+    try:
+        etree.tostring(etree.Element('tag'), encoding='unicode')
+
+        def _tostring(elem):
+            return etree.tostring(elem, encoding='unicode')
+    except LookupError:
+        def _tostring(elem):
+            return etree.tostring(elem, encoding='utf-8').decode('utf-8')
+
+
+def etree_tostring(elem, encoding='unicode'):
+    """
+    Serialize the XML element *elem*.
+
+    The output is the same with either XML backend. As with
+    xml.etree, an XML declaration is added unless *encoding* is
+    `'unicode'`, `'utf-8'`, or `'us-ascii'`.
+
+    Args:
+        elem: the element to serialize
+        encoding: `'unicode'` to return a string, otherwise the
+            encoding of the returned bytes
+    """
+    s = _tostring(elem)
+    if encoding == 'unicode':
+        return s
+    if encoding.lower() not in ('utf-8', 'us-ascii'):
+        s = u"<?xml version='1.0' encoding='{}'?>\n{}".format(encoding, s)
+    return s.encode(encoding, 'xmlcharrefreplace')
+
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _open_xml_source(source):
+    """
+    Return a file object for *source* (a filename or a file object)
+    and a list of objects to close when done with it. Gzipped data is
+    transparently decompressed as it is read.
+    """
+    to_close = []
+    if isinstance(source, str):
+        source = open(source, 'rb')
+        to_close.append(source)
+    elif isinstance(source, io.TextIOBase):
+        # lxml only reads bytes, so go beneath the text layer if we can
+        if hasattr(source, 'buffer'):
+            source = source.buffer
+        elif XML_BACKEND == 'lxml':
+            source = io.BytesIO(source.read().encode('utf-8'))
+    if isinstance(source, io.TextIOBase):
+        head = b''  # text without an underlying buffer is not gzipped
+    elif hasattr(source, 'peek'):
+        head = source.peek(2)[:2]
+    elif _seekable(source):
+        pos = source.tell()
+        head = source.read(2)
+        source.seek(pos)
+    else:
+        head = source.read(2)
+        source = io.BufferedReader(_PrefixedStream(head, source))
+    if head == _GZIP_MAGIC:
+        source = gzip.GzipFile(fileobj=source)
+        to_close.insert(0, source)
+    return source, to_close
+
+
+def _seekable(fh):
+    try:
+        return fh.seekable()
+    except AttributeError:
+        return False
+
+
+class _PrefixedStream(io.RawIOBase):
+    """
+    A readable stream of the bytes *head* followed by the rest of *fh*.
+
+    Closing it does not close *fh*.
+    """
+    def __init__(self, head, fh):
+        self._head = head
+        self._fh = fh
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._head:
+            data, self._head = self._head[:len(b)], self._head[len(b):]
         else:
-            return etree.tostring(elem, encoding=encoding, **kwargs)
+            data = self._fh.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+
+def iterparse_elements(source, tag):
+    """
+    Yield each *tag* element of the XML document in *source* as soon as
+    it is complete.
+
+    Finished elements are cleared from the document root after they
+    are yielded, so memory use stays flat no matter how many *tag*
+    elements the document contains. Consumers must therefore extract
+    what they need from an element before asking for the next one.
+
+    Args:
+        source: a filename or a (text, binary, or gzipped binary) file
+            object
+        tag: the tag name of the elements to yield
+    """
+    fh, to_close = _open_xml_source(source)
+    try:
+        if XML_BACKEND == 'lxml':
+            # don't load external entities (e.g., local files) or DTDs
+            events = etree.iterparse(fh, events=('end',), tag=tag,
+                                     resolve_entities=False,
+                                     no_network=True)
+            for _, elem in events:
+                yield elem
+                elem.clear()
+                # drop the (now empty) preceding siblings as well
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+            return
+        root = None
+        for event, elem in etree.iterparse(fh, events=('start', 'end')):
+            if root is None:
+                root = elem
+            if event == 'end' and elem.tag == tag:
+                yield elem
+                elem.clear()
+                root.clear()
+    finally:
+        for f in to_close:
+            f.close()
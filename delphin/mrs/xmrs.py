@@ -3,13 +3,16 @@
 Classes and functions for general *MRS processing.
 """
 
-from collections import (defaultdict, deque)
-from itertools import chain
+from collections import (defaultdict, deque, namedtuple, OrderedDict)
+from itertools import chain, count
+import hashlib
+from numbers import Integral
+import struct
 
 from delphin.exceptions import (XmrsError, XmrsStructureError)
 from .components import (
     ElementaryPredication, HandleConstraint, IndividualConstraint,
-    Lnk, _LnkMixin, var_re, var_sort, _VarGenerator,
+    Lnk, _LnkMixin, _var_info, _make_var, var_sort, var_id,
     Pred, Node, nodes, Link, links
 )
 from .config import (
@@ -19,6 +22,17 @@ from .config import (
 )
 
 
+#: Statistics of the derived-structure cache of an [Xmrs]
+DerivedCacheInfo = namedtuple('DerivedCacheInfo', ('hits', 'misses', 'currsize'))
+
+
+#: A problem found by [Xmrs.validate]; *kind* is one of `'missing-label'`,
+#: `'missing-iv'`, `'shared-iv'`, `'shared-bv'`, `'bad-hcons'`,
+#: `'disconnected'`, or `'empty'`, and *data* is the nodeid, variable,
+#: HCONS, or list of disconnected nodeid sets the problem concerns
+XmrsProblem = namedtuple('XmrsProblem', ('kind', 'message', 'data'))
+
+
 class Xmrs(_LnkMixin):
     """
     Xmrs is a common class for Mrs, Rmrs, and Dmrs objects.
@@ -66,16 +80,17 @@ class Xmrs(_LnkMixin):
             identifier: a discourse-utterance id
 
         """
-        self.top = top
-        self.index = index
-        self.xarg = xarg
+        self._top = top
+        self._index = index
+        self._xarg = xarg
         self._nodeids = []
         self._eps = {}
         self._hcons = {}
         self._icons = {}
-        self._vars = defaultdict(
-            lambda: {'props': [], 'refs': defaultdict(list)}
-        )
+        self._vars = _VarTable()
+        # structures computed from the above, such as links and label
+        # heads; cleared whenever EPs, HCONS, or ICONS are added
+        self._cache = _DerivedCache()
 
         # just calling __getitem__ will instantiate them on _vars
         if top is not None: self._vars[top]
@@ -102,12 +117,121 @@ class Xmrs(_LnkMixin):
         #: A discourse-utterance id
         self.identifier = identifier  # Associates an utterance with the RMRS
 
+    @classmethod
+    def from_trusted_parts(cls, top=None, index=None, xarg=None,
+                           eps=None, hcons=None, icons=None, vars=None,
+                           lnk=None, surface=None, identifier=None,
+                           debug=False):
+        """
+        Quickly build an object from parts that are already valid.
+
+        This is meant for deserializers, which construct the parts
+        themselves. The arguments are the same as for [Xmrs], but they
+        are not converted or checked one by one, and the tables are
+        built in a single pass:
+
+        * *eps* must be [ElementaryPredication] objects with (unique)
+          integer nodeids
+        * *hcons* must be [HandleConstraint] objects with unique holes
+        * *icons* must be [IndividualConstraint] objects
+
+        Duplicate nodeids and holes still raise an [XmrsError]. The
+        constructor of *cls* is not called, so subclasses such as [Mrs]
+        and [Dmrs] get the tables of an [Xmrs] and nothing more.
+
+        Args:
+            debug: if `True`, add the parts with [Xmrs.add_eps],
+                [Xmrs.add_hcons], and [Xmrs.add_icons] instead, which
+                check and convert each one
+        Returns:
+            An object of class *cls*.
+        """
+        x = cls.__new__(cls)
+        if debug:
+            Xmrs.__init__(
+                x, top=top, index=index, xarg=xarg,
+                eps=eps, hcons=hcons, icons=icons, vars=vars,
+                lnk=lnk, surface=surface, identifier=identifier
+            )
+        else:
+            x._init_trusted(top, index, xarg, eps, hcons, icons, vars,
+                            lnk, surface, identifier)
+        return x
+
+    def _init_trusted(self, top, index, xarg, eps, hcons, icons, vars,
+                      lnk, surface, identifier):
+        # fill the tables in one pass; see from_trusted_parts()
+        self._top = top
+        self._index = index
+        self._xarg = xarg
+        self._nodeids = _nodeids = []
+        self._eps = _eps = {}
+        self._hcons = _hcons = {}
+        self._icons = _icons = {}
+        self._vars = _vars = _VarTable()
+        self._cache = _DerivedCache()
+        if top is not None: _vars[top]
+        if index is not None: _vars[index]
+        if xarg is not None: _vars[xarg]
+        if vars is not None:
+            for var, props in vars.items():
+                if hasattr(props, 'items'):
+                    props = list(props.items())
+                _vars[var]['props'] = props
+        for ep in (eps or ()):
+            nodeid, lbl = ep[0], ep[2]
+            _nodeids.append(nodeid)
+            _eps[nodeid] = ep
+            if lbl is not None:
+                _vars[lbl]['refs']['LBL'].append(nodeid)
+            for role, val in ep[3].items():
+                if val in _vars or _var_info(val) is not None:
+                    _vars[val]['refs'][role].append(nodeid)
+        if len(_eps) != len(_nodeids):
+            seen = set()
+            for nodeid in _nodeids:
+                if nodeid in seen:
+                    raise XmrsError(
+                        'EP already exists in Xmrs: {} ({})'
+                        .format(nodeid, _eps[nodeid][1])
+                    )
+                seen.add(nodeid)
+        for hc in (hcons or ()):
+            hi, lo = hc[0], hc[2]
+            if hi in _hcons:
+                raise XmrsError(
+                    'Handle constraint already exists for hole %s.' % hi
+                )
+            _hcons[hi] = hc
+            lovd = _vars[lo]
+            if 'hcrefs' not in lovd:
+                lovd['hcrefs'] = []
+            lovd['hcrefs'].extend(
+                (nodeid, role, hi)
+                for role, refs in _vars[hi]['refs'].items()
+                for nodeid in refs
+            )
+        for ic in (icons or ()):
+            left, right = ic[0], ic[2]
+            if left not in _icons:
+                _icons[left] = []
+            _icons[left].append(ic)
+            rightvd = _vars[right]
+            if 'icrefs' not in rightvd:
+                rightvd['icrefs'] = []
+            rightvd['icrefs'].append(ic)
+            _vars[left]
+        self.lnk = lnk
+        self.surface = surface
+        self.identifier = identifier
+
     def add_eps(self, eps):
         """
         Incorporate the list of [EPs] given by *eps*.
         """
         # (nodeid, pred, label, args, lnk, surface, base)
         _nodeids, _eps, _vars = self._nodeids, self._eps, self._vars
+        self._cache.clear()
         for ep in eps:
             try:
                 if not isinstance(ep, ElementaryPredication):
@@ -131,8 +255,8 @@ class Xmrs(_LnkMixin):
                 _vars[lbl]['refs']['LBL'].append(nodeid)
             for role, val in ep.args.items():
                 # if the val is not in _vars, it might still be a
-                # variable; check with var_re
-                if val in _vars or var_re.match(val):
+                # variable; check the interned variable table
+                if val in _vars or _var_info(val) is not None:
                     vardict = _vars[val]
                     vardict['refs'][role].append(nodeid)
                     # if role == IVARG_ROLE:
@@ -148,6 +272,7 @@ class Xmrs(_LnkMixin):
         # (hi, relation, lo)
         _vars = self._vars
         _hcons = self._hcons
+        self._cache.clear()
         for hc in hcons:
             try:
                 if not isinstance(hc, HandleConstraint):
@@ -174,6 +299,7 @@ class Xmrs(_LnkMixin):
         Incorporate the [IndividualConstraints] given by *icons*.
         """
         _vars, _icons = self._vars, self._icons
+        self._cache.clear()
         for ic in icons:
             try:
                 if not isinstance(ic, IndividualConstraint):
@@ -198,6 +324,27 @@ class Xmrs(_LnkMixin):
             stringform = ' '.join(ep[1].lemma for ep in self.eps())
         return '<Xmrs object ({}) at {}>'.format(stringform, id(self))
 
+    def __reduce__(self):
+        # pickle a flat tuple of the contents instead of the (larger)
+        # tables; the derived-structure cache is not pickled
+        return (_unpickle_xmrs, (self.__class__, self._pickle_state()))
+
+    def _pickle_state(self):
+        _eps = self._eps
+        eps = []
+        for nid in self._nodeids:
+            ep = _eps[nid]
+            # leave off the Lnk, surface, and base when they are unset
+            eps.append(tuple(ep) if any(ep[4:]) else tuple(ep[:4]))
+        return (
+            self.top, self.index, self.xarg,
+            tuple(eps),
+            tuple(tuple(hc) for hc in self.hcons()),
+            tuple(tuple(ic) for ic in self.icons()),
+            tuple((var, vd['props']) for var, vd in self._vars.items()),
+            self.lnk, self.surface, self.identifier
+        )
+
     def __contains__(self, obj):
         return obj in self._eps or obj in self._vars
 
@@ -220,6 +367,42 @@ class Xmrs(_LnkMixin):
             return False
         return True
 
+    def cache_info(self):
+        """
+        Return the hit and miss counts and size of the derived-structure
+        cache.
+
+        Links, nodes, label heads, argument maps, and the map of
+        intrinsic variables to nodeids are computed on first request
+        and then kept until EPs, HCONS, or ICONS are added.
+
+        Returns:
+            a [DerivedCacheInfo] tuple of `(hits, misses, currsize)`
+        """
+        return self._cache.info()
+
+    def clear_cache(self):
+        """
+        Discard the structures kept in the derived-structure cache.
+        """
+        self._cache.clear()
+
+    def _variable_property(name):
+        # setting the top, index, or xarg changes derived structures
+        # such as links, so the cache is cleared
+        attr = '_' + name
+        def fget(self):
+            return getattr(self, attr)
+        def fset(self, value):
+            setattr(self, attr, value)
+            self.clear_cache()
+        return property(fget, fset, doc='The {} variable.'.format(name))
+
+    top = _variable_property('top')
+    index = _variable_property('index')
+    xarg = _variable_property('xarg')
+    del _variable_property
+
     @property
     def ltop(self):
         """
@@ -258,17 +441,25 @@ class Xmrs(_LnkMixin):
         if ivs is None:
             nids = list(self._nodeids)
         else:
-            _vars = self._vars
+            ivmap = self._cache.get('ivs', self._iv_map)
             nids = []
             for iv in ivs:
-                if iv in _vars and IVARG_ROLE in _vars[iv]['refs']:
-                    nids.extend(_vars[iv]['refs'][IVARG_ROLE])
+                if iv in ivmap:
+                    nids.extend(ivmap[iv])
                 else:
                     raise KeyError(iv)
         if quantifier is not None:
             nids = [n for n in nids if self.ep(n).is_quantifier()==quantifier]
         return nids
 
+    def _iv_map(self):
+        # {iv: [nodeids of the EPs whose intrinsic variable is iv]}
+        return dict(
+            (var, list(vd['refs'][IVARG_ROLE]))
+            for var, vd in self._vars.items()
+            if IVARG_ROLE in vd['refs']
+        )
+
     def ep(self, nodeid):
         """
         Return the [ElementaryPredication] with the given *nodeid*.
@@ -324,6 +515,30 @@ class Xmrs(_LnkMixin):
         """
         return list(self._vars)
 
+    def var_sort(self, var):
+        """
+        Return the sort of variable *var* (e.g., `'x'` for `'x3'`).
+
+        Variables are parsed once, when they are added to the [Xmrs],
+        so this is faster than [delphin.mrs.components.var_sort].
+        """
+        vd = self._vars.get(var)
+        if vd is None or vd['sort'] is None:
+            return var_sort(var)  # raises ValueError for non-variables
+        return vd['sort']
+
+    def var_id(self, var):
+        """
+        Return the integer id of variable *var* (e.g., `3` for `'x3'`).
+
+        Variables are parsed once, when they are added to the [Xmrs],
+        so this is faster than [delphin.mrs.components.var_id].
+        """
+        vd = self._vars.get(var)
+        if vd is None or vd['vid'] is None:
+            return var_id(var)  # raises ValueError for non-variables
+        return vd['vid']
+
     # access to internal sub-structures
 
     def properties(self, var_or_nodeid, as_list=False):
@@ -422,6 +637,11 @@ class Xmrs(_LnkMixin):
         Returns:
             A dictionary mapping {nodeid: {rargname: value}}
         """
+        return dict(
+            self._cache.get(('out', nodeid), self._outgoing_args, nodeid)
+        )
+
+    def _outgoing_args(self, nodeid):
         _vars = self._vars
         _hcons = self._hcons
         args = self.args(nodeid)  # args is a copy; we can edit it
@@ -449,6 +669,10 @@ class Xmrs(_LnkMixin):
         Returns:
             A dictionary mapping {source_nodeid: {rargname: value}}
         """
+        in_args = self._cache.get(('in', nodeid), self._incoming_args, nodeid)
+        return dict((nid, dict(args)) for nid, args in in_args.items())
+
+    def _incoming_args(self, nodeid):
         _vars = self._vars
         ep = self._eps[nodeid]
         lbl = ep[2]
@@ -495,6 +719,11 @@ class Xmrs(_LnkMixin):
         Returns:
             An iterable of nodeids.
         """
+        return list(
+            self._cache.get(('heads', label), self._labelset_heads, label)
+        )
+
+    def _labelset_heads(self, label):
         _eps = self._eps
         _vars = self._vars
         nodeids = {nodeid: _eps[nodeid][3].get(IVARG_ROLE, None)
@@ -590,6 +819,48 @@ class Xmrs(_LnkMixin):
             lnk=self.lnk, surface=self.surface, identifier=self.identifier
         )
 
+    def freeze(self, ignore_variables=False):
+        """
+        Return an immutable, hashable copy of the [Xmrs].
+
+        See [FrozenXmrs] for a description of the hash.
+
+        Args:
+            ignore_variables: if `True`, the hash does not depend on
+                the names of variables or nodeids
+        Returns:
+            A [FrozenXmrs] object.
+        """
+        return FrozenXmrs(
+            top=self.top, index=self.index, xarg=self.xarg,
+            eps=[ep._replace(args=dict(ep[3])) for ep in self.eps()],
+            hcons=self.hcons(), icons=self.icons(),
+            vars=OrderedDict(
+                (var, list(self.properties(var, as_list=True)))
+                for var in self.variables()
+            ),
+            lnk=self.lnk, surface=self.surface, identifier=self.identifier,
+            ignore_variables=ignore_variables
+        )
+
+    def subgraph_view(self, nodeids):
+        """
+        Return a read-only view of the subgraph with *nodeids*.
+
+        Unlike [Xmrs.subgraph], this does not build a new [Xmrs]. The
+        returned [XmrsView] answers queries from this [Xmrs], and only
+        builds the subgraph when a query needs its full structure, so
+        creating many views (e.g., to test candidate subgraphs for
+        connectedness) is cheap.
+
+        Args:
+            nodeids: the nodeids of the nodes/EPs to include in the
+                subgraph.
+        Returns:
+            An [XmrsView] object.
+        """
+        return XmrsView(self, nodeids)
+
     def is_connected(self):
         """
         Return `True` if the [Xmrs] represents a connected graph.
@@ -597,44 +868,40 @@ class Xmrs(_LnkMixin):
         Subgraphs can be connected through things like arguments,
         QEQs, and label equalities.
         """
-        nids = set(self._nodeids)  # the nids left to find
-        if len(nids) == 0:
+        if len(self._nodeids) == 0:
             raise XmrsError('Cannot compute connectedness of an empty Xmrs.')
-        # build a basic dict graph of relations
-        edges = []
-        # label connections
-        for lbl in self.labels():
-            lblset = self.labelset(lbl)
-            edges.extend((x, y) for x in lblset for y in lblset if x != y)
-        # argument connections
-        _vars = self._vars
-        for nid in nids:
-            for rarg, tgt in self.args(nid).items():
-                if tgt not in _vars:
+        ds = _DisjointSet(self._nodeids)
+        for ep in self._eps.values():
+            self._connect(ds, ep)
+        return ds.count == 1
+
+    def _connect(self, ds, ep):
+        # join the EP in the disjoint set *ds* with those it is
+        # connected to by label equality or by its arguments
+        _vars, _hcons = self._vars, self._hcons
+        nid = ep.nodeid
+        try:
+            if ep.label is not None:
+                ds.union(nid, _vars[ep.label]['refs']['LBL'][0])
+            for tgt in ep.args.values():
+                vd = _vars.get(tgt)
+                if vd is None:
                     continue
-                if IVARG_ROLE in _vars[tgt]['refs']:
-                    tgtnids = list(_vars[tgt]['refs'][IVARG_ROLE])
-                elif tgt in self._hcons:
-                    tgtnids = list(self.labelset(self.hcon(tgt)[2]))
-                elif 'LBL' in _vars[tgt]['refs']:
-                    tgtnids = list(_vars[tgt]['refs']['LBL'])
-                else:
-                    tgtnids = []
-                # connections are bidirectional
-                edges.extend((nid, t) for t in tgtnids if nid != t)
-                edges.extend((t, nid) for t in tgtnids if nid != t)
-        g = {nid: set() for nid in nids}
-        for x, y in edges:
-            g[x].add(y)
-        connected_nids = _bfs(g)
-        if connected_nids == nids:
-            return True
-        elif connected_nids.difference(nids):
-            raise XmrsError(
-                'Possibly bogus nodeids: {}'
-                .format(', '.join(connected_nids.difference(nids)))
-            )
-        return False
+                refs = vd['refs']
+                if refs.get(IVARG_ROLE):
+                    for t in refs[IVARG_ROLE]:
+                        ds.union(nid, t)
+                    continue
+                if tgt in _hcons:
+                    vd = _vars.get(_hcons[tgt][2])
+                    if vd is None:
+                        continue
+                    refs = vd['refs']
+                if refs.get('LBL'):
+                    # the labelset is joined by label equality
+                    ds.union(nid, refs['LBL'][0])
+        except KeyError as ex:
+            raise XmrsError('Possibly bogus nodeid: {}'.format(ex.args[0]))
 
     def is_well_formed(self):
         """
@@ -642,20 +909,14 @@ class Xmrs(_LnkMixin):
 
         See [Xmrs.validate]
         """
-        try:
-            self.validate()
-        except XmrsError:
-            return False
-        return True
+        return len(self.validate(report=True)) == 0
 
-    def validate(self):
+    def validate(self, report=False):
         """
         Check that the Xmrs is well-formed.
 
-        The [Xmrs] is analyzed and a list of problems is compiled. If
-        any problems exist, an [XmrsError] is raised with the list
-        joined as the error message. A well-formed [Xmrs] has the
-        following properties:
+        The [Xmrs] is analyzed in a single pass and a list of problems
+        is compiled. A well-formed [Xmrs] has the following properties:
 
         * All predications have an intrinsic variable
         * Every intrinsic variable belongs one predication and maybe
@@ -667,43 +928,636 @@ class Xmrs(_LnkMixin):
           QEQs, or label-equality.
         * The lo-handle for each QEQ must exist as the label of a
           predication
+
+        Args:
+            report: if `True`, return the list of problems as
+                [XmrsProblem] tuples instead of raising an error
+        Returns:
+            the list of [XmrsProblem] tuples (empty if the [Xmrs] is
+            well-formed) if *report* is `True`; otherwise `None`
+        Raises:
+            XmrsError: if *report* is `False` and any problems exist,
+                with the problem messages joined as the error message
         """
-        errors = []
+        problems = []
         ivs, bvs = {}, {}
         _vars = self._vars
-        _hcons = self._hcons
-        labels = defaultdict(set)
-        # ep_args = {}
-        for ep in self.eps():
+        ds = _DisjointSet(self._nodeids)
+        for ep in self._eps.values():
             nid, lbl, args, is_q = (
                 ep.nodeid, ep.label, ep.args, ep.is_quantifier()
             )
             if lbl is None:
-                errors.append('EP ({}) is missing a label.'.format(nid))
-            labels[lbl].add(nid)
+                problems.append(XmrsProblem(
+                    'missing-label',
+                    'EP ({}) is missing a label.'.format(nid),
+                    nid
+                ))
             iv = args.get(IVARG_ROLE)
             if iv is None:
-                errors.append('EP (nid) is missing an intrinsic variable.'
-                              .format(nid))
-            if is_q:
+                problems.append(XmrsProblem(
+                    'missing-iv',
+                    'EP ({}) is missing an intrinsic variable.'.format(nid),
+                    nid
+                ))
+            elif is_q:
                 if iv in bvs:
-                    errors.append('{} is the bound variable for more than '
-                                  'one quantifier.'.format(iv))
+                    problems.append(XmrsProblem(
+                        'shared-bv',
+                        '{} is the bound variable for more than one '
+                        'quantifier.'.format(iv),
+                        iv
+                    ))
                 bvs[iv] = nid
             else:
                 if iv in ivs:
-                    errors.append('{} is the intrinsic variable for more '
-                                  'than one EP.'.format(iv))
+                    problems.append(XmrsProblem(
+                        'shared-iv',
+                        '{} is the intrinsic variable for more than one '
+                        'EP.'.format(iv),
+                        iv
+                    ))
                 ivs[iv] = nid
-            # ep_args[nid] = args
-        for hc in _hcons.values():
-            if hc[2] not in labels:
-                errors.append('Lo variable of HCONS ({} {} {}) is not the '
-                              'label of any EP.'.format(*hc))
-        if not self.is_connected():
-            errors.append('Xmrs structure is not connected.')
-        if errors:
-            raise XmrsError('\n'.join(errors))
+            self._connect(ds, ep)
+        for hc in self._hcons.values():
+            lo = _vars.get(hc[2])
+            if lo is None or not lo['refs'].get('LBL'):
+                problems.append(XmrsProblem(
+                    'bad-hcons',
+                    'Lo variable of HCONS ({} {} {}) is not the label of '
+                    'any EP.'.format(*hc),
+                    hc
+                ))
+        if ds.count == 0:
+            problems.append(XmrsProblem(
+                'empty', 'Cannot compute connectedness of an empty Xmrs.', None
+            ))
+        elif ds.count > 1:
+            problems.append(XmrsProblem(
+                'disconnected', 'Xmrs structure is not connected.',
+                ds.groups()
+            ))
+        if report:
+            return problems
+        if problems:
+            raise XmrsError('\n'.join(p.message for p in problems))
+
+
+class XmrsView(Xmrs):
+    """
+    A read-only view of the subgraph of an [Xmrs] with some nodeids.
+
+    The view has the same contents as `xmrs.subgraph(nodeids)`, but
+    EPs, variables, and properties are looked up in the parent [Xmrs]
+    when requested. The `top`, `index`, and `xarg` of the view, its
+    variables, HCONS, and ICONS are computed on first access, which
+    takes time proportional to the size of the subgraph. Queries that
+    need the full structure (e.g., [Xmrs.outgoing_args] or
+    [Xmrs.labelset_heads]) build the subgraph with [XmrsView.materialize]
+    and answer from that. The parent should not be modified while the
+    view is in use.
+
+    Args:
+        parent: the [Xmrs] the view is over
+        nodeids: the nodeids of the nodes/EPs in the view
+    """
+
+    def __init__(self, parent, nodeids):
+        self._parent = parent
+        self._nodeids = list(nodeids)
+        self._nidset = frozenset(self._nodeids)
+        self._eps = dict((nid, parent.ep(nid)) for nid in self._nodeids)
+        self._subvars = None
+        self._xmrs = None
+
+    def __repr__(self):
+        return '<XmrsView object ({}) at {}>'.format(
+            ' '.join(ep[1].lemma for ep in self.eps()), id(self)
+        )
+
+    def __contains__(self, obj):
+        return obj in self._nidset or obj in self._variables()
+
+    def __reduce__(self):
+        # views are pickled as the subgraph, without the parent
+        return self.materialize().__reduce__()
+
+    def materialize(self):
+        """
+        Return the subgraph as a full [Xmrs] object.
+
+        The [Xmrs] is built on the first call and then reused.
+        """
+        if self._xmrs is None:
+            self._xmrs = self._parent.subgraph(self._nodeids)
+        return self._xmrs
+
+    # attributes
+
+    lnk = property(lambda self: self._parent.lnk)
+    surface = property(lambda self: self._parent.surface)
+    identifier = property(lambda self: self._parent.identifier)
+
+    @property
+    def top(self):
+        self._variables()
+        return self._subvars[0]
+
+    @property
+    def index(self):
+        self._variables()
+        return self._subvars[1]
+
+    @property
+    def xarg(self):
+        self._variables()
+        return self._subvars[2]
+
+    # the tables of a full Xmrs, for inherited methods that need them
+
+    _vars = property(lambda self: self.materialize()._vars)
+    _hcons = property(lambda self: self.materialize()._hcons)
+    _icons = property(lambda self: self.materialize()._icons)
+    _cache = property(lambda self: self.materialize()._cache)
+
+    def _variables(self):
+        # (top, index, xarg, {var: props}) as in Xmrs.subgraph()
+        if self._subvars is None:
+            parent = self._parent
+            eps = self.eps()
+            lbls = set(ep[2] for ep in eps)
+            top = index = xarg = None
+            subvars = OrderedDict()
+            if parent.top:
+                top = parent.top
+                try:
+                    tophc = parent.hcon(top)
+                except KeyError:
+                    tophc = None
+                if tophc is not None and tophc[2] in lbls:
+                    subvars[top] = []
+                elif top not in lbls:
+                    top = None
+            if parent.xarg:
+                xarg = parent.xarg
+                subvars[xarg] = parent.properties(xarg, as_list=True)
+            for lbl in lbls:
+                subvars[lbl] = []
+            for ep in eps:
+                for var in ep[3].values():
+                    if var not in subvars and var in parent:
+                        subvars[var] = parent.properties(var, as_list=True)
+            if parent.index in subvars:
+                index = parent.index
+            # an Xmrs adds its top, index, and xarg variables first
+            ordered = OrderedDict(
+                (var, subvars[var]) for var in (top, index, xarg)
+                if var is not None
+            )
+            for var, props in subvars.items():
+                ordered.setdefault(var, props)
+            self._subvars = (top, index, xarg, ordered, lbls)
+        return self._subvars[3]
+
+    # views are read-only
+
+    def add_eps(self, eps):
+        """
+        Raise an [XmrsError], as views cannot be modified.
+        """
+        raise XmrsError('XmrsView objects cannot be modified.')
+
+    def add_hcons(self, hcons):
+        """
+        Raise an [XmrsError], as views cannot be modified.
+        """
+        raise XmrsError('XmrsView objects cannot be modified.')
+
+    def add_icons(self, icons):
+        """
+        Raise an [XmrsError], as views cannot be modified.
+        """
+        raise XmrsError('XmrsView objects cannot be modified.')
+
+    # read API answered from the parent
+
+    def nodeids(self, ivs=None, quantifier=None):
+        """
+        Return the list of nodeids given by *ivs*, or all nodeids.
+
+        See [Xmrs.nodeids].
+        """
+        if ivs is None:
+            nids = list(self._nodeids)
+        else:
+            nidset = self._nidset
+            nids = []
+            for iv in ivs:
+                found = [nid for nid in self._parent.nodeids(ivs=[iv])
+                         if nid in nidset]
+                if not found:
+                    raise KeyError(iv)
+                nids.extend(found)
+        if quantifier is not None:
+            nids = [n for n in nids if self.ep(n).is_quantifier()==quantifier]
+        return nids
+
+    def hcon(self, hi):
+        """
+        Return the [HandleConstraint] with high variable *hi*.
+        """
+        for hc in self.hcons():
+            if hc[0] == hi:
+                return hc
+        raise KeyError(hi)
+
+    def hcons(self):
+        """
+        Return the list of all [HandleConstraints].
+        """
+        parent, lbls = self._parent, self._labels()
+        hcons = []
+        for var in self._variables():
+            try:
+                hc = parent.hcon(var)
+            except KeyError:
+                continue
+            if hc[2] in lbls:
+                hcons.append(hc)
+        return hcons
+
+    def icons(self, left=None):
+        """
+        Return the [ICONS] with left variable *left*, or all [ICONS].
+
+        See [Xmrs.icons].
+        """
+        parent, subvars = self._parent, self._variables()
+        icons = [ic for ic in parent.icons()
+                 if ic[0] in subvars and ic[2] in subvars]
+        if left is not None:
+            icons = [ic for ic in icons if ic[0] == left]
+            if not icons:
+                raise KeyError(left)
+        return icons
+
+    def variables(self):
+        """
+        Return the list of all variables.
+        """
+        return list(self._variables())
+
+    def var_sort(self, var):
+        return self._parent.var_sort(var)
+    var_sort.__doc__ = Xmrs.var_sort.__doc__
+
+    def var_id(self, var):
+        return self._parent.var_id(var)
+    var_id.__doc__ = Xmrs.var_id.__doc__
+
+    def properties(self, var_or_nodeid, as_list=False):
+        """
+        Return a dictionary of variable properties for *var_or_nodeid*.
+
+        See [Xmrs.properties].
+        """
+        subvars = self._variables()
+        if var_or_nodeid in subvars:
+            props = list(subvars[var_or_nodeid])
+        elif var_or_nodeid in self._nidset:
+            var = self._eps[var_or_nodeid][3].get(IVARG_ROLE)
+            props = list(subvars.get(var, []))
+        else:
+            raise KeyError(var_or_nodeid)
+        if not as_list:
+            props = dict(props)
+        return props
+
+    def labelset(self, label):
+        """
+        Return the set of nodeids for predications that share *label*.
+
+        See [Xmrs.labelset].
+        """
+        return [nid for nid in self._nodeids if self._eps[nid][2] == label]
+
+    def _labels(self):
+        self._variables()
+        return self._subvars[4]
+
+    def is_connected(self):
+        """
+        Return `True` if the subgraph is connected.
+
+        See [Xmrs.is_connected].
+        """
+        if len(self._nodeids) == 0:
+            raise XmrsError('Cannot compute connectedness of an empty Xmrs.')
+        parent, nidset = self._parent, self._nidset
+        ds = _DisjointSet(self._nodeids)
+        # the first nodeid in the view with each label
+        firsts = {}
+        for nid in self._nodeids:
+            lbl = self._eps[nid][2]
+            if lbl is not None:
+                ds.union(nid, firsts.setdefault(lbl, nid))
+        for nid in self._nodeids:
+            for tgt in self._eps[nid][3].values():
+                try:
+                    tgtnids = [t for t in parent.nodeids(ivs=[tgt])
+                               if t in nidset]
+                except (KeyError, TypeError):
+                    tgtnids = []
+                if tgtnids:
+                    for t in tgtnids:
+                        ds.union(nid, t)
+                    continue
+                try:
+                    lo = parent.hcon(tgt)[2]
+                except (KeyError, TypeError):
+                    lo = None
+                if lo in firsts:
+                    ds.union(nid, firsts[lo])
+                elif tgt in firsts:
+                    ds.union(nid, firsts[tgt])
+        return ds.count == 1
+
+
+class FrozenXmrs(Xmrs):
+    """
+    An immutable [Xmrs] with a precomputed structural hash.
+
+    FrozenXmrs objects are usually made with [Xmrs.freeze]. They can
+    be used in sets and as dictionary keys, and two FrozenXmrs objects
+    made the same way are only compared in full if their hashes are
+    equal. Adding EPs, HCONS, or ICONS or setting attributes raises an
+    [XmrsError].
+
+    The hash is computed from a SHA-1 digest (available as the
+    `digest` attribute), so it is the same in every process. By
+    default it is computed from the parts that [Xmrs] equality
+    compares: the top, index, and xarg, the nodeid, predicate, label,
+    and arguments of each EP, the HCONS, and the ICONS. If
+    *ignore_variables* is `True`, it is computed instead from the
+    predicates, constant arguments, and argument roles and the sorts
+    of variables, and not from variable names or nodeids, so any two
+    structures that are isomorphic (as determined by
+    [delphin.mrs.compare.isomorphic]) have the same hash. Variable
+    properties, Lnks, and surface strings are never part of the hash.
+
+    Args:
+        ignore_variables: if `True`, compute the hash without
+            variable names or nodeids
+
+    The other arguments are the same as for [Xmrs].
+    """
+
+    _frozen = False
+
+    def __init__(self, top=None, index=None, xarg=None,
+                 eps=None, hcons=None, icons=None, vars=None,
+                 lnk=None, surface=None, identifier=None,
+                 ignore_variables=False):
+        Xmrs.__init__(
+            self, top=top, index=index, xarg=xarg,
+            eps=eps, hcons=hcons, icons=icons, vars=vars,
+            lnk=lnk, surface=surface, identifier=identifier
+        )
+        self.ignore_variables = ignore_variables
+        if ignore_variables:
+            content = self._canonical_form()
+        else:
+            content = self._exact_form()
+        digest = hashlib.sha1(_digest_text(content).encode('utf-8'))
+        self.digest = digest.hexdigest()
+        self._hash = struct.unpack('<q', digest.digest()[:8])[0]
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise XmrsError('FrozenXmrs objects cannot be modified.')
+        Xmrs.__setattr__(self, name, value)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if (isinstance(other, FrozenXmrs)
+                and other.ignore_variables == self.ignore_variables
+                and other._hash != self._hash):
+            return False
+        return Xmrs.__eq__(self, other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __repr__(self):
+        return Xmrs.__repr__(self).replace('<Xmrs', '<FrozenXmrs', 1)
+
+    def __reduce__(self):
+        return (_unpickle_frozen_xmrs,
+                (self.__class__, self._pickle_state(), self.ignore_variables))
+
+    def _exact_form(self):
+        return (
+            self.top, self.index, self.xarg,
+            sorted(_digest_text((ep[0], ep[1]._key, ep[2],
+                                 sorted(ep[3].items())))
+                   for ep in self.eps()),
+            sorted(_digest_text(hc) for hc in self.hcons()),
+            sorted(_digest_text(ic) for ic in self.icons())
+        )
+
+    def _canonical_form(self):
+        # variables are described by their sort and the predicates and
+        # roles that select them, and EPs by their predicate and the
+        # set of descriptions of their argument targets (roles are left
+        # off of arguments since the variable descriptions include
+        # them); this is no finer than compare.isomorphic()
+        def pred_sig(ep):
+            return (ep[1]._key, ep[3].get(CONSTARG_ROLE))
+        refs = defaultdict(list)
+        for ep in self.eps():
+            sig = pred_sig(ep)
+            if ep[2] is not None:
+                refs[ep[2]].append((sig, 'LBL'))
+            for role, val in ep[3].items():
+                if role != CONSTARG_ROLE:
+                    refs[val].append((sig, role))
+        # the stored sort is None for keys that are not variable
+        # strings, which var_sort() would reject
+        var_sigs = {}
+        for var, vd in self._vars.items():
+            var_sigs[var] = _digest_text(
+                (vd['sort'], sorted(map(_digest_text, refs[var])))
+            )
+
+        def var_sig(val):
+            if val in var_sigs:
+                return var_sigs[val]
+            return _digest_text(('', val))  # a constant
+        return (
+            sorted(var_sigs.values()),
+            sorted(_digest_text((pred_sig(ep),
+                         sorted(set(var_sig(val)
+                                    for role, val in ep[3].items()
+                                    if role != CONSTARG_ROLE))))
+                   for ep in self.eps()),
+            sorted(_digest_text((var_sig(hc[0]), hc[1], var_sig(hc[2])))
+                   for hc in self.hcons())
+        )
+
+    def add_eps(self, eps):
+        if self._frozen:
+            raise XmrsError('FrozenXmrs objects cannot be modified.')
+        Xmrs.add_eps(self, eps)
+    add_eps.__doc__ = Xmrs.add_eps.__doc__
+
+    def add_hcons(self, hcons):
+        if self._frozen:
+            raise XmrsError('FrozenXmrs objects cannot be modified.')
+        Xmrs.add_hcons(self, hcons)
+    add_hcons.__doc__ = Xmrs.add_hcons.__doc__
+
+    def add_icons(self, icons):
+        if self._frozen:
+            raise XmrsError('FrozenXmrs objects cannot be modified.')
+        Xmrs.add_icons(self, icons)
+    add_icons.__doc__ = Xmrs.add_icons.__doc__
+
+    def freeze(self, ignore_variables=False):
+        """
+        Return the [FrozenXmrs] itself if it was frozen with the same
+        *ignore_variables* value, otherwise a new one.
+        """
+        if ignore_variables == self.ignore_variables:
+            return self
+        return Xmrs.freeze(self, ignore_variables=ignore_variables)
+
+
+def _unpickle_xmrs(cls, state):
+    # subclasses (e.g., Mrs and Dmrs) have different constructors, but
+    # they all fill the same tables as Xmrs
+    top, index, xarg, eps, hcons, icons, vars, lnk, surface, ident = state
+    return cls.from_trusted_parts(
+        top=top, index=index, xarg=xarg,
+        eps=[ElementaryPredication(*ep) for ep in eps],
+        hcons=[HandleConstraint(*hc) for hc in hcons],
+        icons=[IndividualConstraint(*ic) for ic in icons],
+        vars=OrderedDict(vars),
+        lnk=lnk, surface=surface, identifier=ident
+    )
+
+
+def _digest_text(obj):
+    # serialize nested tuples and lists of strings, integers, and None
+    # for FrozenXmrs digests; unlike repr(), the text is the same for
+    # str and unicode strings on Python 2 and on Python 3
+    if obj is None:
+        return 'None'
+    elif isinstance(obj, (tuple, list)):
+        return '(' + ','.join(_digest_text(x) for x in obj) + ')'
+    elif isinstance(obj, Integral):
+        return str(int(obj))
+    else:
+        return '"' + obj.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _unpickle_frozen_xmrs(cls, state, ignore_variables):
+    top, index, xarg, eps, hcons, icons, vars, lnk, surface, ident = state
+    return cls(
+        top=top, index=index, xarg=xarg,
+        eps=eps, hcons=hcons, icons=icons, vars=OrderedDict(vars),
+        lnk=lnk, surface=surface, identifier=ident,
+        ignore_variables=ignore_variables
+    )
+
+
+class _DisjointSet(object):
+    """
+    A union-find structure over *items*, with union by size and path
+    halving, that counts the number of disjoint sets.
+    """
+
+    __slots__ = ('parent', 'size', 'count')
+
+    def __init__(self, items):
+        self.parent = dict((x, x) for x in items)
+        self.size = dict.fromkeys(self.parent, 1)
+        self.count = len(self.parent)
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x != y:
+            size = self.size
+            if size[x] < size[y]:
+                x, y = y, x
+            self.parent[y] = x
+            size[x] += size[y]
+            self.count -= 1
+
+    def groups(self):
+        """Return the disjoint sets as a list of sets."""
+        groups = OrderedDict()
+        for x in self.parent:
+            groups.setdefault(self.find(x), set()).add(x)
+        return list(groups.values())
+
+
+class _DerivedCache(object):
+    """
+    The derived-structure cache of an [Xmrs], with hit and miss counts.
+    """
+
+    __slots__ = ('data', 'hits', 'misses')
+
+    def __init__(self):
+        self.data = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, make, *args):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            value = self.data[key] = make(*args)
+        else:
+            self.hits += 1
+        return value
+
+    def clear(self):
+        self.data.clear()
+
+    def info(self):
+        return DerivedCacheInfo(self.hits, self.misses, len(self.data))
+
+
+class _VarTable(dict):
+    """
+    The variable table of an [Xmrs].
+
+    Looking up a new variable adds an entry for it, which also stores
+    the variable's sort and integer id (both `None` if it is not a
+    valid variable string), so the string does not need to be parsed
+    again.
+    """
+
+    def __missing__(self, var):
+        info = _var_info(var)
+        sort, vid = info if info is not None else (None, None)
+        vd = self[var] = {
+            'props': [], 'refs': defaultdict(list), 'sort': sort, 'vid': vid
+        }
+        return vd
 
 
 class Mrs(Xmrs):
@@ -778,11 +1632,13 @@ class Mrs(Xmrs):
             p = ep.pred.short_form() if short_pred else ep.pred.string
             d = dict(label=ep.label, predicate=p, arguments=ep.args)
             if ep.lnk is not None: d['lnk'] = _lnk(ep)
+            if ep.surface is not None: d['surface'] = ep.surface
+            if ep.base is not None: d['base'] = ep.base
             return d
         def _hcons(hc): return {'relation':hc[1], 'high':hc[0], 'low':hc[2]}
         def _icons(ic): return {'relation':ic[1], 'left':ic[0], 'right':ic[2]}
         def _var(v):
-            d = {'type': var_sort(v)}
+            d = {'type': self.var_sort(v)}
             if properties and self.properties(v):
                 d['properties'] = self.properties(v)
             return d
@@ -796,9 +1652,9 @@ class Mrs(Xmrs):
         if self.top is not None: d['top'] = self.top
         if self.index is not None: d['index'] = self.index
         # if self.xarg is not None: d['xarg'] = self.xarg
-        # if self.lnk is not None: d['lnk'] = self.lnk
-        # if self.surface is not None: d['surface'] = self.surface
-        # if self.identifier is not None: d['identifier'] = self.identifier
+        if self.lnk is not None: d['lnk'] = _lnk(self)
+        if self.surface is not None: d['surface'] = self.surface
+        if self.identifier is not None: d['identifier'] = self.identifier
         return d
 
     @classmethod
@@ -808,9 +1664,9 @@ class Mrs(Xmrs):
         """
         def _lnk(o):
             return None if o is None else Lnk.charspan(o['from'], o['to'])
-        def _ep(ep):
+        def _ep(nodeid, ep):
             return ElementaryPredication(
-                nodeid=None,
+                nodeid=nodeid,
                 pred=Pred.string_or_grammar_pred(ep['predicate']),
                 label=ep['label'],
                 args=ep.get('arguments', {}),
@@ -818,18 +1674,20 @@ class Mrs(Xmrs):
                 surface=ep.get('surface'),
                 base=ep.get('base')
             )
-        eps = [_ep(rel) for rel in d.get('relations', [])]
-        hcons = [(c['high'], c['relation'], c['low'])
+        # number the EPs as Mrs() would
+        eps = [_ep(nodeid, rel) for nodeid, rel
+               in enumerate(d.get('relations', []), FIRST_NODEID)]
+        hcons = [HandleConstraint(c['high'], c['relation'], c['low'])
                  for c in d.get('constraints', []) if 'high' in c]
-        icons = [(c['high'], c['relation'], c['low'])
+        icons = [IndividualConstraint(c['left'], c['relation'], c['right'])
                  for c in d.get('constraints', []) if 'left' in c]
-        variables = {var: {k:v for k, v in data.items() if k != 'type'}
+        variables = {var: data.get('properties', {})
                      for var, data in d.get('variables', {}).items()}
-        return cls(
+        return cls.from_trusted_parts(
             top=d.get('top'),
             index=d.get('index'),
             xarg=d.get('xarg'),
-            rels=eps,
+            eps=eps,
             hcons=hcons,
             icons=icons,
             lnk=_lnk(d.get('lnk')),
@@ -930,59 +1788,10 @@ class Dmrs(Xmrs):
             self,
             nodes=None, links=None, lnk=None, surface=None, identifier=None,
             **kwargs):
-        if nodes is None: nodes = []
-        if links is None: links = []
-        qeq = HandleConstraint.qeq
-        vgen = _VarGenerator()
-        labels = _make_labels(nodes, links, vgen)
-        ivs = _make_ivs(nodes, vgen)
-        top = index = xarg = None  # for now; maybe get them from kwargs?
-        # initialize args with ARG0 for intrinsic variables
-        args = {nid: {IVARG_ROLE: iv} for nid, iv in ivs.items()}
-        hcons = []
-        for l in links:
-            if l.start not in args:
-                args[l.start] = {}
-            # FIXME: I don't have a clear answer about how LTOP links are
-            # constructed, so I will assume that H_POST or NIL_POST
-            # assumes a QEQ. Label equality would have been captured by
-            # _make_labels() earlier.
-            if l.start == LTOP_NODEID:
-                top = labels[LTOP_NODEID]
-                if l.post == H_POST or l.post == NIL_POST:
-                    hcons += [qeq(labels[LTOP_NODEID], labels[l.end])]
-            else:
-                if not l.rargname or l.rargname.upper() == 'NIL':
-                    continue  # don't make an argument for bare EQ links
-                if l.post == H_POST:
-                    hole = vgen.new(HANDLESORT)[0]
-                    hcons += [qeq(hole, labels[l.end])]
-                    args[l.start][l.rargname] = hole
-                    # if the arg is RSTR, it's a quantifier, so we can
-                    # find its intrinsic variable now
-                    if l.rargname.upper() == RSTR_ROLE:
-                        ivs[l.start] = ivs[l.end]
-                        args[l.start][IVARG_ROLE] = ivs[l.start]
-                elif l.post == HEQ_POST:
-                    args[l.start][l.rargname] = labels[l.end]
-                else:  # NEQ_POST or EQ_POST
-                    args[l.start][l.rargname] = ivs[l.end]
-        eps = []
-        for node in nodes:
-            nid = node.nodeid
-            if node.carg is not None:
-                args[nid][CONSTARG_ROLE] = node.carg
-            ep = (nid, node.pred, labels[nid], args[nid],
-                  node.lnk, node.surface, node.base)
-            eps.append(ep)
-
-        icons = None  # future feature
-
-        return super(Dmrs, self).__init__(
-            top=top, index=index, xarg=xarg,
-            eps=eps, hcons=hcons, icons=icons, vars=vgen.store,
-            lnk=lnk, surface=surface, identifier=identifier
-        )
+        top, eps, hcons, variables = _dmrs_parts(nodes or [], links or [])
+        # the parts are built here, so they don't need to be checked
+        self._init_trusted(top, None, None, eps, hcons, None, variables,
+                           lnk, surface, identifier)
 
     def to_dict(self, short_pred=True, properties=True):
         """
@@ -995,7 +1804,7 @@ class Dmrs(Xmrs):
             if node.lnk is not None: d['lnk'] = _lnk(node)
             if properties and node.sortinfo:
                 if not node.is_quantifier():
-                    d['sortinfo'] = node.sortinfo
+                    d['sortinfo'] = dict(node.sortinfo)
             if node.surface is not None: d['surface'] = node.surface
             if node.base is not None: d['base'] = node.base
             if node.carg is not None: d['carg'] = node.carg
@@ -1042,36 +1851,99 @@ class Dmrs(Xmrs):
             identifier=d.get('identifier')
         )
 
-def _make_labels(nodes, links, vgen):
-    eq_edges = defaultdict(set)
+def _dmrs_parts(nodes, links):
+    # Return the top, EPs, HCONS, and variables (mapped to their
+    # properties) for the *nodes* and *links* of a DMRS. Variables are
+    # numbered in order: labels (starting at h0 if there is a link from
+    # TOP), then intrinsic variables, then holes for H links.
+    variables = {}
+    has_top = any(link.start == LTOP_NODEID for link in links)
+    vids = count(0 if has_top else 1)
+
+    def new_var(sort, props):
+        var = _make_var(sort, next(vids))
+        variables[var] = props
+        return var
+
+    # nodes joined by EQ links share a label
     nids = [node.nodeid for node in nodes]
-    for l in links:
-        if l.start == LTOP_NODEID:
-            vgen.vid = 0  # start at h0 for TOP
-            nids = [LTOP_NODEID] + nids
-        if l.post == EQ_POST:
-            eq_edges[l.start].add(l.end)
-            eq_edges[l.end].add(l.start)
-    seen = set()
+    if has_top:
+        nids.insert(0, LTOP_NODEID)
+    eqs = [(link.start, link.end) for link in links if link.post == EQ_POST]
+    ds = _DisjointSet(chain.from_iterable(eqs))
+    for start, end in eqs:
+        ds.union(start, end)
+    eqgroups = ds.parent
     labels = {}
+    grouplabels = {}
     for nid in nids:
-        if nid not in seen:
-            lbl = vgen.new(HANDLESORT)[0]
-            for conj_nid in _bfs(eq_edges, nid):
-                labels[conj_nid] = lbl
-                seen.add(conj_nid)
-    return labels
-
-def _make_ivs(nodes, vgen):
+        # nodes without EQ links are in groups by themselves
+        group = ds.find(nid) if nid in eqgroups else nid
+        if group not in grouplabels:
+            grouplabels[group] = new_var(HANDLESORT, [])
+        labels[nid] = grouplabels[group]
+    for nid in eqgroups:  # EQ link endpoints without nodes
+        if nid not in labels and ds.find(nid) in grouplabels:
+            labels[nid] = grouplabels[ds.find(nid)]
+
+    # quantifiers share their IV with the quantifiee, which is
+    # selected below with the RSTR link
     ivs = {}
+    args = {}
     for node in nodes:
-        # quantifiers share their IV with the quantifiee. It will be
-        # selected later during argument construction
         if not node.is_quantifier():
-            props = dict((key, val) for key, val in node.sortinfo.items()
-                         if key != CVARSORT)
-            ivs[node.nodeid] = vgen.new(node.cvarsort, props)[0]
-    return ivs
+            sortinfo = node.sortinfo
+            sort = sortinfo.get(CVARSORT)
+            if sort is None:
+                sort = UNKNOWNSORT
+            props = [(key, val) for key, val in sortinfo.items()
+                     if key != CVARSORT]
+            iv = ivs[node.nodeid] = new_var(sort, props)
+            args[node.nodeid] = {IVARG_ROLE: iv}
+
+    QEQ = HandleConstraint.QEQ
+    top = None
+    hcons = []
+    for start, end, rargname, post in links:
+        if start not in args:
+            args[start] = {}
+        # FIXME: I don't have a clear answer about how LTOP links are
+        # constructed, so I will assume that H_POST or NIL_POST
+        # assumes a QEQ. Label equality was captured with the labels.
+        if start == LTOP_NODEID:
+            top = labels[LTOP_NODEID]
+            if post == H_POST or post == NIL_POST:
+                hcons.append(HandleConstraint(top, QEQ, labels[end]))
+            continue
+        role = rargname.upper() if rargname else 'NIL'
+        if role == 'NIL':
+            continue  # don't make an argument for bare EQ links
+        if post == H_POST:
+            hole = new_var(HANDLESORT, [])
+            hcons.append(HandleConstraint(hole, QEQ, labels[end]))
+            args[start][rargname] = hole
+            # if the arg is RSTR, it's a quantifier, so we can find
+            # its intrinsic variable now
+            if role == RSTR_ROLE:
+                ivs[start] = ivs[end]
+                args[start][IVARG_ROLE] = ivs[start]
+        elif post == HEQ_POST:
+            args[start][rargname] = labels[end]
+        else:  # NEQ_POST or EQ_POST
+            args[start][rargname] = ivs[end]
+
+    eps = []
+    for node in nodes:
+        nid = node.nodeid
+        nodeargs = args[nid]
+        if node.carg is not None:
+            nodeargs[CONSTARG_ROLE] = node.carg
+        eps.append(ElementaryPredication(
+            nid, node.pred, labels[nid], nodeargs,
+            node.lnk, node.surface, node.base
+        ))
+    return top, eps, hcons, variables
+
 
 # inspired by NetworkX is_connected():
 # https://networkx.github.io/documentation/latest/_modules/networkx/algorithms/components/connected.html#is_connected
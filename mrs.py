@@ -1,71 +1,145 @@
 #!/usr/bin/env python3
 
 import sys
+import time
 import argparse
-from delphin.mrs import simplemrs, mrx, dmrx, eds, simpledmrs
+from functools import partial
+
+from delphin import codecs
+from delphin.mrs.util import parallel_map
 from delphin.extra.latex import dmrs_tikz_dependency
 
-mrsformats = {
-    'simplemrs': simplemrs,
-    'mrx': mrx,
-    'dmrx': dmrx,
-    'eds': eds,
-    'simpledmrs': simpledmrs
-}
 extraformats = {
     'dmrs-tikz': dmrs_tikz_dependency
 }
 
-parser = argparse.ArgumentParser(description="Utility for manipulating MRSs")
-subparsers = parser.add_subparsers(dest='command')
-
-convert_parser = subparsers.add_parser('convert', aliases=['c'])
-convert_parser.add_argument(
-    '--from', '-f',
-    dest='srcfmt',
-    choices=list(mrsformats.keys())
-)
-convert_parser.add_argument(
-    '--to', '-t',
-    dest='tgtfmt',
-    choices=list(mrsformats.keys()) + list(extraformats.keys())
-)
-convert_parser.add_argument('--pretty-print', '-p', action='store_true')
-convert_parser.add_argument('--color', '-c', action='store_true')
-convert_parser.add_argument('infile', metavar='PATH', nargs='?')
-
-path_parser = subparsers.add_parser('paths', aliases=['p'])
-path_parser.add_argument('--format', '-f', choices=list(mrsformats.keys()))
-path_parser.add_argument('--depth', '-d', default=-1)
-path_parser.add_argument('infile', metavar='PATH', nargs='?')
-
-args = parser.parse_args()
-if args.command in ('convert', 'c'):
-    srcfmt = mrsformats[args.srcfmt]
-    if args.infile is not None:
-        ms = srcfmt.load(open(args.infile, 'r'))
-    else:
-        ms = srcfmt.loads(sys.stdin.read())
 
-    output = ''
-    if args.tgtfmt in mrsformats:
-        output = mrsformats[args.tgtfmt].dumps(
-            ms,
+class Monitor(object):
+    """
+    Count the items passing through a stream and report the rate.
+    """
+    def __init__(self, progress=False, stream=sys.stderr, interval=1.0):
+        self.progress = progress
+        self.stream = stream
+        self.interval = interval
+        self.count = 0
+        self.start = None
+
+    def watch(self, items):
+        self.start = last = time.time()
+        for item in items:
+            self.count += 1
+            if self.progress:
+                now = time.time()
+                if now - last >= self.interval:
+                    last = now
+                    self.stream.write('\r' + self.summary(now))
+                    self.stream.flush()
+            yield item
+
+    def summary(self, now=None):
+        if now is None:
+            now = time.time()
+        elapsed = now - (self.start or now)
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        return '{} items in {:.2f}s ({:.1f} items/s)'.format(
+            self.count, elapsed, rate
+        )
+
+    def report(self):
+        if self.progress:
+            self.stream.write('\r')
+        self.stream.write(self.summary() + '\n')
+
+
+def convert(args, monitor):
+    src = args.infile if args.infile is not None else sys.stdin
+    ms = monitor.watch(codecs.load(src, from_=args.srcfmt))
+    if args.tgtfmt in extraformats:
+        print(extraformats[args.tgtfmt](ms))
+    else:
+        # stream from the input to the output one item at a time
+        codecs.dump(
+            sys.stdout, ms, to=args.tgtfmt,
+            processes=args.jobs,
             pretty_print=args.pretty_print,
             color=args.color
         )
-    elif args.tgtfmt in extraformats:
-        output = extraformats[args.tgtfmt](ms)
-    print(output)
 
-elif args.command in ('paths', 'p'):
+
+def paths(args, monitor):
+    src = args.infile if args.infile is not None else sys.stdin
+    ms = monitor.watch(codecs.load(src, from_=args.format))
+    func = partial(_format_paths, depth=int(args.depth))
+    for line in parallel_map(func, ms, processes=args.jobs):
+        print(line)
+
+
+def _format_paths(m, depth=-1):
     from delphin.mrs import path as mrspath
-    if args.infile is not None:
-        instream = open(args.infile, 'r')
-    else:
-        instream = sys.stdin
-    outstream = sys.stdout
-    ms = mrsformats[args.format].load(instream)
-    for m in ms:
-        paths = list(mrspath.get_paths(m, max_depth=int(args.depth)))
-        print('\t'.join(paths))
+    return '\t'.join(
+        mrspath.format(node, depth=depth)
+        for node in mrspath.explore(m, max_distance=depth)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Utility for manipulating MRSs"
+    )
+    # options for all commands
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        '--jobs', '-j', type=int, default=None, metavar='N',
+        help='process items in N worker processes'
+    )
+    common.add_argument(
+        '--progress', action='store_true',
+        help='periodically report the items processed to stderr'
+    )
+    common.add_argument(
+        '--stats', action='store_true',
+        help='report the items processed per second to stderr when done'
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    convert_parser = subparsers.add_parser(
+        'convert', aliases=['c'], parents=[common]
+    )
+    convert_parser.add_argument(
+        '--from', '-f',
+        dest='srcfmt',
+        choices=codecs.names(),
+        help='input format (default: detected from the input)'
+    )
+    convert_parser.add_argument(
+        '--to', '-t',
+        dest='tgtfmt',
+        choices=codecs.names() + list(extraformats.keys())
+    )
+    convert_parser.add_argument('--pretty-print', '-p', action='store_true')
+    convert_parser.add_argument('--color', '-c', action='store_true')
+    convert_parser.add_argument('infile', metavar='PATH', nargs='?')
+
+    path_parser = subparsers.add_parser(
+        'paths', aliases=['p'], parents=[common]
+    )
+    path_parser.add_argument('--format', '-f', choices=codecs.names())
+    path_parser.add_argument('--depth', '-d', default=-1)
+    path_parser.add_argument('infile', metavar='PATH', nargs='?')
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        return
+    monitor = Monitor(progress=args.progress)
+    if args.command in ('convert', 'c'):
+        convert(args, monitor)
+    elif args.command in ('paths', 'p'):
+        paths(args, monitor)
+    if args.progress or args.stats:
+        monitor.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -83,7 +83,6 @@ setup(
         'delphin.codecs'
     ],
     install_requires=[
-        'networkx',
         'requests',
         'Pygments'
     ],
@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+
+import gzip
+import io
+
+import pytest
+
+from delphin import codecs
+from delphin.mrs import (
+    simplemrs, mrx, dmrx, eds, simpledmrs, jsonl, binmrs, util
+)
+
+abrams_sleeps = simplemrs.loads_one('''
+[ <0:14> "Abrams sleeps." LTOP: h0
+  INDEX: e2 [ e SF: prop TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ proper_q_rel<0:6> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg IND: + ] RSTR: h5 BODY: h6 ]
+          [ named_rel<0:6> "Abrams" LBL: h7 CARG: "Abrams" ARG0: x3 ]
+          [ "_sleep_v_1_rel"<7:14> LBL: h1 ARG0: e2 ARG1: x3 ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 > ]
+''')
+ms = [abrams_sleeps] * 3
+
+
+def test_names():
+    assert set(codecs.names()) >= {
+        'simplemrs', 'mrx', 'dmrx', 'eds', 'simpledmrs', 'jsonl', 'binmrs'
+    }
+    assert codecs.get('mrx').module is mrx
+    with pytest.raises(ValueError):
+        codecs.get('unknown')
+
+
+def test_detect():
+    assert codecs.detect(simplemrs.dumps(ms, pretty_print=True)) == 'simplemrs'
+    assert codecs.detect(mrx.dumps(ms)) == 'mrx'
+    assert codecs.detect(dmrx.dumps(ms)) == 'dmrx'
+    assert codecs.detect(
+        '<?xml version="1.0"?>\n<!-- a comment -->\n' + dmrx.dumps(ms)
+    ) == 'dmrx'
+    assert codecs.detect(eds.dumps(ms)) == 'eds'
+    assert codecs.detect(eds.dumps(ms, pretty_print=False)) == 'eds'
+    assert codecs.detect(simpledmrs.dumps(ms)) == 'simpledmrs'
+    assert codecs.detect(jsonl.dumps(ms)) == 'jsonl'
+    assert codecs.detect(jsonl.dumps(ms, representation='dmrs')) == 'jsonl-dmrs'
+    assert codecs.detect(jsonl.dumps(ms, representation='eds')) == 'jsonl-eds'
+    assert codecs.detect(binmrs.dumps(ms)) == 'binmrs'
+    assert codecs.detect(gzip.compress(mrx.dumps(ms).encode('utf-8'))) == 'mrx'
+    assert codecs.detect(u'  \n' + simplemrs.dumps(ms)) == 'simplemrs'
+    assert codecs.detect('hello') is None
+
+
+def test_load(tmpdir):
+    f = tmpdir.join('a.mrx.gz')
+    f.write_binary(gzip.compress(mrx.dumps(ms).encode('utf-8')))
+    assert len(list(codecs.load(str(f)))) == 3
+    # text and binary file objects
+    xs = list(codecs.load(io.StringIO(simplemrs.dumps(ms))))
+    assert simplemrs.dumps(xs) == simplemrs.dumps(ms)
+    xs = list(codecs.load(io.BytesIO(binmrs.dumps(ms))))
+    assert len(xs) == 3
+    xs = list(codecs.load(io.BytesIO(dmrx.dumps(ms).encode('utf-8'))))
+    assert len(xs) == 3
+    # explicit codec
+    xs = list(codecs.load(io.StringIO(eds.dumps(ms)), from_='eds'))
+    assert len(xs) == 3
+    assert list(codecs.load(io.StringIO(u''))) == []
+    with pytest.raises(ValueError):
+        list(codecs.load(io.StringIO(u'hello')))
+    with pytest.raises(ValueError):
+        list(codecs.load(io.StringIO(u''), from_='binmrs'))
+
+
+def test_load_filename(tmpdir, monkeypatch):
+    # files opened by name are closed by the codecs' load()
+    path = str(tmpdir.join('a.mrs'))
+    with open(path, 'w') as fh:
+        simplemrs.dump(fh, ms)
+    opened = []
+    def open_(*args):
+        opened.append(io.open(*args))
+        return opened[-1]
+    monkeypatch.setattr(util, 'open', open_, raising=False)
+    assert len(list(simplemrs.load(path))) == 3
+    assert len(list(simplemrs.load(path, lazy=True))) == 3
+    assert simplemrs.load(path, single=True) == abrams_sleeps
+    assert simplemrs.load(path, single=True, lazy=True) == abrams_sleeps
+    assert len(opened) == 4
+    assert all(fh.closed for fh in opened)
+
+
+def test_convert(tmpdir):
+    src = tmpdir.join('a.mrs')
+    src.write_text(simplemrs.dumps(ms, pretty_print=True), 'utf-8')
+    xs = list(simplemrs.load(str(src)))
+    for name in ('mrx', 'dmrx', 'eds', 'simpledmrs', 'jsonl', 'simplemrs'):
+        dst = tmpdir.join('out.' + name)
+        codecs.convert(str(src), str(dst), to=name)
+        expected = codecs.get(name).module.dumps(xs)
+        assert dst.read_text('utf-8') == expected + '\n'
+    # binary output to a text stream with an underlying buffer
+    out = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+    codecs.convert(str(src), out, to='binmrs')
+    assert out.buffer.getvalue() == binmrs.dumps(xs)
+    # text output to a binary stream
+    out = io.BytesIO()
+    codecs.convert(io.BytesIO(binmrs.dumps(ms)), out, to='eds',
+                   pretty_print=False)
+    assert out.getvalue().decode('utf-8') == eds.dumps(ms, pretty_print=False) + '\n'
+
+
+def test_convert_processes():
+    src = simplemrs.dumps(ms * 5)
+    for name in ('simplemrs', 'mrx', 'dmrx', 'eds', 'simpledmrs', 'jsonl-eds'):
+        serial, parallel = io.StringIO(), io.StringIO()
+        codecs.convert(io.StringIO(src), serial, to=name)
+        codecs.convert(io.StringIO(src), parallel, to=name, processes=2)
+        assert parallel.getvalue() == serial.getvalue()
@@ -53,6 +53,34 @@ class TestDmrs():
         assert x.label(10) == 'h1'
         assert x.ep(10).iv == 'e2'
 
+    def test_links(self):
+        # "the big dog barks": EQ links join labels, H links make holes,
+        # and quantifiers take the IV of their RSTR target
+        x = Dmrs(
+            nodes=[Node(10, sp('_the_q_rel')),
+                   Node(11, sp('_big_a_1_rel'), {'cvarsort': 'e'}),
+                   Node(12, sp('_dog_n_1_rel'), {'cvarsort': 'x', 'NUM': 'sg'}),
+                   Node(13, sp('_bark_v_1_rel'), {'cvarsort': 'e'})],
+            links=[Link(0, 13, None, 'H'),
+                   Link(10, 12, 'RSTR', 'H'),
+                   Link(11, 12, 'ARG1', 'EQ'),
+                   Link(13, 12, 'ARG1', 'NEQ')]
+        )
+        check_xmrs(x, 'h0', None, None, 4, 2, 0, 8)
+        assert x.label(11) == x.label(12) == 'h2'
+        assert [x.label(10), x.label(13)] == ['h1', 'h3']
+        assert [x.ep(nid).iv for nid in (11, 12, 13)] == ['e4', 'x5', 'e6']
+        assert x.args(10) == {'RSTR': 'h7', 'ARG0': 'x5'}
+        assert x.args(11) == {'ARG0': 'e4', 'ARG1': 'x5'}
+        assert x.hcons() == [('h0', 'qeq', 'h3'), ('h7', 'qeq', 'h2')]
+        assert x.properties('x5') == {'NUM': 'sg'}
+        # links from the same nodes in a different order
+        y = Dmrs(nodes=nodes(x), links=list(reversed(links(x))))
+        assert y.label(11) == y.label(12)
+        with pytest.raises(XmrsError):
+            Dmrs(nodes=[Node(10, sp('_rain_v_1_rel')),
+                        Node(10, sp('_rain_v_1_rel'))])
+
     def test_to_dict(self):
         assert Dmrs().to_dict() == {'nodes': [], 'links': []}
 
@@ -0,0 +1,93 @@
+# -*- coding: UTF-8 -*-
+
+import io
+import mmap
+import struct
+
+import pytest
+
+from delphin.mrs import simplemrs, binmrs
+from delphin.exceptions import XmrsDeserializationError
+
+it_rains = simplemrs.loads_one('''
+[ <0:9> "It rains." TOP: h0
+  INDEX: e2 [ e SF: prop TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ "_rain_v_1_rel"<3:9> "rains." LBL: h1 ARG0: e2 ] >
+  HCONS: < h0 qeq h1 >
+  ICONS: < e2 focus e2 > ]
+''')
+
+abrams_sleeps = simplemrs.loads_one('''
+[ LTOP: h0
+  INDEX: e2 [ e SF: prop TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ proper_q_rel<0:6> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg IND: + ] RSTR: h5 BODY: h6 ]
+          [ named_rel<0:6> LBL: h7 CARG: "Abrams" ARG0: x3 ]
+          [ "_sleep_v_1_rel"<7:14> LBL: h1 ARG0: e2 ARG1: x3 ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 > ]
+''')
+
+
+def test_roundtrip():
+    for m in (it_rains, abrams_sleeps):
+        m2 = binmrs.loads_one(binmrs.dumps_one(m))
+        assert m2 == m
+        assert m2.lnk == m.lnk
+        assert m2.surface == m.surface
+        assert m2.variables() == m.variables()
+        assert m2.properties('e2', as_list=True) == \
+            m.properties('e2', as_list=True)
+        assert simplemrs.dumps_one(m2) == simplemrs.dumps_one(m)
+    assert list(binmrs.loads(binmrs.dumps([]))) == []
+
+
+def test_load_dump():
+    fh = io.BytesIO()
+    binmrs.dump(fh, iter([it_rains, abrams_sleeps]))
+    fh.seek(0)
+    ms = binmrs.load(fh)
+    assert next(ms) == it_rains
+    assert next(ms) == abrams_sleeps
+    with pytest.raises(StopIteration):
+        next(ms)
+
+
+def test_load_filename(tmpdir, monkeypatch):
+    path = str(tmpdir.join('corpus.bmrs'))
+    binmrs.dump(path, [it_rains, abrams_sleeps])
+    opened = []
+    def open_(*args):
+        opened.append(io.open(*args))
+        return opened[-1]
+    monkeypatch.setattr(binmrs, 'open', open_, raising=False)
+    assert list(binmrs.load(path)) == [it_rains, abrams_sleeps]
+    assert binmrs.load(path, single=True) == it_rains
+    assert len(opened) == 2
+    assert all(fh.closed for fh in opened)
+
+
+def test_random_access(tmpdir):
+    path = str(tmpdir.join('corpus.bmrs'))
+    binmrs.dump(path, [it_rains, abrams_sleeps, it_rains])
+    with open(path, 'rb') as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        offsets = binmrs.offsets(mm)
+        assert len(offsets) == 3
+        assert binmrs.read_at(mm, offsets[1]) == abrams_sleeps
+        assert binmrs.read_at(mm, offsets[2]) == it_rains
+        mm.close()
+
+
+def test_invalid():
+    with pytest.raises(XmrsDeserializationError):
+        list(binmrs.loads(b'not binmrs'))
+    data = binmrs.dumps([it_rains])
+    with pytest.raises(XmrsDeserializationError):
+        list(binmrs.loads(data[:-3]))
+    # the first integer after the top, index, xarg, surface, and
+    # identifier is the type of the MRS's Lnk
+    data = bytearray(data)
+    bloblen = struct.unpack_from('<I', data, 9)[0]
+    struct.pack_into('<h', data, 9 + 4 + bloblen + 4 + 5 * 2, 7)
+    with pytest.raises(XmrsDeserializationError):
+        binmrs.loads_one(bytes(data))
+
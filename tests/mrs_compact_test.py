@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+
+import pickle
+import weakref
+
+import pytest
+
+from delphin.mrs import simplemrs, compact, Xmrs, Lnk, Pred
+from delphin.mrs.components import links
+from delphin.mrs.compact import CompactXmrs
+from delphin.exceptions import XmrsError
+
+it_rains = simplemrs.loads_one('''
+[ <0:9> "It rains." TOP: h0
+  INDEX: e2 [ e SF: prop TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ "_rain_v_1_rel"<3:9> "rains." LBL: h1 ARG0: e2 ] >
+  HCONS: < h0 qeq h1 >
+  ICONS: < e2 focus e2 > ]
+''')
+
+# "Does he have anything to do with the campaign?"
+have = simplemrs.loads_one('''
+[ LTOP: h0 INDEX: e2 [ e SF: ques TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ pron_rel<5:7> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg GEND: m PRONTYPE: std_pron ] ]
+          [ pronoun_q_rel<5:7> LBL: h5 ARG0: x3 RSTR: h6 BODY: h7 ]
+          [ "_have_v_1_rel"<8:12> LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 [ x PERS: 3 NUM: sg ] ]
+          [ thing_rel<13:21> LBL: h9 ARG0: x8 ]
+          [ _any_q_rel<13:21> LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ]
+          [ "_do_v_1_rel"<25:27> LBL: h9 ARG0: e13 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: i14 ARG2: x8 ARG3: h15 ]
+          [ _with_p_rel<28:32> LBL: h16 ARG0: e17 [ e SF: prop TENSE: untensed MOOD: indicative PROG: - PERF: - ] ARG1: x8 ARG2: x18 [ x PERS: 3 NUM: sg IND: + ] ]
+          [ _the_q_rel<33:36> LBL: h19 ARG0: x18 RSTR: h20 BODY: h21 ]
+          [ "_campaign_n_1_rel"<37:46> LBL: h22 ARG0: x18 ]
+          [ named_rel<47:50> LBL: h23 ARG0: x24 CARG: "Kim" ] >
+  HCONS: < h0 qeq h1 h6 qeq h4 h11 qeq h9 h15 qeq h16 h20 qeq h22 > ]
+''')
+
+
+def test_roundtrip():
+    for m in (it_rains, have):
+        c = CompactXmrs.from_xmrs(m)
+        assert isinstance(c, Xmrs)
+        assert c == m
+        assert (c.top, c.index, c.xarg) == (m.top, m.index, m.xarg)
+        assert (c.lnk, c.surface) == (m.lnk, m.surface)
+        assert c.variables() == m.variables()
+        assert c.eps() == m.eps()
+        assert c.hcons() == m.hcons()
+        assert c.icons() == m.icons()
+        assert c.to_xmrs() == m
+        # the serializers read the internal tables of Xmrs
+        assert simplemrs.dumps_one(c) == simplemrs.dumps_one(m)
+
+
+def test_accessors():
+    c = CompactXmrs.from_xmrs(have)
+    assert c.nodeids() == have.nodeids()
+    for nid in have.nodeids():
+        assert c.ep(nid) == have.ep(nid)
+        assert c.ep(nid).lnk == have.ep(nid).lnk
+        assert c.pred(nid) == have.pred(nid)
+        assert c.label(nid) == have.label(nid)
+        assert c.args(nid) == have.args(nid)
+        assert c.properties(nid) == have.properties(nid)
+        assert c.outgoing_args(nid) == have.outgoing_args(nid)
+        assert c.incoming_args(nid) == have.incoming_args(nid)
+    for var in have.variables():
+        assert c.properties(var, as_list=True) == \
+            have.properties(var, as_list=True)
+        assert var in c
+    for lbl in set(have.labels()):
+        assert sorted(c.labelset(lbl)) == sorted(have.labelset(lbl))
+        assert c.labelset_heads(lbl) == have.labelset_heads(lbl)
+    assert c.preds() == have.preds()
+    assert c.labels() == have.labels()
+    assert c.nodeids(ivs=['x8']) == have.nodeids(ivs=['x8'])
+    assert c.nodeid('x8', quantifier=True) == have.nodeid('x8', quantifier=True)
+    assert c.hcon('h6') == have.hcon('h6')
+    assert CompactXmrs.from_xmrs(it_rains).icons('e2') == it_rains.icons('e2')
+    assert c.is_connected() == have.is_connected()
+    assert c.is_well_formed() == have.is_well_formed()
+    sub = c.subgraph([10000, 10001])
+    assert isinstance(sub, CompactXmrs)
+    assert sub == have.subgraph([10000, 10001])
+    with pytest.raises(KeyError):
+        c.ep(1)
+    with pytest.raises(KeyError):
+        c.hcon('h1')
+    with pytest.raises(KeyError):
+        c.properties('x99')
+    with pytest.raises(KeyError):
+        c.nodeids(ivs=['h0'])
+
+
+def test_construction():
+    c = CompactXmrs(
+        top='h0', index='e2',
+        eps=[(10, None, 'h1', {'ARG0': 'e2'}, Lnk.tokens([1, 2]), 'rains')],
+        hcons=[('h0', 'qeq', 'h1')],
+        vars={'e2': {'TENSE': 'pres'}}
+    )
+    ep = c.ep(10)
+    assert ep.lnk == Lnk.tokens([1, 2])
+    assert ep.surface == 'rains'
+    assert c.properties('e2') == {'TENSE': 'pres'}
+    c.add_eps([(11, None, 'h1', {'ARG0': 'e3'}, Lnk.charspan(-1, -1))])
+    assert c.ep(11).lnk == Lnk.charspan(-1, -1)
+    assert c.args(11) == {'ARG0': 'e3'}
+    with pytest.raises(XmrsError):
+        c.add_eps([(10, None, 'h1')])
+    with pytest.raises(XmrsError):
+        c.add_hcons([('h0', 'qeq', 'h1')])
+
+
+def test_pickle():
+    c = CompactXmrs.from_xmrs(have)
+    assert pickle.loads(pickle.dumps(c)) == c
+    for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+        c2 = pickle.loads(pickle.dumps(c, protocol))
+        assert isinstance(c2, CompactXmrs)
+        assert c2 == have
+        assert c2.properties('x3') == have.properties('x3')
+    if pickle.HIGHEST_PROTOCOL >= 5:
+        buffers = []
+        data = pickle.dumps(c, 5, buffer_callback=buffers.append)
+        assert len(buffers) == 5
+        assert pickle.loads(data, buffers=buffers) == have
+
+
+def test_symbol_tables():
+    # symbols and preds are kept per object, so they go away with it
+    def named(carg):
+        return CompactXmrs(
+            top='h0',
+            eps=[(10, Pred.stringpred('named_rel'), 'h1',
+                  {'ARG0': 'x2', 'CARG': carg})],
+            hcons=[('h0', 'qeq', 'h1')]
+        )
+    a, b = named('Kim'), named('Sandy')
+    assert 'Kim' in a._symbols and 'Kim' not in b._symbols
+    assert a.args(10) == {'ARG0': 'x2', 'CARG': 'Kim'}
+    assert b.args(10) == {'ARG0': 'x2', 'CARG': 'Sandy'}
+    a.add_eps([(11, Pred.stringpred('named_rel'), 'h3',
+                {'ARG0': 'x4', 'CARG': 'Sandy'})])
+    assert len(a._preds) == 1
+    assert a.args(11) == {'ARG0': 'x4', 'CARG': 'Sandy'}
+    # unpickled objects bring their own tables
+    c = CompactXmrs.from_xmrs(have)
+    func, (cls, state) = c.__reduce_ex__(2)
+    c2 = func(cls, state)
+    assert c2._symbols == c._symbols
+    assert c2 == have
+    assert c2.args(10009) == have.args(10009)
+
+
+def test_expansion():
+    c = CompactXmrs.from_xmrs(have)
+    assert c.cache_info().currsize == 0
+    # the tables of the expansion are kept while it is cached
+    assert c._vars is c._vars
+    assert links(c) == links(have)
+    assert c.cache_info().currsize > 0
+    c.add_eps([(20000, Pred.stringpred('_new_a_1_rel'), 'h25',
+                {'ARG0': 'e26', 'ARG1': 'x3'})])
+    assert c.cache_info().currsize == 0
+    assert 20000 in c._eps
+    assert 'h25' in c._vars
+    links(c)
+    c.clear_cache()
+    assert c.cache_info().currsize == 0
+    # so does setting the top, index, or xarg
+    assert any(link.start == 0 for link in links(c))
+    c.top = None
+    assert c.cache_info().currsize == 0
+    assert all(link.start != 0 for link in links(c))
+
+
+def test_expansion_cache():
+    # only the expansions of the most recently used objects are kept,
+    # and they do not keep their objects alive
+    cs = [CompactXmrs.from_xmrs(have) for _ in range(3)]
+    try:
+        compact.set_expansion_cache_size(2)
+        for c in cs:
+            links(c)
+        assert [c.cache_info().currsize > 0 for c in cs] == [
+            False, True, True
+        ]
+        ref = weakref.ref(cs[2])
+        del cs[:], c
+        assert ref() is None
+        c = CompactXmrs.from_xmrs(have)
+        assert c.cache_info().currsize == 0
+        compact.set_expansion_cache_size(0)
+        assert c._vars is not c._vars
+        assert links(c) == links(have)
+    finally:
+        compact.set_expansion_cache_size(32)
+
@@ -94,6 +94,39 @@ pathological1 = simplemrs.loads_one('''
   HCONS: < h0 qeq h1 h5 qeq h12 h9 qeq h11 h15 qeq h17 h22 qeq h29 h26 qeq h28 h32 qeq h34 h39 qeq h46 h43 qeq h45 h49 qeq h51 > ]
 ''')
 
+# "Kim chased Sandy."
+m2 = simplemrs.loads_one('''
+[ LTOP: h0 INDEX: e2
+  RELS: < [ proper_q_rel LBL: h4 ARG0: x3 RSTR: h5 BODY: h6 ]
+          [ named_rel LBL: h7 ARG0: x3 CARG: "Kim" ]
+          [ "_chase_v_1_rel" LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 ]
+          [ proper_q_rel LBL: h9 ARG0: x8 RSTR: h10 BODY: h11 ]
+          [ named_rel LBL: h12 ARG0: x8 CARG: "Sandy" ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 h10 qeq h12 > ]
+''')
+
+# m2 with different variables and EP order
+m2b = simplemrs.loads_one('''
+[ LTOP: h20 INDEX: e22
+  RELS: < [ named_rel LBL: h32 ARG0: x28 CARG: "Sandy" ]
+          [ proper_q_rel LBL: h29 ARG0: x28 RSTR: h30 BODY: h31 ]
+          [ "_chase_v_1_rel" LBL: h21 ARG0: e22 ARG1: x23 ARG2: x28 ]
+          [ named_rel LBL: h27 ARG0: x23 CARG: "Kim" ]
+          [ proper_q_rel LBL: h24 ARG0: x23 RSTR: h25 BODY: h26 ] >
+  HCONS: < h20 qeq h21 h25 qeq h27 h30 qeq h32 > ]
+''')
+
+# "Sandy chased Kim."
+m2c = simplemrs.loads_one('''
+[ LTOP: h0 INDEX: e2
+  RELS: < [ proper_q_rel LBL: h4 ARG0: x3 RSTR: h5 BODY: h6 ]
+          [ named_rel LBL: h7 ARG0: x3 CARG: "Kim" ]
+          [ "_chase_v_1_rel" LBL: h1 ARG0: e2 ARG1: x8 ARG2: x3 ]
+          [ proper_q_rel LBL: h9 ARG0: x8 RSTR: h10 BODY: h11 ]
+          [ named_rel LBL: h12 ARG0: x8 CARG: "Sandy" ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 h10 qeq h12 > ]
+''')
+
 # changed "dogs" to "dog" in a similar local position but different in the
 # overall graph:
 # "Dogs and dogs chase dogs and dog and chase dogs and dogs"
@@ -132,6 +165,66 @@ def test_isomorphic():
     assert compare.isomorphic(m1, m1e) == False  # equated LTOP
     assert compare.isomorphic(m1, m1f) == False  # same structure, diff pred
     assert compare.isomorphic(m1, m1g) == False  # diff arity
+    # diff variable ids and EP order only
+    assert compare.isomorphic(m2, m2b) == True
+    assert compare.isomorphic(m2, m2c) == False  # swapped arguments
+    assert compare.isomorphic(m0, m0) == True
+    assert compare.isomorphic(m0, m1) == False
     # be aware if the next ones take a long time to resolve
     assert compare.isomorphic(pathological1, pathological1) == True
     assert compare.isomorphic(pathological1, pathological2) == False
+
+def test_graph_hash():
+    assert compare.graph_hash(m1) == compare.graph_hash(m1b)
+    assert compare.graph_hash(m1) != compare.graph_hash(m1c)
+    assert (compare.graph_hash(m1, check_varprops=False) ==
+            compare.graph_hash(m1c, check_varprops=False))
+    assert compare.graph_hash(m1) != compare.graph_hash(m1d)
+    assert compare.graph_hash(m2) == compare.graph_hash(m2b)
+    assert compare.graph_hash(m2) != compare.graph_hash(m2c)
+    assert (compare.graph_hash(pathological1) !=
+            compare.graph_hash(pathological2))
+
+def test_compare_bags():
+    assert compare.compare_bags([], []) == (0, 0, 0)
+    assert compare.compare_bags([m1, m2], [m2b, m1b]) == (0, 2, 0)
+    assert compare.compare_bags([m1, m2, m2], [m2b, m1c]) == (2, 1, 1)
+    assert compare.compare_bags(
+        [m1, m2], [m1c], check_varprops=False) == (1, 1, 0)
+    test_unique, shared, gold_unique = compare.compare_bags(
+        [m2c, m2, m1], [m1f, m2b, m1b], count_only=False
+    )
+    assert test_unique == [m2c]
+    assert shared == [m2, m1]
+    assert gold_unique == [m1f]
+
+def test_compare_bag_pairs():
+    pairs = [([m1, m2], [m2b, m1b]), ([m1, m2, m2], [m2b, m1c]), ([], [])]
+    expected = [(0, 2, 0), (2, 1, 1), (0, 0, 0)]
+    assert list(compare.compare_bag_pairs(pairs)) == expected
+    stats = compare.ComparisonStats()
+    assert list(compare.compare_bag_pairs(
+        iter(pairs * 3), processes=2, chunksize=2, stats=stats
+    )) == expected * 3
+    assert stats.items == 9
+    assert (stats.test_unique, stats.shared, stats.gold_unique) == (6, 9, 3)
+    assert stats.exact == 6
+    assert len(stats.slowest()) == 9
+    assert list(compare.compare_bag_pairs(
+        [([m1], [m1c])], check_varprops=False)) == [(0, 1, 0)]
+
+def test_ComparisonStats():
+    stats = compare.ComparisonStats(slowest=3)
+    assert stats.precision == stats.recall == stats.f_score == 0.0
+    assert stats.outliers() == []
+    for i in range(20):
+        stats.add((0, 1, 0), seconds=0.01)
+    stats.add((1, 3, 0), seconds=1.0)
+    stats.add((0, 0, 2), seconds=0.02)
+    assert stats.items == 22
+    assert stats.exact == 20
+    assert stats.precision == 23.0 / 24
+    assert stats.recall == 23.0 / 25
+    assert stats.slowest() == [(20, 1.0), (21, 0.02), (2, 0.01)]
+    assert stats.outliers() == [(20, 1.0)]
+    assert abs(stats.mean_seconds - 1.22 / 22) < 1e-9
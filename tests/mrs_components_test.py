@@ -8,6 +8,7 @@ from delphin.mrs.components import (
     Lnk, _LnkMixin,
     Link, links, HandleConstraint, hcons,
     Pred, split_pred_string, is_valid_pred_string, normalize_pred_string,
+    pred_cache_info, clear_pred_cache, set_pred_cache_size,
     Node, ElementaryPredication as EP
 )
 spred = Pred.stringpred
@@ -122,6 +123,9 @@ def test_var_id():
     assert var_id('event10') == 10
     assert var_id('ref-ind2') == 2
     with pytest.raises(ValueError): var_id('1')
+    # generated variables are known without being parsed
+    v, _ = _VarGenerator(starting_vid=40).new('q')
+    assert (var_sort(v), var_id(v)) == ('q', 40)
 
 
 class TestVarGenerator():
@@ -447,7 +451,65 @@ class TestPred():
         assert (spred('_dog_n_rel') == None) == False
         assert spred('_dog_n_1_rel') == spred('_Dog_N_1_rel')
         assert spred('_dog_n_1_rel') == spred('_dog_n_1')
-
+        assert not (spred('_dog_n_1_rel') != spred('"_Dog_N_1"'))
+        assert spred('_dog_n_1_rel') != spred('_dog_n_2_rel')
+        assert spred('_dog_n_1_rel') != 1
+        assert spred('_dog_n_rel')._replace(string='_cat_n_rel') == '_cat_n'
+
+    def testHash(self):
+        ps = [spred('_dog_n_rel'), spred('"_dog_n_rel"'), spred('_DOG_N'),
+              Pred.realpred('dog', 'n'), Pred.grammarpred('dog_n_rel')]
+        assert len(set(ps)) == 2
+        d = {p: i for i, p in enumerate(ps)}
+        assert d[spred("'_dog_n_rel")] == 3
+        assert d[Pred.grammarpred('dog_n')] == 4
+
+
+    def test_interning(self):
+        clear_pred_cache()
+        p = spred('_dog_n_1_rel')
+        assert spred('_dog_n_1_rel') is p
+        assert Pred.string_or_grammar_pred('_dog_n_1_rel') is p
+        assert Pred.grammarpred('_dog_n_1_rel') is not p
+        assert Pred.realpred('dog', 'n', 1) is Pred.realpred('dog', 'n', '1')
+        info = pred_cache_info()
+        assert info.hits == 3 and info.misses == 3 and info.currsize == 3
+        # least recently used preds are discarded first
+        maxsize = info.maxsize
+        try:
+            set_pred_cache_size(2)
+            assert pred_cache_info().currsize == 2
+            assert spred('_dog_n_1_rel') is not p
+            set_pred_cache_size(0)
+            assert spred('_cat_n_1_rel') is not spred('_cat_n_1_rel')
+            assert pred_cache_info().currsize == 0
+        finally:
+            set_pred_cache_size(maxsize)
+            clear_pred_cache()
+
+    def test_interning_threads(self):
+        import threading
+        maxsize = pred_cache_info().maxsize
+        errors = []
+        def work(offset):
+            try:
+                for i in range(2000):
+                    spred('_w{}_n_rel'.format((i + offset) % 8))
+            except Exception as ex:
+                errors.append(ex)
+        try:
+            set_pred_cache_size(4)  # keep evicting
+            threads = [threading.Thread(target=work, args=(i,))
+                       for i in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert errors == []
+            assert pred_cache_info().currsize == 4
+        finally:
+            set_pred_cache_size(maxsize)
+            clear_pred_cache()
 
     def test_is_quantifier(self):
         assert spred('"_the_q_rel"').is_quantifier() == True
@@ -1,9 +1,13 @@
 
+import io
+import pickle
+
 import pytest
 
-from delphin.mrs import simplemrs, eds
+from delphin.mrs import simplemrs, eds, util
 from delphin.mrs.components import Node, Pred, Lnk
 from delphin.mrs.config import CVARSORT
+from delphin.exceptions import XmrsDeserializationError
 
 # empty
 empty = simplemrs.loads_one('''[ ]''')
@@ -295,3 +299,82 @@ def test_serialize_list():
     assert eds.dumps([it_rains, it_rains], pretty_print=False) == (
         '{e2: e2:_rain_v_1<3:9>[]} {e2: e2:_rain_v_1<3:9>[]}'
     )
+
+def test_deserialize_matches_peg_parser():
+    corpus = [empty, it_rains, dogs_chase_Kim, kotaenakatta,
+              nearly_every_dog_barked, kim_probably_sleeps]
+    for properties in (False, True):
+        for pretty_print in (False, True):
+            s = eds.dumps(corpus, properties=properties,
+                          pretty_print=pretty_print)
+            expected = list(eds._eds_parser.parse(s))
+            assert list(eds.loads(s)) == expected
+            # streamed line by line
+            lines = s.splitlines(True)
+            assert list(eds.deserialize(lines)) == expected
+    s = '{e2: (fragmented)\n|e5:_nearly_x_deg<0:6>[]\n e2:_bark_v_1[]\n}'
+    assert (eds.loads_one(s).to_dict() ==
+            eds._eds_parser.parse(s)[0].to_dict())
+
+def test_deserialize_chunks():
+    # a string with braces may be split across chunks
+    s = '{e2:\n e2:_rain_v_1<3:9>[]\n x3:named("{a}\n}")[]\n}\n{:}'
+    lines = s.splitlines(True)
+    es = list(eds.deserialize(lines))
+    assert len(es) == 2
+    assert es[0].node('x3').carg == '{a}\n}'
+    assert es == list(eds.loads(s))
+
+def test_load_filename(tmpdir, monkeypatch):
+    path = str(tmpdir.join('corpus.eds'))
+    with open(path, 'w') as fh:
+        eds.dump(fh, [it_rains, dogs_chase_Kim])
+    opened = []
+    def open_(*args):
+        opened.append(io.open(*args))
+        return opened[-1]
+    monkeypatch.setattr(util, 'open', open_, raising=False)
+    assert len(list(eds.load(path))) == 2
+    assert eds.load(path, single=True) == eds.loads_one(eds.dumps_one(it_rains))
+    assert len(opened) == 2
+    assert all(fh.closed for fh in opened)
+
+def test_deserialize_invalid():
+    with pytest.raises(XmrsDeserializationError):
+        eds.loads_one('{e2: e2:_rain_v_1<3:9>[')
+    with pytest.raises(XmrsDeserializationError):
+        eds.loads_one('{e2: e2:_rain_v_1<3:9>}')
+
+def test_from_xmrs_matches_query_functions():
+    from delphin.mrs.query import find_argument_target
+    corpus = [it_rains, dogs_chase_Kim, kotaenakatta,
+              nearly_every_dog_barked, kim_probably_sleeps]
+    for m in corpus:
+        eps = m.eps()
+        expected = {}
+        for ep in eps:
+            nid = ep.nodeid
+            if ep.is_quantifier():
+                expected[nid] = [('BV', m.nodeid(ep.intrinsic_variable))]
+            else:
+                expected[nid] = [
+                    (rargname, find_argument_target(m, nid, rargname))
+                    for rargname in m.outgoing_args(nid)
+                ]
+        assert eds._find_dependencies(m, eps, {}) == expected
+
+def test_from_xmrs_many():
+    corpus = [empty, it_rains, dogs_chase_Kim, kim_probably_sleeps]
+    expected = [eds.Eds.from_xmrs(m) for m in corpus]
+    assert list(eds.Eds.from_xmrs_many(corpus)) == expected
+    assert list(eds.Eds.from_xmrs_many(corpus, processes=2,
+                                       chunksize=1)) == expected
+
+
+def test_pickle():
+    for m in [empty, it_rains, dogs_chase_Kim, kim_probably_sleeps]:
+        e = eds.Eds.from_xmrs(m)
+        e2 = pickle.loads(pickle.dumps(e))
+        assert e2 == e
+        assert e2.nodeids() == e.nodeids()
+        assert all(e2.edges(nid) == e.edges(nid) for nid in e.nodeids())
@@ -0,0 +1,98 @@
+# -*- coding: UTF-8 -*-
+
+import io
+
+import pytest
+
+from delphin.mrs import simplemrs, jsonl, Mrs, Dmrs
+from delphin.mrs.eds import Eds
+from delphin.exceptions import XmrsDeserializationError
+
+abrams_sleeps = simplemrs.loads_one('''
+[ <0:14> "Abrams sleeps." LTOP: h0
+  INDEX: e2 [ e SF: prop TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ proper_q_rel<0:6> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg IND: + ] RSTR: h5 BODY: h6 ]
+          [ named_rel<0:6> "Abrams" LBL: h7 CARG: "Abrams" ARG0: x3 ]
+          [ "_sleep_v_1_rel"<7:14> LBL: h1 ARG0: e2 ARG1: x3 ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 > ]
+''')
+
+naive = simplemrs.loads_one('''
+[ LTOP: h0 INDEX: e2 [ e SF: prop ]
+  RELS: < [ "_naïve_a_1_rel"<0:5> LBL: h1 ARG0: e2 ] >
+  HCONS: < h0 qeq h1 > ICONS: < e2 topic e2 > ]
+''')
+
+
+def test_roundtrip_mrs():
+    for m in (abrams_sleeps, naive):
+        s = jsonl.dumps_one(m)
+        assert '\n' not in s
+        m2 = jsonl.loads_one(s)
+        assert isinstance(m2, Mrs)
+        assert m2.to_dict() == Mrs.to_dict(m)
+    m2 = jsonl.loads_one(jsonl.dumps_one(abrams_sleeps))
+    assert m2.lnk == abrams_sleeps.lnk
+    assert m2.surface == 'Abrams sleeps.'
+    assert m2.properties('x3') == abrams_sleeps.properties('x3')
+    assert m2.icons() == []
+    assert jsonl.loads_one(jsonl.dumps_one(naive)).icons() == naive.icons()
+
+
+def test_roundtrip_dmrs_and_eds():
+    s = jsonl.dumps([abrams_sleeps, naive], representation='dmrs')
+    assert len(s.splitlines()) == 2
+    ds = list(jsonl.loads(s, representation='dmrs'))
+    assert all(isinstance(d, Dmrs) for d in ds)
+    assert [d.to_dict() for d in ds] == [Dmrs.to_dict(abrams_sleeps),
+                                         Dmrs.to_dict(naive)]
+    s = jsonl.dumps([abrams_sleeps, naive], representation='eds')
+    es = list(jsonl.loads(s, representation='eds'))
+    assert all(isinstance(e, Eds) for e in es)
+    assert [e.to_dict() for e in es] == [
+        Eds.from_xmrs(abrams_sleeps).to_dict(), Eds.from_xmrs(naive).to_dict()
+    ]
+    # Eds objects are encoded as-is
+    assert jsonl.dumps(es, representation='eds') == s
+
+
+def test_properties():
+    d = jsonl.loads_one(jsonl.dumps_one(abrams_sleeps, properties=False))
+    assert d.properties('x3') == {}
+
+
+def test_load_dump(tmpdir):
+    ms = [abrams_sleeps, naive] * 3
+    f = tmpdir.join('a.jsonl')
+    jsonl.dump(str(f), iter(ms))
+    assert len(f.read_text('utf-8').splitlines()) == 6
+    assert [m.to_dict() for m in jsonl.load(str(f))] == [
+        Mrs.to_dict(m) for m in ms
+    ]
+    fh = io.StringIO()
+    jsonl.dump(fh, ms)
+    fh.seek(0)
+    assert len(list(jsonl.load(fh))) == 6
+    # blank lines are skipped
+    ms = list(jsonl.loads('\n' + jsonl.dumps(ms) + '\n\n'))
+    assert len(ms) == 6
+
+
+def test_processes():
+    ms = [abrams_sleeps, naive] * 10
+    for rep in ('mrs', 'dmrs', 'eds'):
+        serial = jsonl.dumps(ms, representation=rep)
+        assert jsonl.dumps(ms, representation=rep, processes=2) == serial
+        xs = list(jsonl.loads(serial, representation=rep, processes=2))
+        assert [x.to_dict() for x in xs] == [
+            x.to_dict() for x in jsonl.loads(serial, representation=rep)
+        ]
+
+
+def test_errors():
+    with pytest.raises(XmrsDeserializationError):
+        jsonl.loads_one('{"top": "h0"')
+    with pytest.raises(XmrsDeserializationError):
+        list(jsonl.loads('{}\n[1, 2]'))
+    with pytest.raises(ValueError):
+        jsonl.dumps_one(abrams_sleeps, representation='rmrs')
@@ -0,0 +1,113 @@
+# -*- coding: UTF-8 -*-
+
+import io
+
+import pytest
+
+from delphin.mrs import simplemrs, simpledmrs, dmrx, util, Pred, Lnk
+from delphin.exceptions import XmrsDeserializationError
+
+abrams_sleeps = simplemrs.loads_one('''
+[ <0:14> "Abrams sleeps." LTOP: h0
+  INDEX: e2 [ e SF: prop TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ proper_q_rel<0:6> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg IND: + ] RSTR: h5 BODY: h6 ]
+          [ named_rel<0:6> "Abrams" LBL: h7 CARG: "Abrams" ARG0: x3 ]
+          [ "_sleep_v_1_rel"<7:14> LBL: h1 ARG0: e2 ARG1: x3 ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 > ]
+''')
+# the same structure as read from a DMRS serialization
+abrams_sleeps_dmrs = dmrx.loads_one(dmrx.dumps_one(abrams_sleeps))
+
+
+def test_loads():
+    m = simpledmrs.loads_one(
+        'dmrs 1 { [<0:6> "Rains."]; 10000 [_rain_v_1_rel<0:6> e SF=prop];'
+        ' 0:/H -> 10000; }'
+    )
+    assert m.identifier == '1'
+    assert m.lnk == Lnk.charspan(0, 6)
+    assert m.surface == 'Rains.'
+    assert m.nodeids() == [10000]
+    assert m.pred(10000) == Pred.stringpred('_rain_v_1_rel')
+    assert m.properties(m.ep(10000).iv) == {'SF': 'prop'}
+    assert m.hcons() == [(m.ltop, 'qeq', m.label(10000))]
+    # all optional parts omitted
+    m = simpledmrs.loads_one('dmrs{10000[_rain_v_1_rel];}')
+    assert m.nodeids() == [10000]
+    assert m.lnk is None and m.surface is None and m.identifier is None
+    # other kinds of lnks
+    m = simpledmrs.loads_one('dmrs { 10000 [_rain_v_1_rel<1 2>]; '
+                             '10001 [_rain_v_1_rel<@3>]; }')
+    assert m.ep(10000).lnk == Lnk.tokens([1, 2])
+    assert m.ep(10001).lnk == Lnk.edge(3)
+
+
+def test_roundtrip():
+    for pretty_print in (False, True):
+        s = simpledmrs.dumps_one(abrams_sleeps, pretty_print=pretty_print)
+        m = simpledmrs.loads_one(s)
+        assert m == abrams_sleeps_dmrs
+        assert m.surface == abrams_sleeps.surface
+        assert m.lnk == abrams_sleeps.lnk
+        assert m.ep(10001).carg == '"Abrams"'
+        assert simpledmrs.dumps_one(m, pretty_print=pretty_print) == s
+
+
+def test_escaped_strings():
+    s = ('dmrs "a \\"b\\"" { [<0:6> "say \\"hi\\" \\\\ }"]; '
+         '10000 [_rain_v_1_rel<0:6> "\\"rains\\""]; }')
+    m = simpledmrs.loads_one(s)
+    assert m.identifier == 'a "b"'
+    assert m.surface == 'say "hi" \\ }'
+    assert m.ep(10000).surface == '"rains"'
+    out = simpledmrs.dumps_one(m, pretty_print=False)
+    assert out.startswith('dmrs "a \\"b\\"" { [<0:6> "say \\"hi\\" \\\\ }"];')
+    m2 = simpledmrs.loads_one(out)
+    assert (m2.identifier, m2.surface) == (m.identifier, m.surface)
+    assert m2.ep(10000).surface == '"rains"'
+
+
+def test_deserialize_chunks():
+    s = simpledmrs.dumps([abrams_sleeps] * 2, pretty_print=True)
+    # a string split across chunks and a } inside a string
+    s = s.replace('"Abrams sleeps."', '"Abrams }\nsleeps."')
+    ms = list(simpledmrs.deserialize(io.StringIO(s)))
+    assert len(ms) == 2
+    assert ms[0].surface == 'Abrams }\nsleeps.'
+    assert ms[1] == abrams_sleeps_dmrs
+
+
+def test_load_dump(tmpdir):
+    ms = [abrams_sleeps] * 3
+    fh = io.StringIO()
+    simpledmrs.dump(fh, iter(ms), pretty_print=True)
+    assert fh.getvalue() == simpledmrs.dumps(ms, pretty_print=True) + '\n'
+    path = str(tmpdir.join('corpus.dmrs'))
+    with open(path, 'w') as f:
+        f.write(fh.getvalue())
+    with open(path) as f:
+        assert list(simpledmrs.load(f)) == [abrams_sleeps_dmrs] * 3
+
+
+def test_load_filename(tmpdir, monkeypatch):
+    path = str(tmpdir.join('corpus.dmrs'))
+    with open(path, 'w') as f:
+        simpledmrs.dump(f, [abrams_sleeps] * 3)
+    opened = []
+    def open_(*args):
+        opened.append(io.open(*args))
+        return opened[-1]
+    monkeypatch.setattr(util, 'open', open_, raising=False)
+    assert list(simpledmrs.load(path)) == [abrams_sleeps_dmrs] * 3
+    assert simpledmrs.load(path, single=True) == abrams_sleeps_dmrs
+    assert len(opened) == 2
+    assert all(f.closed for f in opened)
+
+
+def test_invalid():
+    with pytest.raises(XmrsDeserializationError):
+        simpledmrs.loads_one('mrs { }')
+    with pytest.raises(XmrsDeserializationError):
+        simpledmrs.loads_one('dmrs { 10000 [_rain_v_1_rel] }')
+    with pytest.raises(XmrsDeserializationError):
+        list(simpledmrs.loads('dmrs { 10000 [_rain_v_1_rel];'))
@@ -0,0 +1,48 @@
+from delphin.mrs import simplemrs, util
+
+it_rains = simplemrs.loads_one('''
+[ TOP: h0 INDEX: e2
+  RELS: < [ "_rain_v_1_rel"<3:9> LBL: h1 ARG0: e2 ] >
+  HCONS: < h0 qeq h1 > ]
+''')
+
+abrams_sleeps = simplemrs.loads_one('''
+[ LTOP: h0 INDEX: e2
+  RELS: < [ proper_q_rel<0:6> LBL: h4 ARG0: x3 RSTR: h5 BODY: h6 ]
+          [ named_rel<0:6> LBL: h7 CARG: "Abrams" ARG0: x3 ]
+          [ "_sleep_v_1_rel"<7:14> LBL: h1 ARG0: e2 ARG1: x3 ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 > ]
+''')
+
+
+def _top(m):
+    return m.top
+
+
+def test_parallel_map():
+    ms = [it_rains, abrams_sleeps] * 10
+    assert list(util.parallel_map(_top, ms)) == [m.top for m in ms]
+    assert list(util.parallel_map(_top, ms, processes=2)) == [
+        m.top for m in ms
+    ]
+    # inputs are only read a few chunks ahead of the results
+    read = []
+    def gen():
+        for m in ms * 10:
+            read.append(m)
+            yield m
+    results = util.parallel_map(_top, gen(), processes=2, chunksize=2)
+    next(results)
+    assert len(read) <= 2 * 2 * 2 + 2
+    assert len(list(results)) == len(ms) * 10 - 1
+
+
+def test_read_lines(tmpdir):
+    path = str(tmpdir.join('lines.txt'))
+    with open(path, 'w') as fh:
+        fh.write('a\nb\n')
+    lines = util.read_lines(path)
+    assert next(lines) == 'a\n'
+    lines.close()  # closes the file
+    assert list(util.read_lines(path)) == ['a\n', 'b\n']
+    assert list(util.read_lines(['c\n'])) == ['c\n']
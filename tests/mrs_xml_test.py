@@ -0,0 +1,125 @@
+# -*- coding: UTF-8 -*-
+
+import gzip
+import io
+import os
+import subprocess
+import sys
+
+from delphin.mrs import simplemrs, mrx, dmrx
+from delphin.mrs.util import iterparse_elements
+
+abrams_sleeps = simplemrs.loads_one('''
+[ LTOP: h0
+  INDEX: e2 [ e SF: prop TENSE: pres MOOD: indicative PROG: - PERF: - ]
+  RELS: < [ proper_q_rel<0:6> LBL: h4 ARG0: x3 [ x PERS: 3 NUM: sg IND: + ] RSTR: h5 BODY: h6 ]
+          [ named_rel<0:6> LBL: h7 CARG: "Abrams" ARG0: x3 ]
+          [ "_sleep_v_1_rel"<7:14> LBL: h1 ARG0: e2 ARG1: x3 ] >
+  HCONS: < h0 qeq h1 h5 qeq h7 > ]
+''')
+
+
+def test_iterparse_elements_clears_root():
+    xml = '<list>' + '<item><x/></item>' * 5 + '</list>'
+    seen = []
+    for elem in iterparse_elements(io.StringIO(xml), 'item'):
+        assert len(elem) == 1
+        seen.append(elem)
+    assert len(seen) == 5
+    # yielded elements are detached from the tree once consumed
+    assert all(len(elem) == 0 for elem in seen)
+
+
+def test_iterparse_elements_external_entities(tmpdir):
+    secret = tmpdir.join('secret.txt')
+    secret.write('secret')
+    xml = ('<!DOCTYPE list [<!ENTITY xxe SYSTEM "{}">]>'
+           '<list><item>&xxe;</item></list>'.format(secret.strpath))
+    try:
+        texts = [elem.text for elem in
+                 iterparse_elements(io.StringIO(xml), 'item')]
+    except SyntaxError:  # xml.etree does not allow external entities
+        texts = []
+    assert all('secret' not in (text or '') for text in texts)
+
+
+def test_loads():
+    for codec in (mrx, dmrx):
+        s = codec.dumps([abrams_sleeps, abrams_sleeps])
+        ms = list(codec.loads(s))
+        assert len(ms) == 2
+        assert ms[0] == ms[1]
+        assert codec.loads_one(s.encode('utf-8')) == ms[0]
+
+
+def test_load_gzip(tmpdir):
+    for codec in (mrx, dmrx):
+        s = codec.dumps([abrams_sleeps] * 3)
+        path = str(tmpdir.join('corpus.xml.gz'))
+        with gzip.open(path, 'wb') as fh:
+            fh.write(s.encode('utf-8'))
+        ms = list(codec.load(path))
+        assert len(ms) == 3
+        with open(path, 'rb') as fh:
+            assert list(codec.load(fh)) == ms
+        plain = str(tmpdir.join('corpus.xml'))
+        with open(plain, 'w') as fh:
+            fh.write(s)
+        assert list(codec.load(plain)) == ms
+        # binary streams without peek(), seekable or not
+        data = gzip.compress(s.encode('utf-8'))
+        assert list(codec.load(io.BytesIO(data))) == ms
+        raw = io.BytesIO(data)
+        raw.seekable = lambda: False
+        assert list(codec.load(raw)) == ms
+        assert not raw.closed
+
+
+def test_dump():
+    for codec in (mrx, dmrx):
+        for pretty_print in (False, True):
+            fh = io.StringIO()
+            codec.dump(fh, iter([abrams_sleeps] * 2),
+                       pretty_print=pretty_print)
+            s = codec.dumps([abrams_sleeps] * 2, pretty_print=pretty_print)
+            assert fh.getvalue() == s + '\n'
+        assert list(codec.loads(codec.dumps([]))) == []
+
+
+tricky = simplemrs.loads_one(
+    u'[ <0:9> "It\'s <a> & \\"b\\"\tc\r\nd \u00e9" '
+    u'TOP: h0 INDEX: e2 [ e SF: prop ] '
+    u'RELS: < [ named_rel<0:3> LBL: h1 ARG0: e2 CARG: "A&B <c>\t\r" ] > '
+    u'HCONS: < h0 qeq h1 > ]'
+)
+
+
+def test_dumps_backend_independent():
+    # the output is the same whether or not lxml is installed
+    script = (
+        'import sys\n'
+        'sys.modules["lxml"] = None\n'
+        'from delphin.mrs import simplemrs, mrx, dmrx\n'
+        'from delphin.mrs.util import XML_BACKEND\n'
+        'assert XML_BACKEND == "xml.etree"\n'
+        'ms = list(simplemrs.loads(sys.stdin.buffer.read().decode("utf-8")))\n'
+        'out = [codec.dumps(xs, pretty_print=pp)\n'
+        '       for codec in (mrx, dmrx)\n'
+        '       for xs in (ms, [])\n'
+        '       for pp in (False, True)]\n'
+        'sys.stdout.buffer.write("\\0".join(out).encode("utf-8"))\n'
+    )
+    ms = list(simplemrs.loads(simplemrs.dumps([abrams_sleeps, tricky])))
+    expected = [codec.dumps(xs, pretty_print=pp)
+                for codec in (mrx, dmrx)
+                for xs in (ms, [])
+                for pp in (False, True)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    proc = subprocess.Popen(
+        [sys.executable, '-c', script], env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    out, _ = proc.communicate(simplemrs.dumps(ms).encode('utf-8'))
+    assert proc.returncode == 0
+    assert out.decode('utf-8').split('\0') == expected
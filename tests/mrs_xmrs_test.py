@@ -1,8 +1,10 @@
 # -*- coding: UTF-8 -*-
 
+import pickle
+
 import pytest
 
-from delphin.mrs.components import Pred, Node, Link
+from delphin.mrs.components import Pred, Node, Link, links, nodes
 from delphin.mrs.xmrs import Xmrs, Dmrs
 from delphin.mrs import simplemrs  # for convenience in later tests
 from delphin.exceptions import XmrsError
@@ -60,6 +62,39 @@ class TestXmrs():
             x.add_eps([(10000, Pred.stringpred('_n_n_rel'), 'h3', {})])
         assert len(x.eps()) == 1
 
+    def test_from_trusted_parts(self):
+        x = read(
+            '[ TOP: h0 INDEX: e2 [ e TENSE: pres ] '
+            '  RELS: < [ udef_q_rel LBL: h4 ARG0: x3 [ x NUM: pl ] RSTR: h5 BODY: h6 ]'
+            '          [ "_dog_n_1_rel" LBL: h7 ARG0: x3 ]'
+            '          [ "_bark_v_1_rel" LBL: h1 ARG0: e2 ARG1: x3 ] >'
+            '  HCONS: < h0 qeq h1 h5 qeq h7 > ICONS: < e2 topic x3 > ]'
+        )
+        parts = dict(
+            top=x.top, index=x.index, eps=x.eps(), hcons=x.hcons(),
+            icons=x.icons(),
+            vars=dict((v, x.properties(v, as_list=True))
+                      for v in x.variables())
+        )
+        for debug in (False, True):
+            y = Xmrs.from_trusted_parts(debug=debug, **parts)
+            assert type(y) is Xmrs
+            assert y == x
+            assert y.variables() == x.variables()
+            assert y.properties('x3') == x.properties('x3')
+            assert y._vars['h7'] == x._vars['h7']  # includes hcrefs
+            assert y.icons('e2') == x.icons('e2')
+            assert y.outgoing_args(10002) == x.outgoing_args(10002)
+        assert type(Dmrs.from_trusted_parts(**parts)) is Dmrs
+        # duplicates are still found
+        with pytest.raises(XmrsError):
+            Xmrs.from_trusted_parts(eps=x.eps() + [x.ep(10001)])
+        with pytest.raises(XmrsError):
+            Xmrs.from_trusted_parts(hcons=x.hcons() + [x.hcon('h0')])
+        # other errors are only found with debug=True
+        with pytest.raises(XmrsError):
+            Xmrs.from_trusted_parts(eps=[(10000,)], debug=True)
+
     def test_add_hcons(self):
         x = Xmrs()
         with pytest.raises(XmrsError):
@@ -278,6 +313,20 @@ class TestXmrs():
                        {'ARG0': 'e2', 'ARG1': '1', 'ARG2': '"x5"'})])
         assert set(x.variables()) == {'h3', 'e2'}
 
+    def test_var_sort_and_var_id(self):
+        x = Xmrs(top='h0', eps=[(10, Pred.stringpred('_v_v_rel'), 'h1',
+                                 {'ARG0': 'e2', 'ARG1': 'ref-ind12'})])
+        assert x.var_sort('h0') == 'h'
+        assert x.var_id('h0') == 0
+        assert x.var_sort('ref-ind12') == 'ref-ind'
+        assert x.var_id('ref-ind12') == 12
+        # variables not in the Xmrs are parsed
+        assert x.var_sort('x5') == 'x'
+        assert x.var_id('x5') == 5
+        assert 'x5' not in x
+        with pytest.raises(ValueError): x.var_sort('x')
+        with pytest.raises(ValueError): x.var_id('1')
+
     def test_pred(self):
         x = Xmrs()
         # KeyError on bad nodeid
@@ -438,6 +487,45 @@ class TestXmrs():
         assert x.incoming_args(11) == {}
         assert x.incoming_args(12) == {}
 
+    def test_cache(self):
+        sp = Pred.stringpred
+        x = Xmrs(
+            eps=[
+                (10, sp('_v_v_rel'), 'h3', {'ARG0': 'e2'}),
+                (11, sp('_a_a_rel'), 'h5', {'ARG0': 'e4', 'ARG1': 'e2'})
+            ]
+        )
+        assert x.cache_info() == (0, 0, 0)
+        assert x.incoming_args(10) == {11: {'ARG1': 'e2'}}
+        assert x.cache_info() == (0, 1, 1)
+        # results are copies, so changing them does not affect the cache
+        x.incoming_args(10)[11]['ARG2'] = 'x9'
+        x.outgoing_args(11).clear()
+        assert x.incoming_args(10) == {11: {'ARG1': 'e2'}}
+        assert x.outgoing_args(11) == {'ARG1': 'e2'}
+        hits, misses, _ = x.cache_info()
+        assert (hits, misses) == (3, 2)
+        assert len(links(x)) == len(links(x)) == 1
+        assert x.cache_info().hits > hits
+        # adding EPs, HCONS, or ICONS invalidates the cache
+        x.add_eps([(12, sp('_b_a_rel'), 'h6', {'ARG0': 'e7', 'ARG1': 'e2'})])
+        assert x.cache_info().currsize == 0
+        assert x.incoming_args(10) == {11: {'ARG1': 'e2'}, 12: {'ARG1': 'e2'}}
+        assert len(links(x)) == 2
+        assert x.nodeids(ivs=['e7']) == [12]
+        x.clear_cache()
+        assert x.cache_info().currsize == 0
+        # setting the top, index, or xarg also invalidates the cache
+        x.top = 'h3'
+        assert any(link.start == 0 for link in links(x))
+        x.top = None
+        assert x.top is None
+        assert all(link.start != 0 for link in links(x))
+        x.index = 'e2'
+        assert x.cache_info().currsize == 0
+        # nodes and their sortinfo are copies, too
+        nodes(x)[0].sortinfo['TENSE'] = 'past'
+        assert 'TENSE' not in nodes(x)[0].sortinfo
 
     def test___eq__(self):
         x = read('[ TOP: h0 RELS: < [ _v_v_rel LBL: h1 ARG0: e2 ] > ]')
@@ -544,7 +632,42 @@ class TestXmrs():
         assert x.is_connected() == True
 
     def test_is_well_formed(self):
-        pass
+        x = read('[ TOP: h0 RELS: < [ _v_v_rel LBL: h1 ARG0: e2 ] > '
+                 '  HCONS: < h0 qeq h1 > ]')
+        assert x.is_well_formed() == True
+        x = read('[ TOP: h0 '
+                 '  RELS: < [ _v_v_rel LBL: h1 ARG0: e2 ]'
+                 '          [ _n_n_rel LBL: h3 ARG0: x4 ] > ]')
+        assert x.is_well_formed() == False
+        assert Xmrs().is_well_formed() == False
+
+    def test_validate(self):
+        sp = Pred.stringpred
+        x = read('[ TOP: h0 RELS: < [ _v_v_rel LBL: h1 ARG0: e2 ] > '
+                 '  HCONS: < h0 qeq h1 > ]')
+        assert x.validate() is None
+        assert x.validate(report=True) == []
+        x = Xmrs(
+            eps=[(10, sp('_v_v_rel'), None, {}),
+                 (11, sp('_n_n_rel'), 'h3', {'ARG0': 'x4'}),
+                 (12, sp('_n_n_rel'), 'h5', {'ARG0': 'x4'}),
+                 (13, sp('_v_v_rel'), 'h6', {'ARG0': 'e7'})],
+            hcons=[('h0', 'qeq', 'h9')]
+        )
+        with pytest.raises(XmrsError):
+            x.validate()
+        problems = x.validate(report=True)
+        assert [p.kind for p in problems] == [
+            'missing-label', 'missing-iv', 'shared-iv', 'bad-hcons',
+            'disconnected'
+        ]
+        assert problems[0].data == 10
+        assert problems[2].data == 'x4'
+        assert problems[3].data == ('h0', 'qeq', 'h9')
+        assert sorted(sorted(g) for g in problems[4].data) == [
+            [10], [11, 12], [13]
+        ]
+        assert Xmrs().validate(report=True)[0].kind == 'empty'
 
     def test_subgraph(self):
         nodes = [Node(1,Pred.stringpred('verb'))]
@@ -552,3 +675,159 @@ class TestXmrs():
         graph = Dmrs(nodes,links)
         new_graph = graph.subgraph([1])
         assert len(new_graph._eps) == 1
+
+    def test_subgraph_view(self):
+        x = read(
+            '[ TOP: h0 INDEX: e2 [ e TENSE: pres ] '
+            '  RELS: < [ udef_q_rel LBL: h4 ARG0: x3 [ x NUM: pl ] RSTR: h5 BODY: h6 ]'
+            '          [ "_dog_n_1_rel" LBL: h7 ARG0: x3 ]'
+            '          [ "_bark_v_1_rel" LBL: h1 ARG0: e2 ARG1: x3 ]'
+            '          [ "_loud_a_1_rel" LBL: h1 ARG0: e8 ARG1: e2 ] >'
+            '  HCONS: < h0 qeq h1 h5 qeq h7 > ]'
+        )
+        nidsets = [[10000, 10001], [10001, 10002], [10002, 10003],
+                   [10000, 10003], [10001, 10003], [10000, 10001, 10002],
+                   [10003]]
+        for nids in nidsets:
+            v = x.subgraph_view(nids)
+            sg = x.subgraph(nids)
+            assert isinstance(v, Xmrs)
+            assert v == sg
+            assert (v.top, v.index, v.xarg) == (sg.top, sg.index, sg.xarg)
+            assert v.nodeids() == sg.nodeids()
+            assert v.variables() == sg.variables()
+            assert v.hcons() == sg.hcons()
+            assert v.is_connected() == sg.is_connected()
+            for nid in nids:
+                assert v.properties(nid) == sg.properties(nid)
+                assert v.outgoing_args(nid) == sg.outgoing_args(nid)
+                assert v.incoming_args(nid) == sg.incoming_args(nid)
+            for var in sg.variables():
+                assert var in v
+                assert v.properties(var) == sg.properties(var)
+        v = x.subgraph_view([10000, 10001])
+        assert v.nodeids(ivs=['x3'], quantifier=True) == [10000]
+        assert sorted(v.labelset('h7')) == [10001]
+        with pytest.raises(KeyError):
+            v.ep(10002)
+        with pytest.raises(KeyError):
+            v.nodeids(ivs=['e2'])
+        with pytest.raises(KeyError):
+            v.properties('e2')
+        # basic queries do not build the subgraph
+        assert v._xmrs is None
+        assert v.materialize() == x.subgraph([10000, 10001])
+        assert v.materialize() is v.materialize()
+        # views cannot be modified
+        with pytest.raises(XmrsError):
+            v.add_eps([(10004, Pred.stringpred('_cat_n_1_rel'), 'h9',
+                        {'ARG0': 'x10'})])
+        with pytest.raises(XmrsError):
+            v.add_hcons([('h11', 'qeq', 'h7')])
+        with pytest.raises(XmrsError):
+            v.add_icons([('e2', 'topic', 'x3')])
+        assert v.nodeids() == [10000, 10001]
+        assert v.materialize().nodeids() == [10000, 10001]
+        assert len(v.hcons()) == 1
+
+    def test_freeze(self):
+        s = ('[ TOP: h0 INDEX: e2 [ e TENSE: pres ] '
+             '  RELS: < [ udef_q_rel LBL: h4 ARG0: x3 [ x NUM: pl ] RSTR: h5 BODY: h6 ]'
+             '          [ "_dog_n_1_rel" LBL: h7 ARG0: x3 ]'
+             '          [ "_bark_v_1_rel" LBL: h1 ARG0: e2 ARG1: x3 ] >'
+             '  HCONS: < h0 qeq h1 h5 qeq h7 > ]')
+        x = read(s)
+        f = x.freeze()
+        assert f == x
+        assert f.properties('x3') == x.properties('x3')
+        assert f.freeze() is f
+        # the hash does not depend on the process or the object
+        assert hash(f) == hash(read(s).freeze())
+        assert f.digest == read(s).freeze().digest
+        assert len({f, read(s).freeze()}) == 1
+        assert {f: 1}[read(s).freeze()] == 1
+        with pytest.raises(XmrsError):
+            f.add_eps([(10003, Pred.stringpred('_loud_a_1_rel'), 'h1',
+                        {'ARG0': 'e8', 'ARG1': 'e2'})])
+        with pytest.raises(XmrsError):
+            f.add_hcons([('h0', 'qeq', 'h7')])
+        with pytest.raises(XmrsError):
+            f.top = 'h1'
+        # freezing copies, so the original can still be changed
+        x.add_hcons([('h8', 'qeq', 'h7')])
+        assert len(f.hcons()) == 2
+        x.properties('e2', as_list=True).append(('SF', 'prop'))
+        assert f.properties('e2') == {'TENSE': 'pres'}
+        # the digest is computed from text, not repr(), so it is the
+        # same for str and unicode strings and on Python 2 and 3
+        assert f.digest == 'f3be02f68c8eb73e8a330caa0c81d223e2f6de77'
+        assert (f.freeze(ignore_variables=True).digest ==
+                '33ffa36fbd05b3236d181f7e33f50316960019db')
+        # renamed variables only have the same hash if they are ignored
+        renamed = read(s.replace('x3', 'x9').replace('h7', 'h8'))
+        assert renamed.freeze() != f
+        assert hash(renamed.freeze()) != hash(f)
+        g = f.freeze(ignore_variables=True)
+        assert g.ignore_variables
+        assert hash(renamed.freeze(ignore_variables=True)) == hash(g)
+        assert hash(read(s.replace('_dog', '_cat')).freeze(True)) != hash(g)
+        assert hash(read(s.replace('ARG1: x3', 'ARG2: x3')).freeze(True)) != hash(g)
+        # keys of vars need not be variable strings
+        def nonvar(name, nodeid):
+            return Xmrs(
+                top='h0',
+                eps=[(nodeid, Pred.stringpred('_dog_n_1_rel'), 'h1',
+                      {'ARG0': 'x2', 'ARG1': name})],
+                vars={name: {}}
+            )
+        f = nonvar('foo', 10000).freeze(ignore_variables=True)
+        assert f == nonvar('foo', 10000)
+        assert f.digest == nonvar('bar', 10001).freeze(True).digest
+
+    def test_pickle(self):
+        s = ('[ <0:10> "Dogs bark." TOP: h0 INDEX: e2 [ e TENSE: pres ] '
+             '  RELS: < [ udef_q_rel LBL: h4 ARG0: x3 [ x NUM: pl ] RSTR: h5 BODY: h6 ]'
+             '          [ "_dog_n_1_rel"<0:4> LBL: h7 ARG0: x3 ]'
+             '          [ "_bark_v_1_rel"<5:9> LBL: h1 ARG0: e2 ARG1: x3 ] >'
+             '  HCONS: < h0 qeq h1 h5 qeq h7 > ICONS: < e2 topic x3 > ]')
+        x = read(s)
+        x.outgoing_args(10002)  # fill the cache
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            x2 = pickle.loads(pickle.dumps(x, protocol))
+            assert type(x2) is Xmrs
+            assert x2 == x
+            assert x2.variables() == x.variables()
+            assert x2.properties('x3') == x.properties('x3')
+            assert x2.icons() == x.icons()
+            assert (x2.lnk, x2.surface) == (x.lnk, x.surface)
+            assert x2.ep(10001).lnk == x.ep(10001).lnk
+            assert x2.cache_info().currsize == 0
+        d = Dmrs.from_dict(Dmrs.to_dict(x))
+        d2 = pickle.loads(pickle.dumps(d))
+        assert type(d2) is Dmrs
+        assert d2 == d
+        f = x.freeze(ignore_variables=True)
+        f2 = pickle.loads(pickle.dumps(f))
+        assert f2.ignore_variables
+        assert f2.digest == f.digest
+        with pytest.raises(XmrsError):
+            f2.add_hcons([('h8', 'qeq', 'h7')])
+        v = pickle.loads(pickle.dumps(x.subgraph_view([10000, 10001])))
+        assert type(v) is Xmrs
+        assert v == x.subgraph([10000, 10001])
+        lazy = simplemrs.loads_one(s, lazy=True)
+        lazy2 = pickle.loads(pickle.dumps(lazy))
+        assert isinstance(lazy2, simplemrs.LazyXmrs)
+        assert lazy2._xmrs is None
+        assert lazy2 == x
+        class MyLazyXmrs(simplemrs.LazyXmrs):
+            pass
+        sub = MyLazyXmrs(s)
+        assert sub.__reduce__()[0] is MyLazyXmrs
+
+    def test_lazy_strict(self):
+        bad = '[ TOP: h0 RELS: < [ _rain_v_1_rel LBL: h1 ] > ]'
+        with pytest.warns(DeprecationWarning):
+            m = simplemrs.loads_one(bad, strict=True, lazy=True)
+        with pytest.raises(XmrsError):
+            m.outgoing_args(10000)
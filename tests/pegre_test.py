@@ -0,0 +1,89 @@
+
+import pytest
+
+from delphin.lib.pegre import (
+    literal as lit,
+    regex,
+    nonterminal as nt,
+    sequence as seq,
+    choice,
+    optional as opt,
+    not_next,
+    one_or_more,
+    delimited,
+    bounded,
+    Peg,
+    PegreError,
+    PegreChoiceError
+)
+
+calls = []
+
+def _counted(e):
+    def counted(s, st, pos):
+        calls.append(pos)
+        return e(s, st, pos)
+    return counted
+
+def _grammar():
+    return dict(
+        start=delimited(nt('ITEM'), regex(r'\s*;\s*')),
+        ITEM=choice(
+            seq(nt('NUM'), lit('+'), nt('NUM'), value=lambda d: d[0] + d[2]),
+            seq(nt('NUM'), lit('-'), nt('NUM'), value=lambda d: d[0] - d[2]),
+            nt('NUM')
+        ),
+        NUM=_counted(regex(r'\d+', value=int)),
+    )
+
+
+def test_parse():
+    g = _grammar()
+    for packrat in (False, True):
+        p = Peg(g, packrat=packrat)
+        assert p.parse('') == []
+        assert p.parse('1') == [1]
+        assert p.parse('1+2; 5-3 ;4') == [3, 2, 4]
+    p = Peg(dict(start=bounded(lit('('), one_or_more(regex(r'\w'),
+                                                     delimiter=lit(',')),
+                               lit(')'))))
+    assert p.parse('(a,b,c)') == ['a', ',', 'b', ',', 'c']
+
+
+def test_packrat():
+    del calls[:]
+    Peg(_grammar()).parse('10-2; 7')
+    # 10 is parsed for the + and - alternatives; 7 for all three
+    assert calls == [0, 0, 3, 6, 6, 6]
+    del calls[:]
+    p = Peg(_grammar(), packrat=True)
+    assert p.parse('10-2; 7') == [8, 7]
+    assert calls == [0, 3, 6]
+
+
+def test_lookahead():
+    p = Peg(dict(start=seq(not_next(lit('x')), regex(r'\w+'))))
+    assert p.parse('abc') == ['abc']
+    with pytest.raises(PegreError):
+        p.parse('xyz')
+    # failures inside a negative lookahead are not reported
+    p = Peg(dict(start=seq(lit('a'), opt(lit('c')),
+                           not_next(lit('x')), lit('b'))))
+    with pytest.raises(PegreChoiceError) as excinfo:
+        p.parse('ad')
+    assert 'Expected: "c"' in excinfo.value.message
+    assert 'Expected: "b"' in excinfo.value.message
+    assert 'Expected: "x"' not in excinfo.value.message
+
+
+def test_errors():
+    p = Peg(dict(start=seq(lit('a'), choice(lit('b'), lit('c')))))
+    with pytest.raises(PegreChoiceError) as excinfo:
+        p.parse('ad')
+    assert excinfo.value.position == 1
+    # the furthest failure is reported, not the first
+    p = Peg(dict(start=choice(seq(lit('a'), lit('b'), lit('c')), lit('x'))))
+    with pytest.raises(PegreError) as excinfo:
+        p.parse('abd')
+    assert excinfo.value.position == 2
+    assert excinfo.value.message == 'Expected: "c"'